@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+"""
+bench_e2e.py — сквозной бенчмарк тиков виджетов против симулятора устройства.
+
+Гоняет настоящие циклы виджетов — run_loop пинг-мониторов 1–3 (и 3 в режиме --raster
+и с замерами 10 раз на столбец), цикл
+clock-2.py и ротацию weather-4.py — с симулятором вместо устройства
+(busybar.simulator) и заглушкой Open-Meteo. Тики идут без пауз, после
+--ticks тиков цикл останавливается через KeyboardInterrupt, как по Ctrl+C.
+
+Отчёт по каждому сценарию:
+  - этапы тика (probe, render, encode, upload, draw, fetch): p50/p99, мс;
+  - длительность тика p50/p99, тиков/с, запросов/с, байт на тик.
+
+Результат сравнивается с сохранёнными базовыми значениями (baselines.json):
+если тиков/с или кадров/с стало меньше или запросов и байт на тик больше,
+чем на --tolerance, бенчмарк завершается с кодом 1. Тики и кадры в секунду
+зависят от машины, поэтому базовые значения хранятся по машинам (--host,
+BUSYBAR_BENCH_HOST, по умолчанию имя хоста); для машины без своих базовых
+значений сравнение пропускается — их записывает --update-baseline.
+
+Пинг заменён детерминированной заглушкой (замеры ICMP не воспроизводимы),
+probe — это её время; --real-ping пингует 127.0.0.1 по-настоящему.
+
+Запуск:
+  python3 benchmarks/bench_e2e.py [--ticks 300] [--latency 0] [--only ping-3]
+  python3 benchmarks/bench_e2e.py --update-baseline
+  BUSYBAR_BENCH_HOST=ci-runner python3 benchmarks/bench_e2e.py
+"""
+import argparse
+import _thread
+import contextlib
+import datetime as dt_module
+import http.server
+import importlib.util
+import io
+import json
+import os
+import platform
+import random
+import runpy
+import sys
+import threading
+import time
+import urllib.parse
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+import busybar.device
+import busybar.scheduler
+import busybar.weather
+from busybar.device import DeviceClient
+from busybar.hosts import HostBuffers
+from busybar.pinger import ping_many
+from busybar.scheduler import Tick
+from busybar.simulator import DeviceSimulator, server_address, start_server
+from busybar.timing import StageTimer, percentile
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+HOST_ENV = "BUSYBAR_BENCH_HOST"
+TOLERANCE = 0.25
+# Пинг-мониторы пишут на устройство в отдельном потоке (busybar.pipeline), поэтому
+# замеры идут по сетке с этим шагом, а тиков/с — это темп замеров, который
+# конвейер должен выдерживать; пропускная способность записи — кадров/с (draw)
+PROBE_INTERVAL_MS = 5.0
+SERVERS = ["10.0.0.1", "10.0.0.2", "10.0.0.3"]
+# Как часто поток замеров после последнего тика проверяет, остановлен ли конвейер
+DONE_POLL_S = 0.05
+
+
+# === Подмены ===
+
+class FastTicks:
+    """
+    TickScheduler для прогона: тики подряд (или с шагом interval_s), после
+    limit — KeyboardInterrupt в главном потоке, как по Ctrl+C. Конвейер
+    пинг-мониторов ждёт тики в своём потоке: оттуда главный поток прерывается
+    через _thread.interrupt_main(), а поток замеров ждёт остановки конвейера.
+    """
+
+    def __init__(self, limit, on_tick=None, interval_s=None):
+        self.limit = limit
+        self.on_tick = on_tick
+        self.interval_s = interval_s
+        self._next = None
+        self.index = 0
+        self.tick_ms = []
+        self._last = None
+        self._done = False
+
+    def __call__(self, interval=1.0, *args, **kwargs):
+        # подставляется вместо класса TickScheduler: TickScheduler(interval) -> self
+        self.interval = interval
+        return self
+
+    def wait(self):
+        if self._done:
+            # прогон окончен, главный поток уже останавливает конвейер
+            time.sleep(DONE_POLL_S)
+            return Tick(self.index, time.perf_counter(), 0, 0.0)
+        if self.interval_s:
+            # конвейер пинг-мониторов: замеры по сетке, как у настоящего планировщика
+            self._next = time.perf_counter() if self._next is None else self._next + self.interval_s
+            time.sleep(max(0.0, self._next - time.perf_counter()))
+        now = time.perf_counter()
+        if self._last is not None:
+            self.tick_ms.append((now - self._last) * 1000.0)
+        if self.index >= self.limit:
+            self._done = True
+            if threading.current_thread() is threading.main_thread():
+                raise KeyboardInterrupt
+            _thread.interrupt_main()
+            return self.wait()
+        if self.on_tick:
+            self.on_tick(self.index)
+        tick = Tick(self.index, now, 0, 0.0)
+        self.index += 1
+        self._last = time.perf_counter()
+        return tick
+
+    def summary(self):
+        return f"тики: {self.index}"
+
+
+class TimedClient(DeviceClient):
+    def __init__(self, address, stages):
+        super().__init__(address)
+        self.stages = stages
+
+    def upload_asset(self, app_id, filename, data, force=False):
+        with self.stages.time("upload"):
+            return super().upload_asset(app_id, filename, data, force)
+
+    def draw(self, payload, force=False):
+        with self.stages.time("draw"):
+            return super().draw(payload, force)
+
+
+def make_timed_buffers(stages):
+    class TimedHostBuffers(HostBuffers):
+        def record(self, results, ts=None, index=None):
+            with stages.time("render"):
+                return super().record(results, ts, index)
+
+        def png(self, host):
+            with stages.time("encode"):
+                return super().png(host)
+    return TimedHostBuffers
+
+
+def make_fake_ping(stages, real=False, seed=1):
+    rnd = random.Random(seed)
+
+    def fake_ping_many(hosts, timeout_s=1.0, **kwargs):
+        with stages.time("probe"):
+            if real:
+                rtt = ping_many(["127.0.0.1"], timeout_s=timeout_s).get("127.0.0.1")
+                return {h: rtt for h in hosts}
+            return {h: None if rnd.random() < 0.05 else rnd.uniform(5, 120) for h in hosts}
+    return fake_ping_many
+
+
+class FakeDatetime(dt_module.datetime):
+    """datetime.now() сдвигается на секунду за тик — часы меняются каждый тик."""
+    base = dt_module.datetime(2024, 1, 1, 12, 0, 0)
+    offset = 0
+
+    @classmethod
+    def now(cls, tz=None):
+        return cls.base + dt_module.timedelta(seconds=cls.offset)
+
+
+def start_weather_stub():
+    """Заглушка Open-Meteo: current_weather для всех переданных координат."""
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            query = urllib.parse.parse_qs(urllib.parse.urlsplit(self.path).query)
+            lats = query.get("latitude", [""])[0].split(",")
+            items = [{"current_weather": {"temperature": 20.0 + i, "windspeed": 10.0, "weathercode": 61}}
+                     for i in range(len(lats))]
+            body = json.dumps(items if len(items) > 1 else items[0]).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}/v1/forecast"
+
+
+@contextlib.contextmanager
+def patched(obj, name, value):
+    old = getattr(obj, name)
+    setattr(obj, name, value)
+    try:
+        yield
+    finally:
+        setattr(obj, name, old)
+
+
+def load_script(path):
+    spec = importlib.util.spec_from_file_location(os.path.basename(path).replace("-", "_")[:-3], path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+# === Сценарии ===
+
+def run_ping(script, ticks, client, stages, opts, **kwargs):
+    module = load_script(os.path.join(ROOT, "ping-monitor", script))
+    fast = FastTicks(ticks, interval_s=opts.probe_interval / 1000)
+    with contextlib.ExitStack() as stack:
+        stack.enter_context(patched(module, "TickScheduler", fast))
+        stack.enter_context(patched(module, "get_client", lambda *a: client))
+        stack.enter_context(patched(module, "ping_many", make_fake_ping(stages, opts.real_ping)))
+        stack.enter_context(patched(module, "HostBuffers", make_timed_buffers(stages)))
+        # ping-monitor-3 грузит логотип по относительному пути
+        cwd = os.getcwd()
+        os.chdir(os.path.join(ROOT, "ping-monitor"))
+        try:
+            module.run_loop(SERVERS, client.device_ip, **kwargs)
+        finally:
+            os.chdir(cwd)
+    return fast
+
+
+def run_script(folder, script, ticks, client, on_tick=None):
+    """Скрипт с циклом на верхнем уровне: подменяем TickScheduler и get_client в busybar."""
+    fast = FastTicks(ticks, on_tick)
+    cwd = os.getcwd()
+    os.chdir(os.path.join(ROOT, folder))
+    try:
+        with patched(busybar.scheduler, "TickScheduler", fast), \
+                patched(busybar.device, "get_client", lambda *a: client):
+            runpy.run_path(script, run_name="__main__")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        os.chdir(cwd)
+    return fast
+
+
+def run_clock(ticks, client, stages, opts):
+    def on_tick(index):
+        FakeDatetime.offset = index
+    with patched(dt_module, "datetime", FakeDatetime):
+        return run_script("clock-widget", "clock-2.py", ticks, client, on_tick)
+
+
+def run_weather(ticks, client, stages, opts):
+    fetch = busybar.weather.fetch_current_weather
+
+    def timed_fetch(*args, **kwargs):
+        with stages.time("fetch"):
+            return fetch(*args, **kwargs)
+
+    cache_path = os.path.join(os.environ.get("TMPDIR", "/tmp"), f"busybar-bench-weather-{os.getpid()}.json")
+    cache = busybar.weather.WeatherCache(cache_path, url=start_weather_stub())
+    try:
+        with patched(busybar.weather, "fetch_current_weather", timed_fetch), \
+                patched(busybar.weather, "_default_cache", cache):
+            return run_script("weather-widget", "weather-4.py", ticks, client)
+    finally:
+        if os.path.exists(cache_path):
+            os.remove(cache_path)
+
+
+SCENARIOS = {
+    "ping-1": lambda *a: run_ping("ping-monitor-1.py", *a, rate_hz=1),
+    "ping-2": lambda *a: run_ping("ping-monitor-2.py", *a, rate_hz=1),
+    "ping-3": lambda *a: run_ping("ping-monitor-3.py", *a, rate_hz=1),
+    "ping-3-raster": lambda *a: run_ping("ping-monitor-3.py", *a, raster=True, rate_hz=1),
+    # 10 замеров на столбец: тик — замер, кадр на устройство — раз в 10 тиков
+    "ping-3-10hz": lambda *a: run_ping("ping-monitor-3.py", *a, rate_hz=10),
+    "clock-2": run_clock,
+    "weather-4": run_weather,
+}
+
+
+def run_scenario(name, opts):
+    ticks = opts.ticks
+    sim = DeviceSimulator(latency=opts.latency / 1000)
+    server = start_server(sim)
+    stages = StageTimer()
+    client = TimedClient(server_address(server), stages)
+    t0 = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        fast = SCENARIOS[name](ticks, client, stages, opts)
+    elapsed = time.perf_counter() - t0
+    server.shutdown()
+    client.close()
+
+    requests_sent = sim.stats["upload"] + sim.stats["draw"]
+    return {
+        "ticks": fast.index,
+        "ticks_per_s": fast.index / elapsed,
+        "requests_per_s": requests_sent / elapsed,
+        "requests_per_tick": requests_sent / max(1, fast.index),
+        "draws_per_s": sim.stats["draw"] / elapsed,
+        "bytes_per_tick": (sim.stats["upload_bytes"] + sim.stats["draw_bytes"]) / max(1, fast.index),
+        "p50_tick_ms": percentile(fast.tick_ms, 50),
+        "p99_tick_ms": percentile(fast.tick_ms, 99),
+    }, stages
+
+
+def check(name, result, baseline, tolerance):
+    """Список регрессий относительно базовых значений."""
+    problems = []
+    base = baseline.get(name)
+    if not base:
+        return problems
+    if result["ticks_per_s"] < base["ticks_per_s"] * (1 - tolerance):
+        problems.append(f"тиков/с {result['ticks_per_s']:.0f} < базовых {base['ticks_per_s']:.0f}")
+    if result["bytes_per_tick"] > base["bytes_per_tick"] * (1 + tolerance):
+        problems.append(f"байт/тик {result['bytes_per_tick']:.0f} > базовых {base['bytes_per_tick']:.0f}")
+    # меньше запросов на тик — это выигрыш (дедупликация, пропуск неизменных кадров),
+    # регрессия — только если их стало больше
+    if result["requests_per_tick"] > base["requests_per_tick"] * (1 + tolerance):
+        problems.append(f"запросов/тик {result['requests_per_tick']:.2f} > базовых {base['requests_per_tick']:.2f}")
+    # пинг-мониторы идут по сетке замеров (тиков/с постоянно), медленная запись
+    # на устройство видна по кадрам/с
+    if result["draws_per_s"] < base.get("draws_per_s", 0) * (1 - tolerance):
+        problems.append(f"кадров/с {result['draws_per_s']:.0f} < базовых {base['draws_per_s']:.0f}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Сквозной бенчмарк тиков виджетов")
+    parser.add_argument("--ticks", type=int, default=300)
+    parser.add_argument("--latency", type=float, default=0.0, help="задержка симулятора, мс")
+    parser.add_argument("--only", nargs="+", choices=SCENARIOS, help="только эти сценарии")
+    parser.add_argument("--probe-interval", type=float, default=PROBE_INTERVAL_MS,
+                        help="пинг-мониторы: шаг замеров, мс (конвейер рисует последний кадр)")
+    parser.add_argument("--real-ping", action="store_true", help="пинговать 127.0.0.1 вместо заглушки")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE, help="допустимая регрессия (доля)")
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--host", default=os.environ.get(HOST_ENV) or platform.node(),
+                        help="чьи базовые значения сравнивать и сохранять (по умолчанию имя хоста)")
+    parser.add_argument("--update-baseline", action="store_true", help="сохранить результат как базовый")
+    args = parser.parse_args()
+
+    try:
+        with open(args.baseline, encoding="utf-8") as f:
+            baselines = json.load(f)
+    except (OSError, ValueError):
+        baselines = {}
+    baseline = baselines.get(args.host, {})
+    if not baseline and not args.update_baseline:
+        print(f"Нет базовых значений для {args.host!r} — сравнение пропущено "
+              f"(сохранить: --update-baseline)")
+
+    results, failed = {}, False
+    for name in args.only or SCENARIOS:
+        result, stages = run_scenario(name, args)
+        results[name] = result
+        print(f"{name}: {result['ticks_per_s']:.0f} тиков/с, {result['draws_per_s']:.0f} кадров/с, "
+              f"{result['requests_per_s']:.0f} запросов/с "
+              f"({result['requests_per_tick']:.2f}/тик), {result['bytes_per_tick']:.0f} B/тик, "
+              f"тик p50 {result['p50_tick_ms']:.2f} ms / p99 {result['p99_tick_ms']:.2f} ms")
+        print(stages.summary())
+        for problem in check(name, result, baseline, args.tolerance):
+            print(f"  РЕГРЕССИЯ: {problem}")
+            failed = True
+
+    if args.update_baseline:
+        baseline.update({name: {k: round(v, 3) for k, v in r.items()} for name, r in results.items()})
+        baselines[args.host] = baseline
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Базовые значения для {args.host!r} сохранены в {args.baseline}")
+    elif failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
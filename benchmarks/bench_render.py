@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+bench_render.py — микробенчмарк рендера графика пинга, кадров в секунду.
+
+Полный кадр: прежняя отрисовка через ImageDraw (draw.point/draw.line на
+каждый столбец) против векторного прохода NumPy (busybar.graph.line_frame /
+bar_frame -> RGBA-массив -> Pillow один раз); отдельно растр и растр + PNG.
+Перерисовка ScrollingGraph при смене масштаба: по столбцам против NumPy.
+Заодно проверяется, что все кадры попиксельно одинаковые.
+
+Запуск:
+  python3 benchmarks/bench_render.py [--frames 2000]
+"""
+import argparse
+import io
+import os
+import random
+import sys
+import time
+
+from PIL import Image, ImageDraw
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from busybar.graph import BACKGROUND, BAR_LEVELS, LINE_COLOR, ScrollingGraph, bar_frame, line_frame
+
+WIDTH, HEIGHT = 72, 11
+
+
+def draw_line(values, max_ping):
+    """Прежняя отрисовка линии: точка + линия к предыдущей точке."""
+    img = Image.new("RGBA", (WIDTH, HEIGHT), BACKGROUND)
+    draw = ImageDraw.Draw(img)
+    prev = None
+    for x, v in enumerate(values):
+        if v is None:
+            prev = None
+            continue
+        vv = max(0.0, min(v, max_ping))
+        y = int(round((1.0 - (vv / max_ping)) * (HEIGHT - 1)))
+        draw.point((x, y), fill=LINE_COLOR)
+        if prev is not None:
+            draw.line((prev[0], prev[1], x, y), fill=LINE_COLOR)
+        prev = (x, y)
+    return img
+
+
+def draw_bars(values, max_ping):
+    """Прежняя отрисовка столбиков: draw.line на каждый столбик."""
+    img = Image.new("RGBA", (WIDTH, HEIGHT), BACKGROUND)
+    draw = ImageDraw.Draw(img)
+    for x, v in enumerate(values):
+        if v is None:
+            continue
+        v = max(0.0, min(v, max_ping))
+        h = int(round((v / max_ping) * (HEIGHT - 1)))
+        color = next(c for limit, c in BAR_LEVELS if v <= limit)
+        draw.line((x, HEIGHT - h, x, HEIGHT - 1), fill=color)
+    return img
+
+
+LINE_PALETTE = np.array([BACKGROUND, LINE_COLOR], dtype=np.uint8)
+BAR_PALETTE = np.array([BACKGROUND] + [color for _, color in BAR_LEVELS], dtype=np.uint8)
+
+
+def numpy_line(values, max_ping):
+    return LINE_PALETTE[line_frame(values, WIDTH, HEIGHT, max_ping)]
+
+
+def numpy_bars(values, max_ping):
+    return BAR_PALETTE[bar_frame(values, WIDTH, HEIGHT, max_ping)]
+
+
+def to_png(img):
+    bio = io.BytesIO()
+    img.save(bio, format="PNG")
+    return bio.getvalue()
+
+
+def make_buffers(count, max_ping, seed=1):
+    rnd = random.Random(seed)
+    return [[None if rnd.random() < 0.1 else rnd.uniform(0, max_ping * 1.2) for _ in range(WIDTH)]
+            for _ in range(count)]
+
+
+def fps(fn, buffers):
+    t0 = time.perf_counter()
+    for values in buffers:
+        fn(values)
+    return len(buffers) / (time.perf_counter() - t0)
+
+
+def redraw_fps(graph, redraw, buffers):
+    def step(values):
+        graph.values = values
+        redraw()
+    return fps(step, buffers)
+
+
+def report(name, stage, before, after):
+    print(f"{name:<6} {stage:<12} {before:>10.0f}/s {after:>10.0f}/s {after / before:>9.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк рендера графика пинга")
+    parser.add_argument("--frames", type=int, default=2000)
+    args = parser.parse_args()
+
+    cases = [
+        ("line", 300.0, draw_line, numpy_line),
+        ("bars", 100.0, draw_bars, numpy_bars),
+    ]
+    print(f"{'стиль':<6} {'этап':<12} {'до':>12} {'NumPy':>12} {'ускорение':>10}")
+    for name, max_ping, old, new in cases:
+        buffers = make_buffers(args.frames, max_ping)
+        graph = ScrollingGraph(WIDTH, HEIGHT, max_ping, style=name)
+        for values in buffers[:200]:
+            reference = np.asarray(old(values, max_ping))
+            assert np.array_equal(reference, new(values, max_ping)), f"{name}: кадры различаются"
+            graph.values = values
+            graph.redraw()
+            assert graph.image().tobytes() == reference.tobytes(), f"{name}: redraw отличается"
+
+        report(name, "растр", fps(lambda v: old(v, max_ping), buffers),
+               fps(lambda v: Image.fromarray(new(v, max_ping)), buffers))
+        report(name, "растр + PNG", fps(lambda v: to_png(old(v, max_ping)), buffers),
+               fps(lambda v: to_png(Image.fromarray(new(v, max_ping))), buffers))
+        report(name, "redraw", redraw_fps(graph, graph.redraw_columns, buffers),
+               redraw_fps(graph, graph.redraw, buffers))
+
+
+if __name__ == "__main__":
+    main()
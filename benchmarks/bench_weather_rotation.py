@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+bench_weather_rotation.py — джиттер длительности слайдов погодного виджета
+до и после фоновой подкачки.
+
+"до":    запрос погоды в цикле слайдов, затем draw, затем sleep(слайд)
+"после": WeatherPrefetcher в фоне, слайды по TickScheduler
+
+Сеть и устройство заменены заглушками: запрос к Open-Meteo «длится»
+случайно от --min-latency до --max-latency, draw — 5 мс.
+
+Запуск:
+  python3 benchmarks/bench_weather_rotation.py [--slide 0.3] [--rotations 5]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from busybar.scheduler import TickScheduler
+from busybar.timing import PeriodMeter
+from busybar.weather import WeatherPrefetcher
+
+CITIES = {
+    "Dubai": {"lat": 25.276987, "lon": 55.296249},
+    "London": {"lat": 51.5074, "lon": -0.1278},
+    "New York": {"lat": 40.7128, "lon": -74.0060},
+}
+DRAW_S = 0.005
+
+
+def make_fetch(min_latency, max_latency, seed=1):
+    rnd = random.Random(seed)
+
+    def fetch(cities):
+        time.sleep(rnd.uniform(min_latency, max_latency))
+        return {name: {"temperature": 20.0, "weathercode": 0} for name in cities}
+    return fetch
+
+
+def run_blocking(fetch, slide_s, rotations):
+    meter = PeriodMeter(nominal_s=slide_s)
+    for _ in range(rotations):
+        for name in CITIES:
+            fetch({name: CITIES[name]})
+            time.sleep(DRAW_S)
+            meter.tick()
+            time.sleep(slide_s)
+    return meter
+
+
+def run_prefetch(fetch, slide_s, rotations):
+    meter = PeriodMeter(nominal_s=slide_s)
+    prefetcher = WeatherPrefetcher(CITIES, refresh_s=slide_s, fetch=fetch).start()
+    prefetcher.wait_ready()
+    slides = TickScheduler(slide_s, align=False)
+    for _ in range(rotations):
+        snapshot = prefetcher.snapshot()
+        for name in CITIES:
+            snapshot.get(name)
+            slides.wait()
+            time.sleep(DRAW_S)
+            meter.tick()
+    prefetcher.stop()
+    return meter
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Джиттер слайдов погодного виджета")
+    parser.add_argument("--slide", type=float, default=0.3, help="длительность слайда, с")
+    parser.add_argument("--rotations", type=int, default=5)
+    parser.add_argument("--min-latency", type=float, default=0.05)
+    parser.add_argument("--max-latency", type=float, default=0.4)
+    args = parser.parse_args()
+
+    fetch = make_fetch(args.min_latency, args.max_latency)
+    print(run_blocking(fetch, args.slide, args.rotations).summary("до (блокирующий запрос)"))
+    print(run_prefetch(fetch, args.slide, args.rotations).summary("после (фоновая подкачка)"))
+
+
+if __name__ == "__main__":
+    main()
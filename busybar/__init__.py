@@ -0,0 +1,9 @@
+"""
+busybar — общий код для виджетов LED-дисплея 72x16 (HTTP API устройства).
+
+Скрипты в папках clock-widget/, weather-widget/ и ping-monitor/ подключают
+этот пакет, добавляя корень репозитория в sys.path.
+"""
+from busybar.device import DEFAULT_DEVICE_IP, DeviceClient, DeviceGroup, get_client
+
+__all__ = ["DEFAULT_DEVICE_IP", "DeviceClient", "DeviceGroup", "get_client"]
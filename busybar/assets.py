@@ -0,0 +1,63 @@
+"""
+assets.py — учёт содержимого картинок, уже загруженных на устройство.
+
+AssetCache хранит хэш последней успешно загруженной версии каждого
+(app_id, file). Если новая картинка совпадает байт в байт, загрузку
+/api/assets/upload можно пропустить: на устройстве уже лежит то же самое.
+Хэши обязательных ассетов переживают перезапуск процесса — см. manifest.py.
+"""
+import hashlib
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+class AssetCache:
+    """Хэши загруженных ассетов + счётчики сэкономленного трафика."""
+
+    def __init__(self):
+        self._hashes = {}          # (app_id, file) -> sha256 hex
+        self.uploads = 0           # реально выполненные загрузки
+        self.bytes_sent = 0
+        self.skipped = 0           # пропущенные (контент не изменился)
+        self.bytes_saved = 0
+        self.restored = 0          # взяты из манифеста: загружены прошлым запуском
+
+    def is_current(self, app_id, filename, digest):
+        return self._hashes.get((app_id, filename)) == digest
+
+    def get(self, app_id, filename):
+        return self._hashes.get((app_id, filename))
+
+    def remember(self, app_id, filename, digest, size):
+        self._hashes[(app_id, filename)] = digest
+        self.uploads += 1
+        self.bytes_sent += size
+
+    def restore(self, app_id, filename, digest, size):
+        """Контент уже на устройстве по манифесту: запоминаем без загрузки."""
+        self._hashes[(app_id, filename)] = digest
+        self.restored += 1
+        self.bytes_saved += size
+
+    def record_skip(self, size):
+        self.skipped += 1
+        self.bytes_saved += size
+
+    def forget(self, app_id=None, filename=None):
+        """Забывает хэши (например, после ошибки загрузки или перезагрузки устройства)."""
+        if app_id is None:
+            self._hashes.clear()
+        elif filename is None:
+            for key in [k for k in self._hashes if k[0] == app_id]:
+                del self._hashes[key]
+        else:
+            self._hashes.pop((app_id, filename), None)
+
+    def summary(self):
+        total = self.uploads + self.skipped + self.restored
+        ratio = ((self.skipped + self.restored) / total * 100) if total else 0.0
+        restored = f", из манифеста {self.restored}" if self.restored else ""
+        return (f"assets: загружено {self.uploads} ({self.bytes_sent} B), "
+                f"пропущено {self.skipped}{restored} ({self.bytes_saved} B, {ratio:.0f}% запросов)")
@@ -0,0 +1,77 @@
+"""
+breaker.py — автомат защиты (circuit breaker) для запросов к устройству.
+
+Пока устройство выключено, каждый запрос ждёт таймаут, и тик виджета
+растягивается на секунды. CircuitBreaker после FAILURE_THRESHOLD ошибок
+подряд «размыкается»: запросы сразу отклоняются без сети. Через паузу
+пропускается один пробный запрос; если он не прошёл, пауза удваивается
+(до MAX_BACKOFF_S), если прошёл — автомат снова замкнут.
+
+    closed    — обычная работа;
+    open      — запросы отклоняются до истечения паузы;
+    half_open — пауза истекла, в полёте один пробный запрос.
+"""
+import threading
+import time
+
+FAILURE_THRESHOLD = 3
+BASE_BACKOFF_S = 1.0
+MAX_BACKOFF_S = 60.0
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CircuitBreaker:
+    def __init__(self, threshold=FAILURE_THRESHOLD, base_backoff=BASE_BACKOFF_S,
+                 max_backoff=MAX_BACKOFF_S, clock=time.monotonic):
+        self.threshold = threshold
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.state = CLOSED
+        self.failures = 0             # ошибок подряд
+        self.backoff = base_backoff
+        self.retry_at = 0.0
+        self.opened = 0               # сколько раз размыкался
+        self.rejected = 0             # запросов отклонено без сети
+
+    def allow(self):
+        """Можно ли отправить запрос сейчас."""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and self._clock() >= self.retry_at:
+                self.state = HALF_OPEN
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+        """True, если автомат был разомкнут и теперь замкнулся (устройство вернулось)."""
+        with self._lock:
+            recovered = self.state != CLOSED
+            self.state = CLOSED
+            self.failures = 0
+            self.backoff = self.base_backoff
+            return recovered
+
+    def record_failure(self):
+        """True, если после этой ошибки автомат разомкнулся."""
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN:
+                # пробный запрос не прошёл — ждём вдвое дольше
+                self.backoff = min(self.backoff * 2, self.max_backoff)
+            elif self.state == CLOSED and self.failures < self.threshold:
+                return False
+            elif self.state == OPEN:
+                return False
+            self.state = OPEN
+            self.retry_at = self._clock() + self.backoff
+            self.opened += 1
+            return True
+
+    def summary(self):
+        return (f"автомат: {self.state}, размыканий {self.opened}, "
+                f"отклонено без сети {self.rejected}")
@@ -0,0 +1,180 @@
+"""
+compositor.py — один процесс-владелец устройства для нескольких виджетов.
+
+Вместо того чтобы часы, погода и пинг-монитор слали свои draw независимо,
+виджеты подключаются к Compositor как плагины: виджет только готовит кадр
+(элементы + картинки, которые нужно загрузить), а компоновщик на каждом тике
+выбирает один виджет и отправляет его кадр — не больше одного upload
+и одного draw за тик.
+
+Выбор виджета:
+  - по расписанию: виджеты показываются по очереди, каждый dwell_s секунд;
+    виджет без кадра (например, погода ещё не загрузилась) пропускается;
+  - по приоритету: виджет, у которого urgent() == True, вытесняет расписание
+    (из нескольких срочных — с наибольшим priority), пока срочность не пройдёт.
+
+У каждого виджета свой app_id (<app_id компоновщика>_<имя виджета>), и его
+картинки лежат в его приложении. На устройстве видно приложение, которое
+рисовало последним: при смене виджета кадр нового отправляется всегда (даже
+если DrawDiffer помнит его как ещё живой), а элементы прошлого остаются в
+его приложении и не смешиваются с новым кадром, как было бы под общим app_id.
+
+    compositor = Compositor(get_client(), [ClockWidget(), WeatherWidget(cities)])
+    compositor.run()
+"""
+import collections
+
+from busybar.metrics import METRICS
+from busybar.scheduler import TickScheduler
+
+APP_ID = "busybar"
+TICK_INTERVAL = 1.0
+# Доля тика, которую можно потратить на запросы к устройству
+TICK_BUDGET = 0.8
+
+# Кадр виджета: элементы draw (без app_id) и картинки {имя файла: bytes},
+# которые нужно загрузить перед draw (загрузка без изменений пропускается).
+Frame = collections.namedtuple("Frame", "elements assets")
+
+
+class Widget:
+    """Базовый плагин компоновщика; подклассы переопределяют frame() и при необходимости остальное."""
+
+    name = "widget"
+    priority = 0       # чем больше, тем важнее при одновременной срочности
+    dwell_s = 5        # сколько секунд виджет держит экран в расписании
+
+    def start(self):
+        """Запуск фоновой работы (подкачка данных, замеры). Возвращает self."""
+        return self
+
+    def stop(self):
+        pass
+
+    def static_assets(self):
+        """Картинки, которые загружаются один раз при старте: {имя файла: bytes}."""
+        return {}
+
+    def urgent(self):
+        """True — виджет просит экран вне очереди."""
+        return False
+
+    def frame(self, tick):
+        """Frame для тика или None, если показывать нечего."""
+        return None
+
+
+class Compositor:
+    def __init__(self, client, widgets, interval=TICK_INTERVAL, app_id=APP_ID):
+        if not widgets:
+            raise ValueError("нужен хотя бы один виджет")
+        names = [w.name for w in widgets]
+        if len(set(names)) != len(names):
+            raise ValueError(f"имена виджетов должны быть уникальны: {names}")
+        self.client = client
+        self.widgets = list(widgets)
+        self.app_id = app_id
+        self.ticks = TickScheduler(interval)
+        self._current = 0
+        self._shown_since = 0          # тик, с которого текущий виджет в расписании
+        self.shown = collections.Counter()     # тиков на экране по виджетам
+        self.preempted = 0                     # тиков, отданных срочным виджетам
+        self.idle = 0                          # тиков без кадра
+        self._on_screen = None                 # виджет, чей кадр устройство показывает
+
+    # --- приложения на устройстве ---
+    def widget_app_id(self, widget):
+        return f"{self.app_id}_{widget.name}"
+
+    def payload(self, widget, frame):
+        return {"app_id": self.widget_app_id(widget), "elements": list(frame.elements)}
+
+    def upload(self, widget, assets, required=False):
+        """required=True — ассеты, которые нужно загрузить заново после перезагрузки устройства."""
+        send = self.client.require_asset if required else self.client.upload_asset
+        ok = True
+        for filename, data in assets.items():
+            ok = send(self.widget_app_id(widget), filename, data) and ok
+        return ok
+
+    # --- выбор виджета ---
+    def _frame(self, widget, tick):
+        with METRICS.time("busybar_stage_seconds", stage="render", widget=widget.name):
+            return widget.frame(tick)
+
+    def _scheduled(self, tick):
+        """Текущий виджет расписания; переключает на следующий, когда истёк dwell_s."""
+        widget = self.widgets[self._current]
+        if (tick - self._shown_since) * self.ticks.interval >= widget.dwell_s:
+            self._current = (self._current + 1) % len(self.widgets)
+            self._shown_since = tick
+        return self._current
+
+    def choose(self, tick):
+        """(widget, frame) для тика или (None, None)."""
+        urgent = [w for w in self.widgets if w.urgent()]
+        if urgent:
+            widget = max(urgent, key=lambda w: w.priority)
+            frame = self._frame(widget, tick)
+            if frame is not None:
+                self.preempted += 1
+                return widget, frame
+        start = self._scheduled(tick)
+        # виджеты без кадра пропускаем, расписание сдвигается на следующий
+        for step in range(len(self.widgets)):
+            i = (start + step) % len(self.widgets)
+            frame = self._frame(self.widgets[i], tick)
+            if frame is not None:
+                if step:
+                    self._current, self._shown_since = i, tick
+                return self.widgets[i], frame
+        return None, None
+
+    # --- цикл ---
+    def start(self):
+        for widget in self.widgets:
+            self.upload(widget, widget.static_assets(), required=True)
+            widget.start()
+        return self
+
+    def stop(self):
+        for widget in self.widgets:
+            widget.stop()
+
+    def step(self):
+        """Один тик: ждёт дедлайн, выбирает виджет, загружает его картинки и рисует кадр."""
+        tick = self.ticks.wait().index
+        widget, frame = self.choose(tick)
+        if widget is None:
+            self.idle += 1
+            return None
+        self.shown[widget.name] += 1
+        # недоступное устройство не должно растягивать тик
+        with self.client.budget(self.ticks.interval * TICK_BUDGET):
+            self.upload(widget, frame.assets)
+            # другой виджет: его кадр должен стать последним нарисованным, даже если не менялся
+            switched = widget is not self._on_screen
+            if self.client.draw(self.payload(widget, frame), force=switched):
+                self._on_screen = widget
+        return widget
+
+    def run(self):
+        self.start()
+        try:
+            while True:
+                self.step()
+        except KeyboardInterrupt:
+            print("\nОстановлено пользователем.")
+        finally:
+            self.stop()
+            print(self.summary())
+
+    def summary(self):
+        shown = ", ".join(f"{name} {n}" for name, n in self.shown.items()) or "—"
+        return "\n".join([
+            f"экран: {shown}; вне очереди {self.preempted}, пустых тиков {self.idle}",
+            self.client.assets.summary(),
+            self.client.frames.summary(),
+            self.client.breaker.summary(),
+            self.ticks.summary(),
+        ])
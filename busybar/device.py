@@ -0,0 +1,551 @@
+"""
+device.py — клиент HTTP API LED-устройства с постоянным пулом соединений.
+
+Все виджеты ходят на устройство через DeviceClient: одна requests.Session
+на устройство, keep-alive соединения переиспользуются между тиками, так что
+в установившемся режиме тик не открывает ни одного нового TCP-соединения.
+Загрузка ассета пропускается, если на устройстве уже лежит тот же контент
+(см. assets.AssetCache), а draw с тем же кадром — пока элементы не истекают
+(см. draw.DrawDiffer).
+
+Если устройство не отвечает, после нескольких ошибок подряд запросы
+отклоняются сразу, без сети (breaker.CircuitBreaker), а пробные запросы идут
+с растущей паузой. Когда устройство снова отвечает, обязательные ассеты
+(require_asset: логотип, иконки) загружаются заново в фоновом потоке, не в
+бюджете кадра, — после перезагрузки устройства их в памяти нет; если по
+uptime видно, что перезагрузки не было, загружать нечего. Обязательные
+ассеты записываются в манифест на диске (manifest.AssetManifest): после
+перезапуска процесса уже лежащие на устройстве ассеты не загружаются; если запрос не смог соединиться с
+устройством (оно могло перезагрузиться), ассеты загружаются заново при
+следующем успешном запросе (режим проверки connect).
+
+Бюджет времени на тик: внутри `with client.budget(0.8):` таймаут каждого
+запроса не больше оставшегося времени, а если его не осталось, запрос не
+отправляется вовсе (счётчик over_budget). Бюджет берут чуть меньше тика
+(слайда): медленное устройство не задерживает следующий тик дольше, чем
+длится сам тик.
+
+Длительность, результат и размер каждого запроса, а также пропущенные
+запросы пишутся в busybar.metrics (метки device и kind).
+
+Несколько панелей с одним кадром — DeviceGroup: get_client("10.0.4.20,10.0.4.21")
+или get_client([...]) шлёт каждый запрос на все устройства параллельно.
+
+Пример:
+    client = get_client("10.0.4.20")
+    client.upload_asset("ping_app", "graph.png", png_bytes)
+    client.draw({"app_id": "ping_app", "elements": [...]})
+"""
+import contextlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from busybar.assets import AssetCache, content_hash
+from busybar.breaker import CircuitBreaker
+from busybar.draw import DrawDiffer
+from busybar.manifest import BOOT_TOLERANCE_S, VERIFY_CONNECT, VERIFY_OFF, VERIFY_RESYNC, manifest_from_env
+from busybar.metrics import METRICS
+
+# Адрес устройства по умолчанию; можно переопределить переменной окружения
+# (несколько панелей — через запятую)
+DEFAULT_DEVICE_IP = os.environ.get("BUSYBAR_DEVICE", "10.0.4.20")
+
+UPLOAD_PATH = "/api/assets/upload"
+DRAW_PATH = "/api/display/draw"
+# Статус устройства: {"uptime": секунды с загрузки}; нужен только для проверки манифеста.
+# В документированном API его нет: на 404/405 проверяем манифест только по сроку записей
+STATUS_PATH = "/api/status/system"
+NO_STATUS_CODES = (404, 405)
+
+# Таймауты по эндпоинтам: (connect, read) в секундах.
+# Загрузка картинки идёт дольше, чем draw с маленьким JSON.
+DEFAULT_TIMEOUTS = {
+    "upload": (2.0, 5.0),
+    "draw": (2.0, 3.0),
+    "status": (2.0, 2.0),
+}
+
+# Размер пула: виджету хватает пары соединений (upload + draw)
+POOL_MAXSIZE = 4
+
+# Запрос, на который в бюджете осталось меньше, не отправляется
+MIN_REQUEST_S = 0.05
+
+# DeviceGroup: сколько ждать остальные панели после первого успешного ответа
+STRAGGLER_S = 0.2
+
+
+class _Budget:
+    """Бюджет времени на запросы: дедлайн свой у каждого потока."""
+
+    def __init__(self):
+        self._local = threading.local()
+
+    @contextlib.contextmanager
+    def budget(self, seconds):
+        """Все запросы внутри блока (в этом потоке) укладываются в seconds."""
+        outer = self.deadline()
+        deadline = time.monotonic() + seconds
+        self._local.deadline = deadline if outer is None else min(outer, deadline)
+        try:
+            yield
+        finally:
+            self._local.deadline = outer
+
+    def deadline(self):
+        """Дедлайн текущего бюджета (time.monotonic) или None."""
+        return getattr(self._local, "deadline", None)
+
+
+class DeviceClient(_Budget):
+    """Клиент одного устройства: базовый URL, пул соединений, таймауты."""
+
+    def __init__(self, device_ip=DEFAULT_DEVICE_IP, timeouts=None, pool_maxsize=POOL_MAXSIZE,
+                 manifest=None, verify=VERIFY_CONNECT):
+        super().__init__()
+        self.device_ip = device_ip
+        self.base_url = device_ip if "://" in device_ip else f"http://{device_ip}"
+        self.base_url = self.base_url.rstrip("/")
+        self.timeouts = dict(DEFAULT_TIMEOUTS)
+        if timeouts:
+            self.timeouts.update(timeouts)
+
+        self.session = requests.Session()
+        # max_retries=0: повторы решает вызывающий код, тик не должен зависать
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self.assets = AssetCache()
+        self.frames = DrawDiffer()
+        self.breaker = CircuitBreaker()
+        self.required = {}            # (app_id, file) -> bytes: загрузить заново после перезагрузки
+        self.manifest = manifest      # AssetManifest или None
+        self.verify = verify
+        self._unreachable = False     # была ошибка соединения: устройство могло перезагрузиться
+        self._boot_lock = threading.Lock()
+        self._boot_checked = False
+        self.boot = None              # время загрузки устройства (по uptime), если известно
+        # устройство без эндпоинта статуса (запомнено в манифесте) не опрашиваем
+        self._has_status = manifest is None or manifest.has_status(device_ip)
+        self._resync_lock = threading.Lock()
+        self._resync_due = False
+        self._resync_thread = None
+        self.over_budget = 0
+
+    def url(self, path):
+        return self.base_url + path
+
+    def _timeout(self, kind):
+        """(connect, read) с учётом бюджета или None, если времени не осталось."""
+        connect, read = self.timeouts[kind]
+        deadline = self.deadline()
+        if deadline is None:
+            return connect, read
+        remaining = deadline - time.monotonic()
+        if remaining < MIN_REQUEST_S:
+            return None
+        return min(connect, remaining), min(read, remaining)
+
+    # --- запросы ---
+    def _post(self, kind, path, **kwargs):
+        """
+        POST с бюджетом и автоматом защиты: (ok, error). error=None при ok
+        или когда запрос не отправлялся (автомат разомкнут, бюджет исчерпан).
+        """
+        response, error = self._request("POST", kind, path, **kwargs)
+        return response is not None, error
+
+    def _request(self, method, kind, path, **kwargs):
+        """Запрос с бюджетом и автоматом защиты: (ответ или None, error)."""
+        timeout = self._timeout(kind)
+        if timeout is None:
+            self.over_budget += 1
+            self._skipped(kind, "budget")
+            return None, None
+        if not self.breaker.allow():
+            self._skipped(kind, "breaker")
+            return None, None
+        labels = {"device": self.device_ip, "kind": kind}
+        METRICS.inc("busybar_bytes_sent_total", len(kwargs.get("data") or b""), **labels)
+        try:
+            with METRICS.time("busybar_request_seconds", **labels):
+                r = self.session.request(method, self.url(path), timeout=timeout, **kwargs)
+            r.raise_for_status()
+        except requests.HTTPError as e:
+            # 4xx — устройство живо, но запрос отверг: автомат не размыкаем
+            if e.response is not None and e.response.status_code < 500:
+                METRICS.inc("busybar_requests_total", result="http_4xx", **labels)
+                self._device_ok()
+            else:
+                METRICS.inc("busybar_requests_total", result="http_5xx", **labels)
+                self._device_failed()
+            return None, e
+        except Exception as e:
+            METRICS.inc("busybar_requests_total", result="error", **labels)
+            if isinstance(e, requests.ConnectionError) and self.verify != VERIFY_OFF:
+                self._unreachable = True
+            self._device_failed()
+            return None, e
+        METRICS.inc("busybar_requests_total", result="ok", **labels)
+        self._device_ok()
+        return r, None
+
+    def _skipped(self, kind, reason):
+        METRICS.inc("busybar_skipped_total", device=self.device_ip, kind=kind, reason=reason)
+
+    def _device_failed(self):
+        if self.breaker.record_failure():
+            print(f"Устройство {self.device_ip} не отвечает: запросы приостановлены "
+                  f"на {self.breaker.backoff:.0f} с")
+
+    def _device_ok(self):
+        recovered = self.breaker.record_success()
+        if recovered or self._unreachable:
+            self._unreachable = False
+            self._schedule_resync()
+
+    def _schedule_resync(self):
+        """
+        Помечает ассеты устаревшими; загрузка заново — в отдельном потоке, не в
+        бюджете текущего кадра. Пока идёт одна, вторая не запускается: новый
+        запрос на проверку выполнится, когда текущая закончится.
+        """
+        with self._resync_lock:
+            self._resync_due = True
+            if self._resync_thread is not None:
+                return
+            self._resync_thread = threading.Thread(target=self._resync_loop, daemon=True,
+                                                   name=f"resync-{self.device_ip}")
+            self._resync_thread.start()
+
+    def _resync_loop(self):
+        while True:
+            with self._resync_lock:
+                if not self._resync_due:
+                    self._resync_thread = None
+                    return
+                self._resync_due = False
+            try:
+                self._on_recovered()
+            except Exception as e:
+                print(f"Не удалось загрузить ассеты заново на {self.device_ip}:", e)
+
+    def _on_recovered(self):
+        """Устройство вернулось (возможно, после перезагрузки): его память могла очиститься."""
+        boot = self.boot_time() if self.verify != VERIFY_OFF else None
+        if boot is not None and self.boot is not None and abs(boot - self.boot) <= BOOT_TOLERANCE_S:
+            # связь пропадала, но устройство не перезагружалось — ассеты на месте
+            print(f"Устройство {self.device_ip} снова отвечает, перезагрузки не было")
+            return
+        print(f"Устройство {self.device_ip} снова отвечает, загружаем ассеты заново: {len(self.required)}")
+        self.boot = boot
+        self.assets.forget()
+        self.frames.forget()
+        if self.manifest is not None:
+            if boot is None:
+                self.manifest.forget(self.device_ip)
+            else:
+                self.manifest.check_boot(self.device_ip, boot, BOOT_TOLERANCE_S)
+        for (app_id, filename), data in list(self.required.items()):
+            self._upload_required(app_id, filename, data, force=True)
+
+    def boot_time(self):
+        """Unix-время загрузки устройства по его uptime или None (статус недоступен)."""
+        if not self._has_status:
+            return None
+        r, error = self._request("GET", "status", STATUS_PATH)
+        if r is None:
+            response = getattr(error, "response", None)
+            if response is not None and response.status_code in NO_STATUS_CODES:
+                self._has_status = False
+                print(f"Устройство {self.device_ip} не отдаёт статус: перезагрузку видно "
+                      f"только по ошибкам соединения и сроку записей манифеста")
+                if self.manifest is not None:
+                    self.manifest.mark_no_status(self.device_ip)
+            return None
+        try:
+            uptime = float(r.json()["uptime"])
+        except (ValueError, KeyError, TypeError):
+            return None
+        return time.time() - uptime
+
+    def _check_boot(self):
+        """
+        Один раз за процесс: устройство перезагружалось с тех пор, как записан
+        манифест? Тогда его записи забываются, и ассеты грузятся заново.
+        Текущее время загрузки записывается в манифест (в режимах connect и resync).
+        """
+        with self._boot_lock:
+            if self._boot_checked:
+                return
+            self._boot_checked = True
+            boot = self.boot_time()
+            if boot is None:
+                return
+            self.boot = boot
+            known = self.manifest.boot(self.device_ip)
+            if not self.manifest.check_boot(self.device_ip, boot, BOOT_TOLERANCE_S) and known is not None:
+                print(f"Устройство {self.device_ip} перезагружалось, загружаем ассеты заново")
+
+    def require_asset(self, app_id, filename, data):
+        """
+        Загружает ассет, без которого кадры не рисуются, и запоминает его для повторной загрузки.
+        Если по манифесту этот контент уже на устройстве (загружен прошлым запуском), запрос не отправляется.
+        """
+        self.required[(app_id, filename)] = data
+        if self.manifest is not None and self.assets.get(app_id, filename) is None:
+            if self.verify != VERIFY_OFF:
+                # и при resync: без времени загрузки следующий запуск в режиме
+                # connect примет устройство за перезагруженное
+                self._check_boot()
+            digest = content_hash(data)
+            if self.verify != VERIFY_RESYNC and self.manifest.is_current(self.device_ip, app_id, filename, digest):
+                self.assets.restore(app_id, filename, digest, len(data))
+                self._skipped("upload", "manifest")
+                return True
+        return self._upload_required(app_id, filename, data)
+
+    def _upload_required(self, app_id, filename, data, force=False):
+        """upload_asset + запись в манифест: загружено — запоминаем, не удалось — забываем."""
+        uploads = self.assets.uploads
+        ok = self.upload_asset(app_id, filename, data, force)
+        if self.manifest is None:
+            return ok
+        if ok and self.assets.uploads > uploads:
+            self.manifest.remember(self.device_ip, app_id, filename, content_hash(data), len(data))
+        elif not ok and self.manifest.get(self.device_ip, app_id, filename) is not None:
+            self.manifest.forget(self.device_ip, app_id, filename)
+        return ok
+
+    def upload_asset(self, app_id, filename, data, force=False):
+        """Загружает картинку (bytes) в память устройства. Возвращает True/False.
+
+        Если тот же контент уже загружен под этим именем, запрос не отправляется
+        (force=True — загрузить всё равно).
+        """
+        digest = content_hash(data)
+        if not force and self.assets.is_current(app_id, filename, digest):
+            self.assets.record_skip(len(data))
+            self._skipped("upload", "cached")
+            return True
+        ok, error = self._post("upload", UPLOAD_PATH,
+                               params={"app_id": app_id, "file": filename},
+                               data=data,
+                               headers={"Content-Type": "application/octet-stream"})
+        if not ok:
+            # содержимое на устройстве теперь неизвестно — следующую версию грузим заново
+            self.assets.forget(app_id, filename)
+            if error is not None:
+                print(f"Ошибка загрузки {filename} на устройство {self.device_ip}:", error)
+            return False
+        self.assets.remember(app_id, filename, digest, len(data))
+        return True
+
+    def draw(self, payload, force=False):
+        """Отправляет payload в /api/display/draw. Возвращает True/False.
+
+        Повтор того же кадра (включая содержимое картинок) подавляется,
+        пока не пора обновить timeout элементов; force=True — отправить всё равно.
+        """
+        app_id = payload.get("app_id")
+        paths = [el["path"] for el in payload.get("elements", []) if el.get("type") == "image"]
+        fingerprint = self.frames.fingerprint(payload, [self.assets.get(app_id, p) for p in paths])
+        if not force and not self.frames.should_send(app_id, fingerprint):
+            self._skipped("draw", "unchanged")
+            return True
+
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        ok, error = self._post("draw", DRAW_PATH, data=body,
+                               headers={"Content-Type": "application/json; charset=utf-8"})
+        if not ok:
+            self.frames.forget(app_id)
+            if error is not None:
+                print(f"Ошибка display/draw на устройстве {self.device_ip}:", error)
+            return False
+        self.frames.remember(app_id, fingerprint, payload)
+        return True
+
+    def close(self):
+        self.session.close()
+
+
+class _GroupAssets:
+    """AssetCache группы: контент считается загруженным, только если он одинаков на всех устройствах."""
+
+    def __init__(self, clients):
+        self.clients = clients
+
+    def get(self, app_id, filename):
+        digests = {c.assets.get(app_id, filename) for c in self.clients}
+        return digests.pop() if len(digests) == 1 else None
+
+    def forget(self, app_id=None, filename=None):
+        for c in self.clients:
+            c.assets.forget(app_id, filename)
+
+    def summary(self):
+        return _per_device(self.clients, lambda c: c.assets.summary())
+
+
+class _GroupFrames:
+    def __init__(self, clients):
+        self.clients = clients
+
+    def forget(self, app_id=None):
+        for c in self.clients:
+            c.frames.forget(app_id)
+
+    def summary(self):
+        return _per_device(self.clients, lambda c: c.frames.summary())
+
+
+class _GroupBreaker:
+    def __init__(self, clients):
+        self.clients = clients
+
+    def summary(self):
+        return _per_device(self.clients, lambda c: c.breaker.summary())
+
+
+def _per_device(clients, line):
+    return "\n".join(f"[{c.device_ip}] {line(c)}" for c in clients)
+
+
+class DeviceGroup(_Budget):
+    """
+    Несколько панелей с одинаковым кадром: тот же интерфейс, что у DeviceClient
+    (upload_asset, require_asset, draw, budget), но каждый вызов уходит на все
+    устройства параллельно. У каждого устройства свой DeviceClient — свой пул
+    соединений, кэш ассетов, DrawDiffer и автомат защиты, — и свои потоки.
+
+    Вызов ждёт все устройства, но не дольше бюджета, а после первого успешного
+    ответа — не дольше STRAGGLER_S: здоровые панели отвечают почти вместе, а
+    медленная не задерживает остальных (в том числе загрузку слотов без
+    бюджета) и догружает в фоне. Мёртвое после размыкания автомата
+    отвечает сразу. Если предыдущий запрос того же вида к устройству ещё не
+    завершён, новый ему не отправляется (устройство догонит следующим кадром) —
+    медленная панель не копит очередь.
+
+    Результат True, если запрос прошёл хотя бы на одно устройство: здоровье
+    отдельных панелей — в breaker.summary() и метриках (метка device).
+    """
+
+    def __init__(self, device_ips, timeouts=None, pool_maxsize=POOL_MAXSIZE,
+                 manifest=None, verify=VERIFY_CONNECT):
+        super().__init__()
+        if not device_ips:
+            raise ValueError("нужно хотя бы одно устройство")
+        self.clients = [DeviceClient(ip, timeouts, pool_maxsize, manifest, verify) for ip in device_ips]
+        self.device_ip = ",".join(device_ips)
+        # потоков на устройство — как соединений в пуле: upload слотов и draw не ждут друг друга
+        self._workers = {c.device_ip: ThreadPoolExecutor(pool_maxsize, thread_name_prefix=f"device-{c.device_ip}")
+                         for c in self.clients}
+        self._inflight = {}           # (device_ip, метод) -> Future
+        self._lock = threading.Lock()
+        self.assets = _GroupAssets(self.clients)
+        self.frames = _GroupFrames(self.clients)
+        self.breaker = _GroupBreaker(self.clients)
+        self.busy = 0                 # запросов не отправлено: устройство занято прошлым
+
+    @property
+    def over_budget(self):
+        return sum(c.over_budget for c in self.clients)
+
+    @staticmethod
+    def _call(client, deadline, method, args, kwargs):
+        if deadline is None:
+            return getattr(client, method)(*args, **kwargs)
+        with client.budget(deadline - time.monotonic()):
+            return getattr(client, method)(*args, **kwargs)
+
+    def _fanout(self, method, *args, **kwargs):
+        deadline = self.deadline()
+        futures = []
+        with self._lock:
+            for c in self.clients:
+                key = (c.device_ip, method)
+                prev = self._inflight.get(key)
+                if prev is not None and not prev.done():
+                    self.busy += 1
+                    METRICS.inc("busybar_skipped_total", device=c.device_ip, kind=method, reason="busy")
+                    continue
+                future = self._workers[c.device_ip].submit(self._call, c, deadline, method, args, kwargs)
+                self._inflight[key] = future
+                futures.append(future)
+        return any(f.result() for f in self._wait(futures, deadline) if f.exception() is None)
+
+    @staticmethod
+    def _wait(futures, deadline):
+        """
+        Завершившиеся запросы: ждём все, но не дольше бюджета, а после первого
+        успешного — не дольше STRAGGLER_S (медленная панель догружает в фоне).
+        """
+        done, pending = set(), set(futures)
+        straggle_until = None
+        while pending:
+            limits = [t for t in (deadline, straggle_until) if t is not None]
+            timeout = max(min(limits) - time.monotonic(), 0) if limits else None
+            finished, pending = wait(pending, timeout, return_when=FIRST_COMPLETED)
+            if not finished:
+                break
+            done |= finished
+            if straggle_until is None and any(f.exception() is None and f.result() for f in finished):
+                straggle_until = time.monotonic() + STRAGGLER_S
+        return done
+
+    def require_asset(self, app_id, filename, data):
+        return self._fanout("require_asset", app_id, filename, data)
+
+    def upload_asset(self, app_id, filename, data, force=False):
+        return self._fanout("upload_asset", app_id, filename, data, force=force)
+
+    def draw(self, payload, force=False):
+        return self._fanout("draw", payload, force=force)
+
+    def close(self):
+        for worker in self._workers.values():
+            worker.shutdown(wait=False)
+        for c in self.clients:
+            c.close()
+
+
+def parse_devices(device_ip):
+    """Адрес, список адресов или строка через запятую -> кортеж адресов."""
+    if isinstance(device_ip, str):
+        device_ip = device_ip.split(",")
+    ips = []
+    for item in device_ip:
+        ips.extend(ip.strip() for ip in item.split(",") if ip.strip())
+    return tuple(dict.fromkeys(ips))
+
+
+_clients = {}
+# клиентов запрашивают из нескольких потоков (виджеты, конвейер): без блокировки
+# два потока создавали бы по своему клиенту с отдельным пулом и автоматом защиты
+_clients_lock = threading.Lock()
+
+
+def get_client(device_ip=DEFAULT_DEVICE_IP):
+    """
+    Возвращает общий клиент для адреса (один пул на устройство в процессе).
+    Несколько адресов (список или через запятую) — DeviceGroup на все панели.
+    Манифест ассетов и режим проверки — из окружения (manifest.manifest_from_env).
+    """
+    ips = parse_devices(device_ip)
+    with _clients_lock:
+        client = _clients.get(ips)
+        if client is None:
+            manifest, verify = manifest_from_env()
+            if len(ips) == 1:
+                client = DeviceClient(ips[0], manifest=manifest, verify=verify)
+            else:
+                client = DeviceGroup(ips, manifest=manifest, verify=verify)
+            _clients[ips] = client
+    return client
@@ -0,0 +1,66 @@
+"""
+draw.py — подавление повторных /api/display/draw с тем же содержимым.
+
+DrawDiffer помнит последний отправленный кадр для каждого app_id. Точный
+повтор не отправляется, пока не подошло время обновить элементы: у каждого
+элемента есть timeout (сек), после которого устройство его убирает, поэтому
+тот же кадр переотправляется заранее — контент на экране не пропадает.
+"""
+import json
+import time
+
+# Переотправляем кадр за REFRESH_MARGIN_S до истечения минимального timeout
+# (но не чаще, чем раз в половину timeout)
+REFRESH_MARGIN_S = 1.0
+
+
+def refresh_after(payload):
+    """Через сколько секунд кадр нужно переотправить (None — элементы не истекают)."""
+    timeouts = [el["timeout"] for el in payload.get("elements", []) if el.get("timeout")]
+    if not timeouts:
+        return None
+    t = min(timeouts)
+    return max(t - REFRESH_MARGIN_S, t * 0.5)
+
+
+class DrawDiffer:
+    """Последний кадр по app_id + счётчики отправленных и подавленных draw."""
+
+    def __init__(self, clock=time.monotonic):
+        self._clock = clock
+        self._last = {}            # app_id -> (fingerprint, sent_at, refresh_after)
+        self.sent = 0
+        self.refreshed = 0         # из sent: повтор ради обновления timeout
+        self.suppressed = 0
+
+    @staticmethod
+    def fingerprint(payload, asset_hashes=()):
+        """Канонический вид кадра. asset_hashes — хэши картинок, на которые он ссылается:
+        перезагруженный graph.png с тем же именем — это уже другой кадр."""
+        body = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+        return body + "|" + ",".join(h or "" for h in asset_hashes)
+
+    def should_send(self, app_id, fingerprint):
+        last = self._last.get(app_id)
+        if last is None or last[0] != fingerprint:
+            return True
+        _, sent_at, refresh = last
+        if refresh is not None and self._clock() - sent_at >= refresh:
+            self.refreshed += 1
+            return True
+        self.suppressed += 1
+        return False
+
+    def remember(self, app_id, fingerprint, payload):
+        self._last[app_id] = (fingerprint, self._clock(), refresh_after(payload))
+        self.sent += 1
+
+    def forget(self, app_id=None):
+        if app_id is None:
+            self._last.clear()
+        else:
+            self._last.pop(app_id, None)
+
+    def summary(self):
+        return (f"draw: отправлено {self.sent} (из них обновлений {self.refreshed}), "
+                f"подавлено {self.suppressed}")
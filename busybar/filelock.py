@@ -0,0 +1,44 @@
+"""
+filelock.py — блокировка общего файла между процессами.
+
+JSON-файлы, которые пишут несколько процессов (манифест ассетов, кэш погоды),
+правятся циклом «прочитать — изменить — заменить через os.replace». Чтобы два
+процесса не затёрли изменения друг друга, весь цикл идёт под flock на соседнем
+файле <path>.lock: сам файл при записи подменяется, держать блокировку на нём
+нельзя.
+
+    with locked(path):
+        entries = load(path)
+        ...
+        save(path, entries)
+
+Без fcntl (Windows) или если файл блокировки не создать, блокировки между
+процессами нет — как у истории пинга (busybar.history).
+"""
+import contextlib
+import os
+
+try:
+    import fcntl
+except ImportError:            # Windows: без блокировки между процессами
+    fcntl = None
+
+
+@contextlib.contextmanager
+def locked(path):
+    """Исключительная блокировка <path>.lock на время блока (ждёт другие процессы)."""
+    fd = None
+    if fcntl is not None:
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            fd = os.open(f"{path}.lock", os.O_RDWR | os.O_CREAT, 0o644)
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        except OSError:
+            if fd is not None:
+                os.close(fd)
+            fd = None
+    try:
+        yield
+    finally:
+        if fd is not None:
+            os.close(fd)        # закрытие снимает flock
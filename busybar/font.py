@@ -0,0 +1,131 @@
+"""
+font.py — растровые шрифты устройства для симулятора.
+
+По описанию API у устройства три шрифта: small (высота 5), medium (7) и
+big (10). Точные глифы устройства неизвестны, поэтому здесь базовый шрифт 3x5,
+из которого остальные получаются масштабированием:
+    small  — 3x5,  шаг 4 px (так считают ширину текста clock-2.py и др.);
+    medium — 3x7,  строки 1 и 3 удвоены, шаг 4 px;
+    big    — 6x10, удвоение по обеим осям, шаг 7 px.
+Строчные буквы рисуются как прописные, неизвестные символы — рамкой.
+Ширина строки (text_width) считается по глифам — до последнего горящего
+пикселя, как строка и будет нарисована.
+"""
+
+# Глифы 3x5: строки сверху вниз, "#" — горящий пиксель
+GLYPHS_3X5 = {
+    " ": "...,...,...,...,...",
+    "0": "###,#.#,#.#,#.#,###",
+    "1": ".#.,##.,.#.,.#.,###",
+    "2": "###,..#,###,#..,###",
+    "3": "###,..#,.##,..#,###",
+    "4": "#.#,#.#,###,..#,..#",
+    "5": "###,#..,###,..#,###",
+    "6": "###,#..,###,#.#,###",
+    "7": "###,..#,.#.,.#.,.#.",
+    "8": "###,#.#,###,#.#,###",
+    "9": "###,#.#,###,..#,###",
+    "A": ".#.,#.#,###,#.#,#.#",
+    "B": "##.,#.#,##.,#.#,##.",
+    "C": ".##,#..,#..,#..,.##",
+    "D": "##.,#.#,#.#,#.#,##.",
+    "E": "###,#..,##.,#..,###",
+    "F": "###,#..,##.,#..,#..",
+    "G": ".##,#..,#.#,#.#,.##",
+    "H": "#.#,#.#,###,#.#,#.#",
+    "I": "###,.#.,.#.,.#.,###",
+    "J": "..#,..#,..#,#.#,.#.",
+    "K": "#.#,#.#,##.,#.#,#.#",
+    "L": "#..,#..,#..,#..,###",
+    "M": "#.#,###,###,#.#,#.#",
+    "N": "##.,#.#,#.#,#.#,#.#",
+    "O": ".#.,#.#,#.#,#.#,.#.",
+    "P": "##.,#.#,##.,#..,#..",
+    "Q": ".#.,#.#,#.#,##.,.##",
+    "R": "##.,#.#,##.,#.#,#.#",
+    "S": ".##,#..,.#.,..#,##.",
+    "T": "###,.#.,.#.,.#.,.#.",
+    "U": "#.#,#.#,#.#,#.#,###",
+    "V": "#.#,#.#,#.#,#.#,.#.",
+    "W": "#.#,#.#,###,###,#.#",
+    "X": "#.#,#.#,.#.,#.#,#.#",
+    "Y": "#.#,#.#,.#.,.#.,.#.",
+    "Z": "###,..#,.#.,#..,###",
+    ".": "...,...,...,...,.#.",
+    ",": "...,...,...,.#.,#..",
+    ":": "...,.#.,...,.#.,...",
+    ";": "...,.#.,...,.#.,#..",
+    "-": "...,...,###,...,...",
+    "+": "...,.#.,###,.#.,...",
+    "=": "...,###,...,###,...",
+    "/": "..#,..#,.#.,#..,#..",
+    "%": "#.#,..#,.#.,#..,#.#",
+    "!": ".#.,.#.,.#.,...,.#.",
+    "?": "##.,..#,.#.,...,.#.",
+    "(": "..#,.#.,.#.,.#.,..#",
+    ")": "#..,.#.,.#.,.#.,#..",
+    "_": "...,...,...,...,###",
+    "'": ".#.,.#.,...,...,...",
+    '"': "#.#,#.#,...,...,...",
+    "<": "..#,.#.,#..,.#.,..#",
+    ">": "#..,.#.,..#,.#.,#..",
+    "*": "#.#,.#.,#.#,...,...",
+    "#": "#.#,###,#.#,###,#.#",
+    "°": "##.,##.,...,...,...",
+}
+UNKNOWN = "###,#.#,#.#,#.#,###"
+
+
+def _parse(glyph):
+    return [[c == "#" for c in row] for row in glyph.split(",")]
+
+
+class Font:
+    """Масштабированный 3x5: rows/cols — какие строки/столбцы базового глифа идут в итоговый."""
+
+    def __init__(self, name, rows, cols, advance):
+        self.name = name
+        self.height = len(rows)
+        self.width = len(cols)
+        self.advance = advance
+        self._rows = rows
+        self._cols = cols
+        self._cache = {}
+
+    def glyph(self, ch):
+        """Глиф символа: список строк из bool (height x width)."""
+        g = self._cache.get(ch)
+        if g is None:
+            base = _parse(GLYPHS_3X5.get(ch) or GLYPHS_3X5.get(ch.upper()) or UNKNOWN)
+            g = self._cache[ch] = [[base[r][c] for c in self._cols] for r in self._rows]
+        return g
+
+    def ink_width(self, ch):
+        """Сколько столбцов глифа занято: до последнего горящего пикселя (у пробела — 0)."""
+        return max((x + 1 for row in self.glyph(ch) for x, on in enumerate(row) if on), default=0)
+
+    def text_width(self, text):
+        """Ширина строки, как её рисует pixels(): до последнего горящего пикселя, без шага после него."""
+        width = 0
+        for i, ch in enumerate(text):
+            ink = self.ink_width(ch)
+            if ink:
+                width = i * self.advance + ink
+        return width
+
+    def pixels(self, text):
+        """Координаты (x, y) горящих пикселей строки относительно её левого верхнего угла."""
+        out = []
+        for i, ch in enumerate(text):
+            for y, row in enumerate(self.glyph(ch)):
+                for x, on in enumerate(row):
+                    if on:
+                        out.append((i * self.advance + x, y))
+        return out
+
+
+FONTS = {
+    "small": Font("small", [0, 1, 2, 3, 4], [0, 1, 2], 4),
+    "medium": Font("medium", [0, 1, 1, 2, 3, 3, 4], [0, 1, 2], 4),
+    "big": Font("big", [0, 0, 1, 1, 2, 2, 3, 3, 4, 4], [0, 0, 1, 1, 2, 2], 7),
+}
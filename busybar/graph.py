@@ -0,0 +1,313 @@
+"""
+graph.py — рендер графика пинга в PNG.
+
+ScrollingGraph держит постоянный кадровый буфер индексов палитры: на каждый
+замер дорисовывается только новый столбец, PNG с палитрой кодируется без
+Pillow (busybar.png). Результат попиксельно совпадает с прежней отрисовкой
+через ImageDraw (draw.point/draw.line) — это сверяет benchmarks/bench_render.py.
+
+Полная перерисовка (старт, смена масштаба) у стилей line и bars векторная:
+высоты столбиков/отрезки линии и уровни цветов по порогам считаются одним
+проходом NumPy по всему окну (line_frame, bar_frame). Без NumPy кадр
+перерисовывается по столбцам.
+
+Стили:
+    "line"  — линия (ping-monitor-1)
+    "bars"  — цветные столбики по порогам (ping-monitor-2/3, виджет демона)
+    "range" — для частых замеров: столбец (Column) рисуется полосой от min
+              до max, среднее — яркой точкой, потери — точкой LOSS_COLOR
+              в верхней строке.
+
+Pillow нужен только ScrollingGraph.image() (отладка) и бенчмарку.
+"""
+import collections
+
+from busybar.png import IndexedPngEncoder
+
+try:
+    import numpy as np
+except ImportError:  # NumPy необязателен: без него перерисовываем по столбцам
+    np = None
+
+BACKGROUND = (0, 0, 0, 255)
+LINE_COLOR = (170, 255, 0, 255)
+
+# Пороги столбиков: (до какого пинга включительно, цвет)
+BAR_LEVELS = (
+    (20, (0, 255, 0, 255)),             # зелёный
+    (50, (255, 255, 0, 255)),           # жёлтый
+    (float("inf"), (255, 0, 0, 255)),   # красный
+)
+
+# Стиль "range": полоса min..max тусклее цвета уровня, потери — отдельным цветом
+RANGE_DIM = 0.35
+LOSS_COLOR = (255, 0, 255, 255)
+
+# Столбец графика из нескольких замеров: RTT в мс (None — все потеряны),
+# сколько потеряно и сколько замеров всего
+Column = collections.namedtuple("Column", "min avg max lost count")
+
+
+def make_column(values):
+    """Замеры одного столбца (RTT или None) -> Column."""
+    rtts = [v for v in values if v is not None]
+    if not rtts:
+        return Column(None, None, None, len(values), len(values))
+    return Column(min(rtts), sum(rtts) / len(rtts), max(rtts), len(values) - len(rtts), len(values))
+
+
+def _dim(color, k=RANGE_DIM):
+    r, g, b, a = color
+    return int(r * k), int(g * k), int(b * k), a
+
+
+def _as_array(values, width):
+    """Список с None -> float64 массив длины <= width (NaN вместо None)."""
+    vals = list(values)[:width]
+    return np.array([np.nan if v is None else v for v in vals], dtype=np.float64)
+
+
+def line_frame(values, width, height, max_ping):
+    """Кадр линии одним проходом NumPy: uint8 (height, width), 1 — линия, 0 — фон."""
+    v = _as_array(values, width)
+    n = len(v)
+    valid = ~np.isnan(v)
+    vv = np.clip(np.where(valid, v, 0.0), 0.0, max_ping)
+    y = np.rint((1.0 - vv / max_ping) * (height - 1)).astype(np.int64)
+
+    # Каждый столбец линии — непрерывный отрезок [lo, hi] вокруг своей точки:
+    # отрезок (x, y0)->(x+1, y1) у ImageDraw отдаёт левому столбцу
+    # (|dy|+1)//2 пикселей, правому — остальные (как _line_span).
+    lo = y.copy()
+    hi = y.copy()
+    if n > 1:
+        pair = valid[:-1] & valid[1:]
+        y0, y1 = y[:-1], y[1:]
+        d = np.abs(y1 - y0)
+        left = np.maximum((d + 1) // 2, 1)      # пикселей у левого столбца
+        down = y1 > y0
+        up = y1 < y0
+        # левый столбец: от y0 в сторону y1
+        l_lo = np.where(up, y0 - left + 1, y0)
+        l_hi = np.where(down, y0 + left - 1, y0)
+        # правый столбец: оставшаяся часть до y1
+        r_lo = np.where(down, y0 + left, y1)
+        r_hi = np.where(up, y0 - left, y1)
+        lo[:-1] = np.where(pair, np.minimum(lo[:-1], l_lo), lo[:-1])
+        hi[:-1] = np.where(pair, np.maximum(hi[:-1], l_hi), hi[:-1])
+        lo[1:] = np.where(pair, np.minimum(lo[1:], r_lo), lo[1:])
+        hi[1:] = np.where(pair, np.maximum(hi[1:], r_hi), hi[1:])
+
+    rows = np.arange(height)[:, None]
+    frame = np.zeros((height, width), dtype=np.uint8)
+    frame[:, :n] = (rows >= lo) & (rows <= hi) & valid
+    return frame
+
+
+def bar_frame(values, width, height, max_ping, levels=BAR_LEVELS):
+    """Кадр столбиков одним проходом NumPy: uint8 (height, width), 1 + номер уровня — столбик, 0 — фон."""
+    v = _as_array(values, width)
+    n = len(v)
+    valid = ~np.isnan(v)
+    vv = np.clip(np.where(valid, v, 0.0), 0.0, max_ping)
+    h = np.rint(vv / max_ping * (height - 1)).astype(np.int64)
+    # как _bar_span: при h=0 остаётся нижний пиксель
+    top = height - np.maximum(h, 1)
+    thresholds = np.array([limit for limit, _ in levels], dtype=np.float64)
+    level = np.minimum(np.searchsorted(thresholds, vv, side="left"), len(levels) - 1)
+
+    rows = np.arange(height)[:, None]
+    frame = np.zeros((height, width), dtype=np.uint8)
+    frame[:, :n] = np.where((rows >= top) & valid, level + 1, 0)
+    return frame
+
+
+def _bar_span(v, height, max_ping, levels):
+    """Столбик одного значения: (top, bottom, номер уровня) или None."""
+    if v is None:
+        return None
+    v = max(0.0, min(v, max_ping))
+    h = int(round((v / max_ping) * (height - 1)))
+    level = next(i for i, (limit, _) in enumerate(levels) if v <= limit)
+    return height - max(h, 1), height - 1, level
+
+
+def _level(v, max_ping, levels):
+    v = max(0.0, min(v, max_ping))
+    return next(i for i, (limit, _) in enumerate(levels) if v <= limit)
+
+
+def _line_y(v, height, max_ping):
+    if v is None:
+        return None
+    vv = max(0.0, min(v, max_ping))
+    return int(round((1.0 - (vv / max_ping)) * (height - 1)))
+
+
+def _line_span(y_prev, y, y_next):
+    """Отрезок столбца линии: своя точка + части соседних отрезков (как у ImageDraw)."""
+    lo = hi = y
+    if y_prev is not None:
+        d = abs(y - y_prev)
+        left = max((d + 1) // 2, 1)
+        if y > y_prev:
+            lo = min(lo, y_prev + left)
+        elif y < y_prev:
+            hi = max(hi, y_prev - left)
+    if y_next is not None:
+        d = abs(y_next - y)
+        left = max((d + 1) // 2, 1)
+        if y_next > y:
+            hi = max(hi, y + left - 1)
+        elif y_next < y:
+            lo = min(lo, y - left + 1)
+    return lo, hi
+
+
+def _peak(v):
+    return v.max if isinstance(v, Column) else v
+
+
+class ScrollingGraph:
+    """
+    График с постоянным кадровым буфером индексов палитры (1 байт на пиксель):
+    на новый замер буфер сдвигается на столбец влево и растеризуется только
+    новый столбец (для линии — ещё предыдущий и крайний левый: отрезки линии
+    делятся между соседними столбцами). Полная перерисовка — только при смене
+    масштаба. PNG кодируется прямо из буфера, без промежуточной картинки.
+    """
+
+    def __init__(self, width, height, max_ping, style="bars", levels=BAR_LEVELS,
+                 autoscale_step=None):
+        self.width = width
+        self.height = height
+        self.max_ping = max_ping
+        self.base_max_ping = max_ping
+        self.style = style
+        self.levels = levels
+        self.autoscale_step = autoscale_step   # шаг автомасштаба (мс) или None
+        self.values = [None] * width
+        self.full_redraws = 0
+
+        # индекс 0 — фон, дальше цвет линии или цвета уровней столбиков;
+        # у "range" — тусклые цвета уровней (полоса), яркие (среднее) и цвет потерь
+        if style == "line":
+            self.palette = [BACKGROUND, LINE_COLOR]
+        elif style == "range":
+            self.palette = ([BACKGROUND] + [_dim(color) for _, color in levels]
+                            + [color for _, color in levels] + [LOSS_COLOR])
+        else:
+            self.palette = [BACKGROUND] + [color for _, color in levels]
+        self.encoder = IndexedPngEncoder()
+        self._fb = bytearray(width * height)
+        self._mv = memoryview(self._fb)
+
+    def _scale_for(self, values):
+        top = max((_peak(v) for v in values if _peak(v) is not None), default=0.0)
+        step = self.autoscale_step
+        return max(self.base_max_ping, -(-top // step) * step)
+
+    def _paint_column(self, x, lo, hi, index):
+        fb, w = self._fb, self.width
+        for y in range(self.height):
+            fb[y * w + x] = index if lo <= y <= hi else 0
+
+    def _render_range(self, x):
+        col = self.values[x]
+        self._paint_column(x, 1, 0, 0)
+        if col is None:
+            return
+        fb, w, n = self._fb, self.width, len(self.levels)
+        if col.max is not None:
+            top = _line_y(col.max, self.height, self.max_ping)
+            bottom = _line_y(col.min, self.height, self.max_ping)
+            band = 1 + _level(col.max, self.max_ping, self.levels)
+            for y in range(top, bottom + 1):
+                fb[y * w + x] = band
+            y = _line_y(col.avg, self.height, self.max_ping)
+            fb[y * w + x] = 1 + n + _level(col.avg, self.max_ping, self.levels)
+        if col.lost:
+            fb[x] = 1 + 2 * n
+
+    def _render_column(self, x):
+        if self.style == "range":
+            self._render_range(x)
+        elif self.style == "line":
+            ys = [_line_y(self.values[i], self.height, self.max_ping) if 0 <= i < self.width else None
+                  for i in (x - 1, x, x + 1)]
+            if ys[1] is None:
+                self._paint_column(x, 1, 0, 0)
+            else:
+                lo, hi = _line_span(*ys)
+                self._paint_column(x, lo, hi, 1)
+        else:
+            span = _bar_span(self.values[x], self.height, self.max_ping, self.levels)
+            if span is None:
+                self._paint_column(x, 1, 0, 0)
+            else:
+                self._paint_column(x, span[0], span[1], span[2] + 1)
+
+    def redraw(self):
+        """Полная перерисовка (смена масштаба) — O(width x height), у line/bars — векторно."""
+        if np is not None and self.style == "line":
+            self._fb[:] = line_frame(self.values, self.width, self.height, self.max_ping).tobytes()
+        elif np is not None and self.style == "bars":
+            self._fb[:] = bar_frame(self.values, self.width, self.height, self.max_ping,
+                                    self.levels).tobytes()
+        else:
+            self.redraw_columns()
+            return
+        self.full_redraws += 1
+
+    def redraw_columns(self):
+        """Полная перерисовка по столбцам, без NumPy."""
+        for x in range(self.width):
+            self._render_column(x)
+        self.full_redraws += 1
+
+    def push(self, value):
+        """
+        Добавляет замер справа (RTT, None или Column). В обычном случае — O(height).
+        Стили line и bars рисуют у Column среднее.
+        """
+        if self.style == "range":
+            if value is not None and not isinstance(value, Column):
+                value = Column(value, value, value, 0, 1)
+        elif isinstance(value, Column):
+            value = value.avg
+        self.values.pop(0)
+        self.values.append(value)
+        if self.autoscale_step:
+            scale = self._scale_for(self.values)
+            if scale != self.max_ping:
+                self.max_ping = scale
+                self.redraw()
+                return
+        mv, w = self._mv, self.width
+        for y in range(self.height):
+            start = y * w
+            mv[start:start + w - 1] = mv[start + 1:start + w]
+        if self.style == "line":
+            self._render_column(0)
+            self._render_column(self.width - 2)
+        self._render_column(self.width - 1)
+
+    def pixels(self):
+        """Кадровый буфер: индексы палитры, построчно."""
+        return self._fb
+
+    def rgba_rows(self):
+        """Кадр строками цветов (r, g, b, a) — для сборки экрана целиком (busybar.raster)."""
+        w, palette = self.width, self.palette
+        return [[palette[i] for i in self._fb[y * w:(y + 1) * w]] for y in range(self.height)]
+
+    def image(self):
+        """Кадр как RGBA-картинка Pillow (для отладки и композиции)."""
+        from PIL import Image
+        img = Image.frombytes("P", (self.width, self.height), bytes(self._fb))
+        img.putpalette(b"".join(bytes(c) for c in self.palette), "RGBA")
+        return img.convert("RGBA")
+
+    def png(self):
+        """PNG с палитрой (размер и время кодирования — в self.encoder)."""
+        return self.encoder.encode(self.width, self.height, self._fb, self.palette)
@@ -0,0 +1,217 @@
+"""
+history.py — история замеров пинга в файле, отображённом в память (mmap).
+
+После перезапуска монитор открывает тот же файл и сразу рисует последнее
+окно графика вместо 72 секунд пустоты. Файл фиксированного размера:
+
+    заголовок  16 байт   — магия, версия, max_hosts, capacity, шаг замеров (с);
+    хосты      max_hosts x 56 байт — имя (UTF-8, 48 байт; длинное —
+               с хэшем вместо хвоста) и счётчик записей;
+    кольца     max_hosts x capacity x 12 байт — (unix-время double, RTT мс float,
+               NaN — потеря).
+
+Замер — запись одной 12-байтной записи в кольцо хоста и 8-байтного счётчика
+после неё; файл целиком не переписывается. Писатель один (flock), читать
+файл можно из любого процесса без связи с монитором (ping-history.py).
+Файл с другим шагом замеров (монитор перезапущен с другим --rate)
+начинается заново: пропуски и столбцы при восстановлении считаются по шагу.
+
+    history = PingHistory(path)
+    history.append("1.2.3.4", time.time(), 23.5)
+    history.last("1.2.3.4", 72)     # [(ts, rtt или None), ...]
+"""
+import hashlib
+import math
+import mmap
+import os
+import struct
+
+try:
+    import fcntl
+except ImportError:            # Windows: без блокировки, писатель должен быть один
+    fcntl = None
+
+MAGIC = b"BBPH"
+VERSION = 2
+# Хостов в файле по умолчанию; open_history расширяет под список хостов
+MAX_HOSTS = 32
+# Записей на хост: больше часа при замере раз в секунду, ~7 минут при 10 Гц
+# (окну графика в 72 столбца по 10 замеров хватает)
+CAPACITY = 4096
+DEFAULT_PATH = os.path.join(os.path.expanduser("~"), ".cache", "busybar", "ping-history.bin")
+
+HEADER = struct.Struct("<4sHHIf")
+HEADER_SIZE = 16
+NAME_SIZE = 48
+HOST = struct.Struct(f"<{NAME_SIZE}sQ")
+COUNT = struct.Struct("<Q")
+RECORD = struct.Struct("<df")
+
+
+def host_key(host):
+    """
+    Имя хоста в таблице файла (bytes, не длиннее NAME_SIZE). Длинное имя
+    обрезается, а хвост заменяется хэшем полного имени — после перезапуска
+    оно находит тот же слот, и разные длинные имена не сливаются.
+    """
+    name = host.encode("utf-8")
+    if len(name) <= NAME_SIZE:
+        return name
+    digest = hashlib.sha1(name).hexdigest()[:12].encode("ascii")
+    # обрезаем по границе символа UTF-8
+    head = name[:NAME_SIZE - len(digest) - 1].decode("utf-8", "ignore").encode("utf-8")
+    return head + b"#" + digest
+
+
+def same_period(a, b):
+    """Шаги замеров совпадают (в заголовке шаг хранится как float32)."""
+    return abs(a - b) <= 1e-6 * max(a, b)
+
+
+def file_size(capacity, max_hosts):
+    return HEADER_SIZE + max_hosts * HOST.size + max_hosts * capacity * RECORD.size
+
+
+class PingHistory:
+    """
+    Кольцевые буферы замеров по хостам в одном файле. readonly=True — для
+    внешних читателей: файл не создаётся и не блокируется.
+    """
+
+    def __init__(self, path=DEFAULT_PATH, capacity=CAPACITY, max_hosts=MAX_HOSTS, readonly=False,
+                 period_s=1.0):
+        self.path = path
+        self.readonly = readonly
+        if readonly:
+            self._file = open(path, "rb")
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, self.max_hosts, self.capacity, self.period_s = HEADER.unpack_from(self._mm, 0)
+            if magic != MAGIC or version != VERSION:
+                self.close()
+                raise ValueError(f"{path}: не файл истории пинга")
+        else:
+            self._open_writer(capacity, max_hosts, period_s)
+        self._slots = self._read_hosts()
+
+    def _open_writer(self, capacity, max_hosts, period_s):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        self._file = os.fdopen(fd, "r+b")
+        if fcntl is not None:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                self._file.close()
+                raise OSError(f"{self.path}: историю уже пишет другой процесс")
+        header = self._file.read(HEADER.size)
+        fresh = True
+        if len(header) == HEADER.size:
+            magic, version, file_hosts, file_capacity, file_period = HEADER.unpack(header)
+            # файл, рассчитанный на большее число хостов, подходит как есть
+            if (magic, version, file_capacity) == (MAGIC, VERSION, capacity) and file_hosts >= max_hosts \
+                    and os.fstat(fd).st_size == file_size(capacity, file_hosts):
+                max_hosts, fresh = file_hosts, False
+                if not same_period(file_period, period_s):
+                    print(f"История записана с шагом {file_period:g} с, теперь {period_s:g} с — начинаем заново")
+                    fresh = True
+        size = file_size(capacity, max_hosts)
+        if fresh:
+            # новый файл или другой формат — начинаем с пустой истории
+            self._file.truncate(0)
+            self._file.truncate(size)
+        self._mm = mmap.mmap(fd, size)
+        if fresh:
+            HEADER.pack_into(self._mm, 0, MAGIC, VERSION, max_hosts, capacity, period_s)
+        self.max_hosts = max_hosts
+        self.capacity = capacity
+        self.period_s = HEADER.unpack_from(self._mm, 0)[4]
+
+    def _read_hosts(self):
+        """{имя в таблице (bytes): слот}."""
+        slots = {}
+        for i in range(self.max_hosts):
+            name, _ = HOST.unpack_from(self._mm, HEADER_SIZE + i * HOST.size)
+            name = name.rstrip(b"\0")
+            if name:
+                slots[name] = i
+        return slots
+
+    def hosts(self):
+        """Хосты, для которых в файле есть история (длинные имена — в виде host_key)."""
+        if self.readonly:
+            self._slots = self._read_hosts()
+        return [name.decode("utf-8", "replace") for name in self._slots]
+
+    def _slot(self, host):
+        key = host_key(host)
+        slot = self._slots.get(key)
+        if slot is None and not self.readonly:
+            used = set(self._slots.values())
+            free = [i for i in range(self.max_hosts) if i not in used]
+            if not free:
+                return None
+            slot = self._slots[key] = free[0]
+            HOST.pack_into(self._mm, HEADER_SIZE + slot * HOST.size, key, 0)
+        return slot
+
+    def count(self, host):
+        """Сколько замеров хоста записано за всё время (в кольце — не больше capacity)."""
+        slot = self._slots.get(host_key(host))
+        if slot is None:
+            return 0
+        return COUNT.unpack_from(self._mm, HEADER_SIZE + slot * HOST.size + NAME_SIZE)[0]
+
+    def _record_offset(self, slot, index):
+        base = HEADER_SIZE + self.max_hosts * HOST.size
+        return base + (slot * self.capacity + index % self.capacity) * RECORD.size
+
+    def append(self, host, ts, rtt_ms):
+        """Дописывает замер (rtt_ms=None — потеря). False, если для хоста нет места в файле."""
+        slot = self._slot(host)
+        if slot is None:
+            return False
+        n = self.count(host)
+        RECORD.pack_into(self._mm, self._record_offset(slot, n), ts,
+                         math.nan if rtt_ms is None else rtt_ms)
+        # счётчик — после записи: читатель не увидит недописанный замер
+        COUNT.pack_into(self._mm, HEADER_SIZE + slot * HOST.size + NAME_SIZE, n + 1)
+        return True
+
+    def last(self, host, n):
+        """До n последних замеров хоста, от старых к новым: [(ts, rtt мс или None)]."""
+        if self.readonly:
+            self._slots = self._read_hosts()
+        slot = self._slots.get(host_key(host))
+        if slot is None:
+            return []
+        total = self.count(host)
+        # при чтении чужого файла самая старая запись кольца может перезаписываться прямо сейчас
+        n = min(n, total, self.capacity - (1 if self.readonly else 0))
+        out = []
+        for i in range(total - n, total):
+            ts, rtt = RECORD.unpack_from(self._mm, self._record_offset(slot, i))
+            out.append((ts, None if math.isnan(rtt) else rtt))
+        return out
+
+    def close(self):
+        if self._mm is not None:
+            if not self.readonly:
+                self._mm.flush()
+            self._mm.close()
+            self._mm = None
+        self._file.close()
+
+
+def open_history(path, capacity=CAPACITY, hosts=(), period_s=1.0):
+    """
+    PingHistory для писателя или None (путь не задан или файл недоступен — работаем без истории).
+    hosts — список хостов монитора: файл рассчитывается так, чтобы места хватило всем;
+    period_s — шаг замеров.
+    """
+    if not path:
+        return None
+    try:
+        return PingHistory(path, capacity, max(MAX_HOSTS, len(hosts)), period_s=period_s)
+    except (OSError, ValueError) as e:
+        print("История пинга отключена:", e)
+        return None
@@ -0,0 +1,247 @@
+"""
+hosts.py — несколько игровых серверов в одном ping-мониторе.
+
+У каждого хоста свой кольцевой буфер замеров. На дисплей выводится либо
+один хост за раз с переключением страниц (mode="rotate"), либо сводка по
+худшим хостам (mode="worst"): график самого плохого + бегущая строка top-N.
+Если передана фабрика графиков, у каждого хоста ещё и свой инкрементальный
+график (graph.ScrollingGraph), который обновляется на каждом замере.
+
+С историей (history.PingHistory) замеры ещё и пишутся в файл, а при старте
+буферы и графики заполняются последним окном из него: после перезапуска
+график виден сразу. Пропуск, пока монитор не работал, рисуется потерями.
+
+Рядом с буфером у каждого хоста скользящая статистика (rolling.RollingStats)
+за несколько окон: её показывает текст в режиме text="stats" и отдают
+метрики (busybar_ping_*).
+"""
+import collections
+import time
+
+from busybar.graph import make_column
+from busybar.history import same_period
+from busybar.metrics import METRICS
+from busybar.pinger import format_ms
+from busybar.rolling import WINDOWS, RollingStats, format_stats
+
+MODES = ("rotate", "worst")
+# Что писать в тексте рядом с графиком: последний замер или статистику за окно
+TEXT_MODES = ("last", "stats")
+# Окно статистики для текста, столбцов графика (при замере раз в секунду — секунд)
+TEXT_WINDOW = 60
+
+# Сколько последних замеров учитывать при ранжировании хостов
+SCORE_WINDOW = 10
+# Потерянный пакет при ранжировании считается таким пингом (мс)
+LOSS_PENALTY_MS = 1000.0
+# Место замера, которого не было (монитор не работал): на графике — пустой
+# столбец, в статистику (потери, перцентили) не попадает
+GAP = object()
+
+
+def load_hosts(servers=None, servers_file=None):
+    """Список хостов из аргументов и/или файла (по одному на строку, # — комментарий)."""
+    hosts = list(servers or [])
+    if servers_file:
+        with open(servers_file, encoding="utf-8") as f:
+            for line in f:
+                line = line.split("#", 1)[0].strip()
+                if line:
+                    hosts.append(line)
+    # убираем дубликаты, сохраняя порядок
+    return list(dict.fromkeys(hosts))
+
+
+class HostBuffers:
+    """
+    Кольцевые буферы замеров по хостам + выбор того, что показать на дисплее.
+
+    per_column > 1 — частые замеры (10–20 Гц): per_column замеров подряд
+    сводятся в один столбец графика (graph.Column: min/avg/max и потери), в
+    буфере — среднее столбца. Столбец готов, когда пришли все его замеры или
+    пришёл замер на два столбца новее (таймаут замера меньше столбца).
+    Статистика и история — по каждому замеру, окна статистики — в столбцах.
+    """
+
+    def __init__(self, hosts, buffer_len, make_graph=None, history=None, interval_s=1.0,
+                 windows=WINDOWS, per_column=1):
+        self.hosts = list(hosts)
+        self.buffers = {h: collections.deque([None] * buffer_len, maxlen=buffer_len)
+                        for h in self.hosts}
+        self.graphs = {h: make_graph() for h in self.hosts} if make_graph else {}
+        self.per_column = per_column
+        self.stats = {h: {w: RollingStats(w * per_column) for w in windows} for h in self.hosts}
+        METRICS.add_collector(self.gauges)
+        self.columns = 0              # сколько столбцов готово
+        self._pending = {}            # номер столбца -> [тиков пришло (с пропущенными), {host: [замеры]}]
+        self._next_column = 0         # следующий столбец, который ждём
+        self._next_index = 0
+        self.late = 0                 # замеры, опоздавшие к своему столбцу
+        self.history = history
+        self._no_history = set()      # хосты, которым не хватило места в файле истории
+        self.interval_s = interval_s
+        if history is not None:
+            self.restore()
+
+    def _timeline(self, samples, now, limit):
+        """Замеры из истории -> значения по сетке interval_s; пропуски (и время до now) — GAP."""
+
+        def gap(t0, t1):
+            missed = int(round((t1 - t0) / self.interval_s)) - 1
+            return [GAP] * min(max(missed, 0), limit)
+
+        values = []
+        for i, (ts, rtt) in enumerate(samples):
+            if i:
+                values.extend(gap(samples[i - 1][0], ts))
+            values.append(rtt)
+        values.extend(gap(samples[-1][0], now))
+        return values[-limit:]
+
+    def restore(self):
+        """Заполняет буферы (и графики) последним окном из истории."""
+        if not same_period(self.history.period_s, self.interval_s):
+            # пропуски и столбцы считаются по шагу замеров — с чужим шагом график исказится
+            print(f"История записана с шагом {self.history.period_s:g} с, замеры идут раз в "
+                  f"{self.interval_s:g} с — не восстанавливаем")
+            return 0
+        now = time.time()
+        restored = 0
+        for host in self.hosts:
+            limit = len(self.buffers[host]) * self.per_column
+            samples = self.history.last(host, limit)
+            if not samples:
+                continue
+            values = self._timeline(samples, now, limit)
+            for value in values:
+                if value is not GAP:
+                    self._push_stats(host, value)
+            # столбцы выравниваем по последнему замеру
+            first = len(values) % self.per_column
+            chunks = [values[:first]] if first else []
+            chunks += [values[i:i + self.per_column] for i in range(first, len(values), self.per_column)]
+            for chunk in chunks:
+                probed = [v for v in chunk if v is not GAP]
+                self._push_column(host, make_column(probed) if probed else None)
+            restored += len(samples)
+        return restored
+
+    def __getitem__(self, host):
+        return self.buffers[host]
+
+    def record(self, results, ts=None, index=None):
+        """
+        results: {host: RTT в мс или None} — по одному замеру на хост; ts — время
+        замера (unix); index — номер замера (по умолчанию следующий по порядку,
+        при перекрывающихся замерах ответы приходят не по порядку).
+        results=None — замер на этом тике пропущен (все слоты замеров заняты):
+        в статистику и историю не идёт, столбец просто не ждёт его.
+        Возвращает, сколько столбцов графика стало готово.
+        """
+        if ts is None:
+            ts = time.time()
+        if index is None:
+            index = self._next_index
+        self._next_index = max(self._next_index, index + 1)
+        if results is not None:
+            for host in self.hosts:
+                value = results.get(host)
+                if value is None:
+                    METRICS.inc("busybar_probe_lost_total", host=host)
+                else:
+                    METRICS.observe("busybar_probe_rtt_seconds", value / 1000.0, host=host)
+                self._push_stats(host, value)
+                if self.history is not None and not self.history.append(host, ts, value) \
+                        and host not in self._no_history:
+                    self._no_history.add(host)
+                    print(f"Нет места в файле истории для {host}: его замеры не сохраняются")
+
+        column = index // self.per_column
+        if column < self._next_column:
+            self.late += 1
+            return 0
+        pending = self._pending.setdefault(column, [0, {h: [] for h in self.hosts}])
+        pending[0] += 1
+        if results is not None:
+            for host in self.hosts:
+                pending[1][host].append(results.get(host))
+        done = 0
+        while self._pending:
+            first = min(self._pending)
+            seen, samples = self._pending[first]
+            if seen < self.per_column and first > column - 2:
+                break
+            del self._pending[first]
+            # столбцы, в которые не попало ни одного замера (пропущенные тики), — потери
+            for _ in range(min(first - self._next_column, len(self.buffers[self.hosts[0]]))):
+                for host in self.hosts:
+                    self._push_column(host, None)
+            for host in self.hosts:
+                self._push_column(host, make_column(samples[host]) if samples[host] else None)
+            done += first - self._next_column + 1
+            self._next_column = first + 1
+        self.columns += done
+        return done
+
+    def _push_stats(self, host, value):
+        for stats in self.stats[host].values():
+            stats.push(value)
+
+    def _push_column(self, host, column):
+        """Столбец графика: в буфер — среднее, в график — min/avg/max (None — столбец без замеров)."""
+        self.buffers[host].append(None if column is None else column.avg)
+        if self.graphs:
+            self.graphs[host].push(column)
+
+    def window_stats(self, host, window=TEXT_WINDOW):
+        """RollingStats хоста за окно (ближайшее из заведённых, если такого нет)."""
+        by_window = self.stats[host]
+        if window not in by_window:
+            window = min(by_window, key=lambda w: abs(w - window))
+        return by_window[window]
+
+    def gauges(self):
+        """Скользящая статистика для busybar.metrics: [(name, labels, value)]."""
+        out = []
+        for host, by_window in self.stats.items():
+            for window, stats in by_window.items():
+                labels = {"host": host, "window": window}
+                for q in (50, 95, 99):
+                    out.append(("busybar_ping_rtt_ms", dict(labels, stat=f"p{q}"), stats.percentile(q)))
+                out.append(("busybar_ping_rtt_ms", dict(labels, stat="mean"), stats.mean()))
+                out.append(("busybar_ping_jitter_ms", labels, stats.jitter()))
+                out.append(("busybar_ping_loss_ratio", labels, stats.loss()))
+        return out
+
+    def text(self, host, text="last"):
+        if text == "stats":
+            return format_stats(self.window_stats(host))
+        return format_ms(self.last(host))
+
+    def png(self, host):
+        """PNG текущего графика хоста (нужна фабрика графиков)."""
+        return self.graphs[host].png()
+
+    def last(self, host):
+        return self.buffers[host][-1]
+
+    def score(self, host, window=SCORE_WINDOW):
+        recent = list(self.buffers[host])[-window:]
+        return sum(LOSS_PENALTY_MS if v is None else v for v in recent) / len(recent)
+
+    def worst(self, n):
+        return sorted(self.hosts, key=self.score, reverse=True)[:n]
+
+    def select(self, tick, mode="rotate", page_ticks=5, worst_n=3, text="last"):
+        """
+        Какой хост рисовать на графике и какой текст показать: (host, text).
+        text="stats" — вместо последнего замера статистика за TEXT_WINDOW замеров.
+        """
+        if len(self.hosts) == 1:
+            host = self.hosts[0]
+            return host, self.text(host, text)
+        if mode == "worst":
+            top = self.worst(worst_n)
+            return top[0], "  ".join(f"{h} {self.text(h, text)}" for h in top)
+        host = self.hosts[(tick // page_ticks) % len(self.hosts)]
+        return host, f"{host} {self.text(host, text)}"
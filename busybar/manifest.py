@@ -0,0 +1,208 @@
+"""
+manifest.py — постоянный список статических ассетов, уже лежащих на устройствах.
+
+AssetCache живёт в памяти процесса: после перезапуска (деплоя) каждый виджет
+заново грузил все свои картинки — иконки погоды, логотип — на каждую панель.
+AssetManifest хранит в JSON-файле (device, app_id, file) -> sha256 для
+ассетов require_asset. При старте DeviceClient сверяется с манифестом и
+грузит только отсутствующие или изменившиеся ассеты; запись старше
+MANIFEST_TTL_S не учитывается (устройство могло перезагрузиться, пока
+виджет не работал).
+
+Прочитать список ассетов с устройства API не позволяет, поэтому перезагрузку
+распознаём по времени работы устройства — режим проверки (BUSYBAR_ASSET_VERIFY):
+    connect — по умолчанию: при старте процесса один GET статуса устройства
+              (uptime) на устройство; время загрузки не совпало с записанным в
+              манифесте — устройство перезагружалось, его ассеты грузятся заново.
+              Эндпоинта статуса нет в документированном API: устройство,
+              ответившее на него 404, помечается в манифесте и дальше
+              проверяется только по MANIFEST_TTL_S, без лишних запросов.
+              Во время работы: запрос не смог соединиться с устройством
+              (выключено или перезагружается) — при следующем успешном запросе
+              обязательные ассеты грузятся заново, манифест обновляется;
+    resync  — манифесту не верим: при старте всё грузится заново и
+              записывается в манифест; дальше как connect;
+    off     — без проверки: манифесту верим по MANIFEST_TTL_S, заново грузим
+              только после размыкания автомата защиты.
+
+    BUSYBAR_ASSET_MANIFEST=~/.cache/busybar/assets.json   # '' — без манифеста
+    BUSYBAR_ASSET_VERIFY=resync
+
+Файл может писать несколько процессов (виджеты, демон): изменения вносятся
+в свежепрочитанный файл и записываются атомарно (os.replace), весь цикл —
+под блокировкой файла (busybar.filelock).
+"""
+import json
+import os
+import threading
+import time
+
+from busybar.filelock import locked
+
+MANIFEST_ENV = "BUSYBAR_ASSET_MANIFEST"
+VERIFY_ENV = "BUSYBAR_ASSET_VERIFY"
+DEFAULT_PATH = os.path.join(os.path.expanduser("~"), ".cache", "busybar", "assets.json")
+# Сколько верить записи манифеста без повторной загрузки
+MANIFEST_TTL_S = 24 * 3600
+# Расхождение времени загрузки (unix-время минус uptime), которое не считается перезагрузкой
+BOOT_TOLERANCE_S = 2.0
+
+VERIFY_CONNECT, VERIFY_RESYNC, VERIFY_OFF = "connect", "resync", "off"
+VERIFY_MODES = (VERIFY_CONNECT, VERIFY_RESYNC, VERIFY_OFF)
+
+
+class AssetManifest:
+    """
+    Хэши загруженных ассетов по устройствам в JSON-файле:
+    {device: {"boot": время загрузки устройства или null, "assets": {app_id: {file: запись}},
+              "status": false — если у устройства нет эндпоинта статуса}}.
+    """
+
+    def __init__(self, path=DEFAULT_PATH, ttl=MANIFEST_TTL_S):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = self._load()
+
+    # --- файл ---
+    def _load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(entries, dict):
+            return {}
+        # устройства в другом формате отбрасываем — их ассеты просто загрузятся заново
+        return {device: entry for device, entry in entries.items()
+                if isinstance(entry, dict) and isinstance(entry.get("assets"), dict)}
+
+    def _save(self):
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self._entries, f, ensure_ascii=False, indent=1, sort_keys=True)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print("Не удалось сохранить манифест ассетов:", e)
+
+    def _update(self, change):
+        """change(entries) правит свежую копию файла; True — если что-то поменялось и записано."""
+        with self._lock, locked(self.path):
+            self._entries = self._load()
+            if change(self._entries):
+                self._save()
+                return True
+            return False
+
+    # --- записи ---
+    def get(self, device, app_id, filename):
+        """Запись {"sha256", "size", "ts"} или None."""
+        with self._lock:
+            return self._entries.get(device, {}).get("assets", {}).get(app_id, {}).get(filename)
+
+    def is_current(self, device, app_id, filename, digest, now=None):
+        """На устройстве лежит этот контент (по манифесту, запись не старше ttl)."""
+        entry = self.get(device, app_id, filename)
+        if not entry or entry.get("sha256") != digest:
+            return False
+        now = time.time() if now is None else now
+        return now - entry.get("ts", 0) < self.ttl
+
+    def boot(self, device):
+        """Время загрузки устройства (unix), при котором записаны его ассеты, или None."""
+        with self._lock:
+            return self._entries.get(device, {}).get("boot")
+
+    def has_status(self, device):
+        """False — устройство не отдаёт статус (uptime), проверять его только по ttl."""
+        with self._lock:
+            return self._entries.get(device, {}).get("status", True)
+
+    def mark_no_status(self, device):
+        def change(entries):
+            record = entries.setdefault(device, {"boot": None, "assets": {}})
+            if record.get("status") is False:
+                return False
+            record["status"] = False
+            return True
+        self._update(change)
+
+    def check_boot(self, device, boot, tolerance_s):
+        """
+        Сверяет время загрузки устройства с записанным. Не совпало (устройство
+        перезагружалось) — ассеты устройства забываются. True, если записи сохранены.
+        """
+        kept = []
+
+        def change(entries):
+            entry = entries.get(device)
+            known = None if entry is None else entry.get("boot")
+            kept.append(known is not None and abs(boot - known) <= tolerance_s)
+            if kept[0]:
+                return False
+            entries[device] = {"boot": round(boot, 3), "assets": {}}
+            return True
+        self._update(change)
+        return kept[0]
+
+    def remember(self, device, app_id, filename, digest, size):
+        entry = {"sha256": digest, "size": size, "ts": round(time.time(), 3)}
+
+        def change(entries):
+            record = entries.setdefault(device, {"boot": None, "assets": {}})
+            record["assets"].setdefault(app_id, {})[filename] = entry
+            return True
+        self._update(change)
+
+    def forget(self, device, app_id=None, filename=None):
+        """
+        Удаляет записи устройства: все (вместе со временем загрузки; отметка
+        «нет статуса» остаётся), одного app_id или один файл.
+        """
+        def change(entries):
+            record = entries.get(device)
+            if not record:
+                return False
+            if app_id is None:
+                if record.get("status") is False:
+                    entries[device] = {"boot": None, "assets": {}, "status": False}
+                else:
+                    del entries[device]
+                return True
+            files = record["assets"].get(app_id)
+            if not files or (filename is not None and filename not in files):
+                return False
+            if filename is None or len(files) == 1:
+                del record["assets"][app_id]
+            else:
+                del files[filename]
+            return True
+        return self._update(change)
+
+    def devices(self):
+        with self._lock:
+            return list(self._entries)
+
+
+_manifests = {}
+
+
+def manifest_from_env():
+    """
+    (AssetManifest или None, режим проверки) по BUSYBAR_ASSET_MANIFEST /
+    BUSYBAR_ASSET_VERIFY; один манифест на путь в процессе.
+    """
+    path = os.environ.get(MANIFEST_ENV, DEFAULT_PATH)
+    verify = os.environ.get(VERIFY_ENV, VERIFY_CONNECT)
+    if verify not in VERIFY_MODES:
+        print(f"Неизвестный режим {VERIFY_ENV}={verify!r}, используем {VERIFY_CONNECT}")
+        verify = VERIFY_CONNECT
+    if not path:
+        return None, verify
+    path = os.path.expanduser(path)
+    manifest = _manifests.get(path)
+    if manifest is None:
+        manifest = _manifests[path] = AssetManifest(path)
+    return manifest, verify
@@ -0,0 +1,308 @@
+"""
+metrics.py — встроенные метрики виджетов: счётчики и гистограммы задержек.
+
+Все этапы тика пишут сюда (глобальный реестр METRICS):
+    busybar_probe_rtt_seconds        — RTT замеров пинга по хостам;
+    busybar_probe_lost_total         — потерянные замеры;
+    busybar_stage_seconds            — render / encode по виджетам;
+    busybar_request_seconds          — upload / draw по устройствам;
+    busybar_requests_total           — запросы по результату (ok, http_4xx, http_5xx, error);
+    busybar_bytes_sent_total         — отправлено байт тел запросов;
+    busybar_skipped_total            — запросы, которые не отправлялись
+                                       (cached, manifest, unchanged, breaker, budget, busy);
+    busybar_frames_dropped_total     — кадры, вытесненные более новыми;
+    busybar_ping_rtt_ms, _jitter_ms, _loss_ratio — скользящая статистика пинга
+                                       по хостам и окнам (gauge, считается при чтении).
+
+Метрики отдаются в текстовом формате Prometheus на локальном HTTP-порту
+(GET /metrics) и/или раз в интервал пишутся строкой JSON в файл. Оба
+включаются переменными окружения, одинаково для всех виджетов:
+
+    BUSYBAR_METRICS=9464                 # или 0.0.0.0:9464 — слушать не только localhost
+    BUSYBAR_METRICS_LOG=/var/log/busybar.jsonl   # '-' — в stdout
+
+    with METRICS.time("busybar_stage_seconds", stage="render", widget="ping"):
+        ...
+    METRICS.inc("busybar_bytes_sent_total", len(body), device=ip, kind="draw")
+"""
+import bisect
+import contextlib
+import http.server
+import json
+import os
+import sys
+import threading
+import time
+import weakref
+
+# Верхние границы корзин гистограмм, с: от долей миллисекунды (рендер) до секунд (таймауты)
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+METRICS_ENV = "BUSYBAR_METRICS"
+METRICS_LOG_ENV = "BUSYBAR_METRICS_LOG"
+METRICS_HOST = "127.0.0.1"
+LOG_INTERVAL_S = 10.0
+
+HELP = {
+    "busybar_probe_rtt_seconds": "RTT замера пинга",
+    "busybar_probe_lost_total": "Потерянные замеры пинга",
+    "busybar_stage_seconds": "Длительность этапа тика (render, encode)",
+    "busybar_request_seconds": "Длительность запроса к устройству",
+    "busybar_requests_total": "Запросы к устройству по результату",
+    "busybar_bytes_sent_total": "Байт отправлено на устройство",
+    "busybar_skipped_total": "Запросы, которые не отправлялись, по причине",
+    "busybar_frames_dropped_total": "Кадры, вытесненные более новыми",
+    "busybar_ping_rtt_ms": "Скользящий перцентиль или среднее RTT за окно замеров",
+    "busybar_ping_jitter_ms": "Среднее изменение RTT между соседними ответами за окно",
+    "busybar_ping_loss_ratio": "Доля потерь за окно замеров",
+}
+
+
+class Histogram:
+    """Кумулятивная гистограмма в стиле Prometheus: счётчики по корзинам, сумма, количество."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)    # последняя — +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        total, out = 0, []
+        for n in self.counts:
+            total += n
+            out.append(total)
+        return out
+
+    def quantile(self, q):
+        """Оценка q-го квантиля (0..1) линейной интерполяцией внутри корзины, как histogram_quantile."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        lower, seen = 0.0, 0
+        for upper, n in zip(self.buckets, self.counts):
+            if seen + n >= rank and n:
+                return lower + (upper - lower) * (rank - seen) / n
+            seen += n
+            lower = upper
+        return self.buckets[-1]
+
+
+def _label_str(labels):
+    if not labels:
+        return ""
+    parts = []
+    for key, value in labels:
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'{key}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def _num(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metrics:
+    """Реестр метрик; потокобезопасен (пишут потоки probe, render, слоты и основной)."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self.counters = {}        # (name, labels) -> число
+        self.histograms = {}      # (name, labels) -> Histogram
+        self._collectors = []     # WeakMethod: () -> [(name, labels, value)] — gauge на момент чтения
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted(labels.items()))
+
+    def inc(self, name, value=1, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, seconds, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            hist = self.histograms.get(key)
+            if hist is None:
+                hist = self.histograms[key] = Histogram(self.buckets)
+            hist.observe(seconds)
+
+    def add_collector(self, method):
+        """Метод объекта, который отдаёт текущие значения gauge; живёт, пока жив объект."""
+        with self._lock:
+            self._collectors.append(weakref.WeakMethod(method))
+
+    def _gauges(self):
+        with self._lock:
+            self._collectors = [ref for ref in self._collectors if ref() is not None]
+            methods = [ref() for ref in self._collectors]
+        gauges = {}
+        for method in methods:
+            if method is None:
+                continue
+            for name, labels, value in method():
+                if value is not None:
+                    gauges[self._key(name, labels)] = value
+        return sorted(gauges.items())
+
+    @contextlib.contextmanager
+    def time(self, name, **labels):
+        """Длительность блока — в гистограмму name."""
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - t0, **labels)
+
+    def render(self):
+        """Текстовый формат экспозиции Prometheus (version 0.0.4)."""
+        with self._lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted((k, (list(h.buckets), h.cumulative(), h.sum, h.count))
+                                for k, h in self.histograms.items())
+        lines, declared = [], set()
+
+        def declare(name, kind):
+            if name not in declared:
+                declared.add(name)
+                if name in HELP:
+                    lines.append(f"# HELP {name} {HELP[name]}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), value in counters:
+            declare(name, "counter")
+            lines.append(f"{name}{_label_str(labels)} {_num(value)}")
+        for (name, labels), value in self._gauges():
+            declare(name, "gauge")
+            lines.append(f"{name}{_label_str(labels)} {_num(value)}")
+        for (name, labels), (buckets, cumulative, total, count) in histograms:
+            declare(name, "histogram")
+            for upper, n in zip(buckets + ["+Inf"], cumulative):
+                le = upper if upper == "+Inf" else _num(float(upper))
+                lines.append(f"{name}_bucket{_label_str(labels + (('le', le),))} {n}")
+            lines.append(f"{name}_sum{_label_str(labels)} {_num(total)}")
+            lines.append(f"{name}_count{_label_str(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self):
+        """Метрики одним словарём для JSON: счётчики и gauge как есть, гистограммы — count/sum/p50/p99."""
+        gauges = self._gauges()
+        with self._lock:
+            out = {f"{name}{_label_str(labels)}": value for (name, labels), value in self.counters.items()}
+            for (name, labels), h in self.histograms.items():
+                p50, p99 = h.quantile(0.5), h.quantile(0.99)
+                out[f"{name}{_label_str(labels)}"] = {
+                    "count": h.count, "sum": round(h.sum, 6),
+                    "p50": None if p50 is None else round(p50, 6),
+                    "p99": None if p99 is None else round(p99, 6),
+                }
+        for (name, labels), value in gauges:
+            out[f"{name}{_label_str(labels)}"] = round(value, 4)
+        return out
+
+
+METRICS = Metrics()
+
+
+# --- экспорт ---
+
+def make_handler(registry):
+    class Handler(http.server.BaseHTTPRequestHandler):
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            if self.path.split("?", 1)[0] not in ("/", "/metrics"):
+                self.send_error(404)
+                return
+            body = registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def start_http_server(port, host=METRICS_HOST, registry=METRICS):
+    """Отдаёт /metrics в фоновом потоке (port=0 — любой свободный). Возвращает сервер."""
+    server = http.server.ThreadingHTTPServer((host, port), make_handler(registry))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+
+class JsonLog:
+    """Раз в interval_s дописывает снимок метрик строкой JSON (формат JSON Lines)."""
+
+    def __init__(self, path, interval_s=LOG_INTERVAL_S, registry=METRICS):
+        self.path = path
+        self.interval_s = interval_s
+        self.registry = registry
+        self._stop = threading.Event()
+        self._thread = None
+
+    def write(self):
+        line = json.dumps({"ts": round(time.time(), 3), "pid": os.getpid(),
+                           "metrics": self.registry.snapshot()}, ensure_ascii=False)
+        if self.path == "-":
+            print(line, flush=True)
+            return
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+    def _run(self):
+        while not self._stop.wait(self.interval_s):
+            try:
+                self.write()
+            except OSError as e:
+                print(f"Не удалось записать метрики в {self.path}:", e, file=sys.stderr)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="metrics-log", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Останавливает поток и пишет последний снимок."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+        self.write()
+
+
+def parse_address(value):
+    """'9464' или 'host:9464' -> (host, port)."""
+    host, _, port = str(value).rpartition(":")
+    return host or METRICS_HOST, int(port)
+
+
+def start_from_env(address=None, log_path=None):
+    """
+    Включает экспорт по аргументам или переменным BUSYBAR_METRICS / BUSYBAR_METRICS_LOG.
+    Возвращает (server или None, JsonLog или None); без настроек ничего не запускает.
+    """
+    address = address or os.environ.get(METRICS_ENV)
+    log_path = log_path or os.environ.get(METRICS_LOG_ENV)
+    server = log = None
+    if address:
+        host, port = parse_address(address)
+        try:
+            server = start_http_server(port, host)
+            print(f"Метрики: http://{host}:{server.server_address[1]}/metrics")
+        except OSError as e:
+            print(f"Не удалось открыть порт метрик {host}:{port}:", e)
+    if log_path:
+        log = JsonLog(log_path).start()
+    return server, log
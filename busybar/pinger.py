@@ -0,0 +1,257 @@
+"""
+pinger.py — ICMP echo внутри процесса на asyncio, без fork/exec на каждый замер.
+
+Используется непривилегированный ICMP-сокет (SOCK_DGRAM + IPPROTO_ICMP), если
+ядро его разрешает (Linux: sysctl net.ipv4.ping_group_range, macOS — всегда).
+Иначе — запасной вариант через системную утилиту ping (asyncio-подпроцесс).
+
+RTT меряется по time.perf_counter() с точностью до долей миллисекунды;
+ответы сопоставляются по identifier + sequence, таймауты не блокируют цикл.
+
+Асинхронно:
+    pinger = AsyncPinger()
+    rtt_ms = await pinger.ping("1.2.3.4", timeout_s=0.9)   # float или None
+
+Синхронно (для обычных циклов виджетов; потокобезопасно):
+    rtt_ms = ping_once("1.2.3.4", timeout_s=0.9)
+    rtts = ping_many(["1.2.3.4", "5.6.7.8"], timeout_s=0.9)   # {host: float или None}
+
+Много хостов пингуются параллельно через тот же сокет, поэтому время замера
+не растёт с числом хостов (ограничено таймаутом).
+"""
+import asyncio
+import os
+import platform
+import re
+import socket
+import struct
+import threading
+import time
+
+ICMP_ECHO_REQUEST = 8
+ICMP_ECHO_REPLY = 0
+PAYLOAD_SIZE = 16
+# Системному ping (без ICMP-сокета) даём сверх таймаута на запуск процесса
+SUBPROCESS_GRACE_S = 1.0
+
+
+def checksum(data):
+    if len(data) % 2:
+        data += b"\x00"
+    s = sum(struct.unpack(f"!{len(data) // 2}H", data))
+    s = (s >> 16) + (s & 0xFFFF)
+    s += s >> 16
+    return ~s & 0xFFFF
+
+
+def build_echo_request(ident, seq, payload=b""):
+    header = struct.pack("!BBHHH", ICMP_ECHO_REQUEST, 0, 0, ident, seq)
+    csum = checksum(header + payload)
+    return struct.pack("!BBHHH", ICMP_ECHO_REQUEST, 0, csum, ident, seq) + payload
+
+
+def parse_echo_reply(packet):
+    """Возвращает (ident, seq) для echo reply или None. Для raw-сокета пропускает IP-заголовок."""
+    if len(packet) >= 20 and packet[0] >> 4 == 4:
+        packet = packet[(packet[0] & 0x0F) * 4:]
+    if len(packet) < 8:
+        return None
+    icmp_type, _code, _csum, ident, seq = struct.unpack("!BBHHH", packet[:8])
+    if icmp_type != ICMP_ECHO_REPLY:
+        return None
+    return ident, seq
+
+
+def icmp_socket_available():
+    """Можно ли открыть непривилегированный ICMP-сокет на этой системе."""
+    try:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_ICMP)
+    except (OSError, AttributeError):
+        return False
+    sock.close()
+    return True
+
+
+def format_ms(ms):
+    """Текст для дисплея: '--' при потере, десятые доли для быстрых пингов."""
+    if ms is None:
+        return "--"
+    if ms < 10:
+        return f"{ms:.1f} ms"
+    return f"{ms:.0f} ms"
+
+
+class AsyncPinger:
+    """Один ICMP-сокет на все хосты и все замеры; ответы разбираются по (addr, seq)."""
+
+    def __init__(self, use_icmp_socket=None):
+        if use_icmp_socket is None:
+            use_icmp_socket = platform.system().lower() != "windows" and icmp_socket_available()
+        self.use_icmp_socket = use_icmp_socket
+        self._sock = None
+        self._loop = None
+        self._ident = os.getpid() & 0xFFFF
+        self._seq = 0
+        self._pending = {}         # (addr, seq) -> (future, sent_at)
+        self._addr_cache = {}
+
+    # --- ICMP-сокет ---
+    def _open(self):
+        self._loop = asyncio.get_running_loop()
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_ICMP)
+        sock.setblocking(False)
+        sock.bind(("0.0.0.0", 0))
+        # для ICMP-датаграмм ядро подставляет в identifier «порт» сокета
+        if platform.system().lower() == "linux":
+            self._ident = sock.getsockname()[1] & 0xFFFF
+        self._loop.add_reader(sock.fileno(), self._on_readable)
+        self._sock = sock
+
+    def _on_readable(self):
+        while True:
+            try:
+                packet, (addr, _port) = self._sock.recvfrom(2048)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                return
+            received_at = time.perf_counter()
+            parsed = parse_echo_reply(packet)
+            if parsed is None:
+                continue
+            ident, seq = parsed
+            if ident != self._ident:
+                continue
+            entry = self._pending.pop((addr, seq), None)
+            if entry is None:
+                continue            # опоздавший ответ на уже истёкший запрос
+            fut, sent_at = entry
+            if not fut.done():
+                fut.set_result((received_at - sent_at) * 1000.0)
+
+    async def _resolve(self, host):
+        addr = self._addr_cache.get(host)
+        if addr is None:
+            infos = await asyncio.get_running_loop().getaddrinfo(host, None, family=socket.AF_INET)
+            addr = self._addr_cache[host] = infos[0][4][0]
+        return addr
+
+    async def _ping_icmp(self, host, timeout_s):
+        if self._sock is None:
+            self._open()
+        addr = await self._resolve(host)
+        self._seq = (self._seq + 1) & 0xFFFF
+        seq = self._seq
+        fut = self._loop.create_future()
+        packet = build_echo_request(self._ident, seq, os.urandom(PAYLOAD_SIZE))
+        key = (addr, seq)
+        self._pending[key] = (fut, time.perf_counter())
+        try:
+            self._sock.sendto(packet, (addr, 0))
+            return await asyncio.wait_for(fut, timeout_s)
+        except (asyncio.TimeoutError, OSError):
+            return None
+        finally:
+            self._pending.pop(key, None)
+
+    # --- запасной вариант: системный ping ---
+    async def _ping_subprocess(self, host, timeout_s):
+        if platform.system().lower() == "windows":
+            cmd = ["ping", "-n", "1", "-w", str(int(timeout_s * 1000)), host]
+        else:
+            cmd = ["ping", "-c", "1", host]
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                *cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL)
+        except OSError:
+            return None
+        try:
+            out, _ = await asyncio.wait_for(proc.communicate(), timeout_s + SUBPROCESS_GRACE_S)
+        except asyncio.TimeoutError:
+            proc.kill()
+            await proc.wait()
+            return None
+        m = re.search(r"time[=<]\s*([0-9]+(?:\.[0-9]+)?)\s*ms", out.decode(errors="replace"))
+        return float(m.group(1)) if m else None
+
+    async def ping(self, host, timeout_s=1.0):
+        """RTT в мс (float) или None при таймауте/ошибке."""
+        try:
+            if self.use_icmp_socket:
+                return await self._ping_icmp(host, timeout_s)
+            return await self._ping_subprocess(host, timeout_s)
+        except (OSError, socket.gaierror):
+            return None
+
+    async def ping_many(self, hosts, timeout_s=1.0):
+        """Параллельный замер всех хостов: {host: RTT в мс или None}."""
+        results = await asyncio.gather(*(self.ping(h, timeout_s) for h in hosts))
+        return dict(zip(hosts, results))
+
+    def close(self):
+        if self._sock is not None:
+            self._loop.remove_reader(self._sock.fileno())
+            self._sock.close()
+            self._sock = None
+        for fut, _ in self._pending.values():
+            if not fut.done():
+                fut.cancel()
+        self._pending.clear()
+
+
+class Pinger:
+    """
+    Синхронная обёртка: один ICMP-сокет на всё время работы, event loop в своём
+    потоке. Вызывать можно из нескольких потоков сразу — замеры перекрываются
+    (частые замеры не ждут таймаута предыдущего).
+    """
+
+    def __init__(self, use_icmp_socket=None):
+        self._loop = asyncio.new_event_loop()
+        self._async = AsyncPinger(use_icmp_socket)
+        self._thread = threading.Thread(target=self._loop.run_forever, name="pinger", daemon=True)
+        self._thread.start()
+
+    def _run(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    def ping(self, host, timeout_s=1.0):
+        return self._run(self._async.ping(host, timeout_s))
+
+    def ping_many(self, hosts, timeout_s=1.0):
+        return self._run(self._async.ping_many(hosts, timeout_s))
+
+    def close(self):
+        async def close_socket():
+            self._async.close()
+        self._run(close_socket())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+
+_default_pinger = None
+_default_lock = threading.Lock()
+
+
+def _get_default_pinger():
+    global _default_pinger
+    with _default_lock:
+        if _default_pinger is None:
+            _default_pinger = Pinger()
+        return _default_pinger
+
+
+def ping_once(host, timeout_s=1.0):
+    """RTT до host в мс (float, доли миллисекунды) или None."""
+    return _get_default_pinger().ping(host, timeout_s)
+
+
+def max_probe_s(timeout_s):
+    """Сколько в худшем случае длится ping_many с таймаутом timeout_s."""
+    return timeout_s + SUBPROCESS_GRACE_S
+
+
+def ping_many(hosts, timeout_s=1.0):
+    """Параллельный замер списка хостов: {host: RTT в мс или None}."""
+    return _get_default_pinger().ping_many(list(hosts), timeout_s)
@@ -0,0 +1,224 @@
+"""
+pipeline.py — конвейер пинг-монитора: замер, рендер и запись на устройство
+в отдельных потоках.
+
+Раньше тик шёл строго последовательно: ping -> рендер -> upload -> draw.
+Если устройство отвечает 600 мс, следующий замер сдвигается, и интервалы
+между точками графика перестают быть равными. Здесь этапы независимы:
+
+    probe  — свой TickScheduler, замеры строго по сетке; результат кладётся
+             в очередь замеров (ограниченная, при переполнении выбрасывается
+             самый старый);
+    render — забирает все накопившиеся замеры (график не теряет точек),
+             рендерит кадр только по последнему и кладёт его в LatestQueue;
+    write  — вызывающий поток: берёт последний кадр и отправляет на устройство.
+             Если устройство не успевает, промежуточные кадры заменяются
+             новыми (latest-wins) и считаются в dropped.
+
+Точность замеров больше не зависит от задержки устройства.
+
+Частые замеры (10–20 Гц, buffers.per_column > 1): замер с таймаутом 0.9 с
+длиннее шага сетки, поэтому замеры запускаются в пуле потоков и
+перекрываются (размер пула — probes_in_flight, по умолчанию худшая
+длительность замера / шаг ticks; probe должен быть потокобезопасным, как
+pinger.ping_many). Если все слоты заняты, замер на тике пропускается, а не
+встаёт в очередь: очередь росла бы без предела, а график отставал. Время
+замера — дедлайн тика, а не момент, когда замер реально начался.
+Кадр рендерится, только когда готов новый столбец графика, так что на
+устройство уходит кадр на столбец, а не на замер.
+
+Время рендера и вытесненные кадры/замеры пишутся в busybar.metrics (widget=name).
+"""
+import collections
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from busybar.metrics import METRICS
+from busybar.pinger import max_probe_s, ping_many
+from busybar.scheduler import TickScheduler
+
+# Сколько замеров может ждать рендера (при 1 Гц — полминуты)
+SAMPLE_QUEUE_LEN = 32
+# Как часто потоки проверяют флаг остановки, с
+POLL_S = 0.2
+
+
+class LatestQueue:
+    """Очередь на один элемент: put() заменяет непрочитанный элемент (latest-wins)."""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._item = None
+        self._has_item = False
+        self.put_count = 0
+        self.dropped = 0
+
+    def put(self, item):
+        with self._cond:
+            if self._has_item:
+                self.dropped += 1
+            self._item, self._has_item = item, True
+            self.put_count += 1
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        """Последний элемент или None по таймауту."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._has_item, timeout):
+                return None
+            item, self._item, self._has_item = self._item, None, False
+            return item
+
+
+class BoundedQueue:
+    """FIFO ограниченной длины: при переполнении выбрасывается самый старый элемент."""
+
+    def __init__(self, maxlen):
+        self._cond = threading.Condition()
+        self._items = collections.deque()
+        self.maxlen = maxlen
+        self.dropped = 0
+
+    def put(self, item):
+        with self._cond:
+            if len(self._items) >= self.maxlen:
+                self._items.popleft()
+                self.dropped += 1
+            self._items.append(item)
+            self._cond.notify()
+
+    def get_all(self, timeout=None):
+        """Все накопившиеся элементы (пустой список по таймауту)."""
+        with self._cond:
+            self._cond.wait_for(lambda: self._items, timeout)
+            items = list(self._items)
+            self._items.clear()
+            return items
+
+
+class PingPipeline:
+    """
+    buffers — HostBuffers; render(tick) -> кадр (после записи замеров в buffers);
+    write(frame) — отправка кадра на устройство (выполняется в потоке run()).
+    ticks и probe можно подменить (бенчмарк, тесты).
+    """
+
+    def __init__(self, servers, buffers, render, write, ticks=None, probe=ping_many,
+                 timeout_s=0.9, sample_queue_len=SAMPLE_QUEUE_LEN, name="ping", probes_in_flight=None,
+                 probe_max_s=None):
+        self.servers = list(servers)
+        self.buffers = buffers
+        self.render = render
+        self.write = write
+        self.ticks = ticks or TickScheduler(1.0)
+        self.probe = probe
+        self.timeout_s = timeout_s
+        self.name = name
+        if probes_in_flight is None:
+            # замер короче тика — без пула, как раньше; иначе столько, сколько
+            # замеров худшей длительности (probe_max_s) успевает начаться по сетке
+            probe_max_s = max_probe_s(timeout_s) if probe_max_s is None else probe_max_s
+            probes_in_flight = 1 if timeout_s <= self.ticks.interval \
+                else math.ceil(probe_max_s / self.ticks.interval)
+        self._probes = ThreadPoolExecutor(probes_in_flight, thread_name_prefix="ping-probe") \
+            if probes_in_flight > 1 else None
+        self._slots = threading.BoundedSemaphore(probes_in_flight)
+        self.skipped = 0              # тиков без замера: все слоты заняты
+        self.samples = BoundedQueue(sample_queue_len)
+        self.frames = LatestQueue()
+        self._stop = threading.Event()
+        self._threads = []
+        self.probed = 0
+        self.rendered = 0
+        self.written = 0
+        self.errors = 0
+
+    def _guard(self, name, fn):
+        try:
+            fn()
+        except Exception as e:
+            self.errors += 1
+            print(f"Этап {name} остановлен из-за ошибки:", e)
+        finally:
+            self._stop.set()
+
+    def _put(self, sample):
+        dropped = self.samples.dropped
+        self.samples.put(sample)
+        if self.samples.dropped > dropped:
+            METRICS.inc("busybar_frames_dropped_total", widget=self.name, stage="render")
+
+    def _probe_once(self, index, ts):
+        self._put((index, self.probe(self.servers, timeout_s=self.timeout_s), ts))
+        self.probed += 1
+
+    def _probe_loop(self):
+        while not self._stop.is_set():
+            tick = self.ticks.wait()
+            # время замера — дедлайн тика на настенных часах
+            ts = time.time() - tick.lateness
+            if self._probes is None:
+                self._probe_once(tick.index, ts)
+            elif self._slots.acquire(blocking=False):
+                self._probes.submit(self._guard_probe, tick.index, ts)
+            else:
+                # все замеры ещё в полёте: тик пропускаем, столбец его не ждёт
+                self.skipped += 1
+                METRICS.inc("busybar_frames_dropped_total", widget=self.name, stage="probe")
+                self._put((tick.index, None, ts))
+
+    def _guard_probe(self, index, ts):
+        try:
+            self._probe_once(index, ts)
+        except Exception as e:
+            self.errors += 1
+            print("Замер не удался:", e)
+        finally:
+            self._slots.release()
+
+    def _render_loop(self):
+        while not self._stop.is_set():
+            batch = self.samples.get_all(POLL_S)
+            if not batch:
+                continue
+            with METRICS.time("busybar_stage_seconds", stage="render", widget=self.name):
+                columns = sum(self.buffers.record(results, ts, index) for index, results, ts in batch)
+                if not columns:
+                    continue
+                frame = self.render(max(index for index, _, _ in batch) // self.buffers.per_column)
+            dropped = self.frames.dropped
+            self.frames.put(frame)
+            if self.frames.dropped > dropped:
+                METRICS.inc("busybar_frames_dropped_total", widget=self.name, stage="write")
+            self.rendered += 1
+
+    def start(self):
+        for name, target in (("probe", self._probe_loop), ("render", self._render_loop)):
+            t = threading.Thread(target=self._guard, args=(name, target), name=f"ping-{name}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        return self
+
+    def stop(self):
+        self._stop.set()
+        for t in self._threads:
+            t.join(timeout=2 * POLL_S + self.timeout_s)
+        if self._probes is not None:
+            self._probes.shutdown(wait=False)
+
+    def run(self):
+        """Запускает probe и render и пишет кадры в текущем потоке до остановки."""
+        self.start()
+        while not self._stop.is_set():
+            frame = self.frames.get(POLL_S)
+            if frame is None:
+                continue
+            self.write(frame)
+            self.written += 1
+
+    def summary(self):
+        return (f"конвейер: замеров {self.probed}, кадров {self.rendered}, отправлено {self.written}, "
+                f"кадров вытеснено {self.frames.dropped}, замеров потеряно {self.samples.dropped}, "
+                f"тиков без замера {self.skipped}")
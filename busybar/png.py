@@ -0,0 +1,248 @@
+"""
+png.py — кодировщик PNG с палитрой для ассетов устройства, без Pillow.
+
+Графики и иконки используют 2–4 цвета, поэтому вместо RGBA (4 байта на
+пиксель) пишем indexed PNG: глубина 1/2/4/8 бит по размеру палитры, только
+обязательные чанки (IHDR, PLTE, tRNS при наличии прозрачности, IDAT, IEND).
+Из нескольких вариантов фильтра строк берётся самый короткий, окно zlib
+ужато под размер данных — микроконтроллеру устройства проще распаковать.
+
+    encoder = IndexedPngEncoder()
+    data = encoder.encode(width, height, pixels, palette)  # pixels: индексы, построчно
+    print(encoder.summary())                               # размер и время кодирования
+
+decode_png() — обратное преобразование любого PNG без interlace в RGBA,
+для симулятора устройства (busybar.simulator).
+"""
+import struct
+import time
+import zlib
+
+from busybar.metrics import METRICS
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+COLOR_TYPE_PALETTE = 3
+
+# Фильтры строк, из которых выбирается лучший: 0 — None, 1 — Sub, 2 — Up
+FILTERS = (0, 1, 2)
+
+
+def _chunk(tag, data):
+    return (struct.pack("!I", len(data)) + tag + data
+            + struct.pack("!I", zlib.crc32(tag + data) & 0xFFFFFFFF))
+
+
+def bit_depth_for(colors):
+    for depth in (1, 2, 4):
+        if colors <= 1 << depth:
+            return depth
+    return 8
+
+
+def pack_row(indices, depth):
+    """Упаковывает индексы строки в байты (старшие биты — левый пиксель)."""
+    if depth == 8:
+        return bytes(indices)
+    per_byte = 8 // depth
+    out = bytearray((len(indices) + per_byte - 1) // per_byte)
+    for i, v in enumerate(indices):
+        out[i // per_byte] |= v << (8 - depth * (i % per_byte + 1))
+    return bytes(out)
+
+
+def _filter_rows(rows, ftype):
+    out = bytearray()
+    prev = bytes(len(rows[0])) if rows else b""
+    for row in rows:
+        out.append(ftype)
+        if ftype == 0:
+            out += row
+        elif ftype == 1:        # Sub: для палитры bpp = 1 байт
+            out.append(row[0])
+            out += bytes((row[i] - row[i - 1]) & 0xFF for i in range(1, len(row)))
+        else:                   # Up
+            out += bytes((a - b) & 0xFF for a, b in zip(row, prev))
+        prev = row
+    return bytes(out)
+
+
+def _compress(raw):
+    # окно 2^wbits не больше, чем нужно для этих данных (минимум 2^9)
+    wbits = max(9, min(15, (len(raw) - 1).bit_length()))
+    c = zlib.compressobj(9, zlib.DEFLATED, wbits, 9)
+    return c.compress(raw) + c.flush()
+
+
+def encode_indexed(width, height, pixels, palette):
+    """
+    pixels  — индексы палитры, построчно (bytes/bytearray длины width*height
+              или последовательность строк);
+    palette — список цветов (r, g, b) или (r, g, b, a).
+    """
+    if isinstance(pixels, (bytes, bytearray, memoryview)):
+        flat = bytes(pixels)
+        rows_idx = [flat[y * width:(y + 1) * width] for y in range(height)]
+    else:
+        rows_idx = [bytes(r) for r in pixels]
+    depth = bit_depth_for(len(palette))
+    rows = [pack_row(r, depth) for r in rows_idx]
+
+    idat = min((_compress(_filter_rows(rows, f)) for f in FILTERS), key=len)
+
+    plte = b"".join(bytes(c[:3]) for c in palette)
+    alphas = [c[3] if len(c) > 3 else 255 for c in palette]
+    # tRNS можно обрезать после последнего непрозрачного-не-до-конца цвета
+    last = max((i for i, a in enumerate(alphas) if a != 255), default=-1)
+
+    out = [PNG_SIGNATURE,
+           _chunk(b"IHDR", struct.pack("!IIBBBBB", width, height, depth, COLOR_TYPE_PALETTE, 0, 0, 0)),
+           _chunk(b"PLTE", plte)]
+    if last >= 0:
+        out.append(_chunk(b"tRNS", bytes(alphas[:last + 1])))
+    out.append(_chunk(b"IDAT", idat))
+    out.append(_chunk(b"IEND", b""))
+    return b"".join(out)
+
+
+class IndexedPngEncoder:
+    """encode_indexed + статистика по кадрам: размер и время кодирования (и в busybar.metrics)."""
+
+    def __init__(self, image="graph"):
+        self.image = image
+        self.frames = 0
+        self.last_size = 0
+        self.last_time_ms = 0.0
+        self.total_bytes = 0
+        self.total_time_ms = 0.0
+
+    def encode(self, width, height, pixels, palette):
+        t0 = time.perf_counter()
+        data = encode_indexed(width, height, pixels, palette)
+        dt = (time.perf_counter() - t0) * 1000.0
+        self.frames += 1
+        self.last_size = len(data)
+        self.last_time_ms = dt
+        self.total_bytes += len(data)
+        self.total_time_ms += dt
+        METRICS.observe("busybar_stage_seconds", dt / 1000.0, stage="encode", image=self.image)
+        return data
+
+    def summary(self):
+        return f"png {self.last_size} B / {self.last_time_ms:.2f} ms"
+
+
+def encode_rgb(width, height, rgb):
+    """Truecolor PNG из байтов RGB построчно (снимок экрана симулятора)."""
+    stride = width * 3
+    raw = b"".join(b"\x00" + bytes(rgb[y * stride:(y + 1) * stride]) for y in range(height))
+    return b"".join([PNG_SIGNATURE,
+                     _chunk(b"IHDR", struct.pack("!IIBBBBB", width, height, 8, 2, 0, 0, 0)),
+                     _chunk(b"IDAT", _compress(raw)),
+                     _chunk(b"IEND", b"")])
+
+
+# === Декодирование (для симулятора устройства) ===
+
+def _paeth(a, b, c):
+    p = a + b - c
+    pa, pb, pc = abs(p - a), abs(p - b), abs(p - c)
+    if pa <= pb and pa <= pc:
+        return a
+    return b if pb <= pc else c
+
+
+def _unfilter(raw, height, stride, bpp):
+    rows = []
+    prev = bytearray(stride)
+    pos = 0
+    for _ in range(height):
+        ftype = raw[pos]
+        row = bytearray(raw[pos + 1:pos + 1 + stride])
+        pos += 1 + stride
+        for i in range(stride):
+            a = row[i - bpp] if i >= bpp else 0
+            b = prev[i]
+            if ftype == 1:
+                row[i] = (row[i] + a) & 0xFF
+            elif ftype == 2:
+                row[i] = (row[i] + b) & 0xFF
+            elif ftype == 3:
+                row[i] = (row[i] + ((a + b) >> 1)) & 0xFF
+            elif ftype == 4:
+                c = prev[i - bpp] if i >= bpp else 0
+                row[i] = (row[i] + _paeth(a, b, c)) & 0xFF
+            elif ftype != 0:
+                raise ValueError(f"PNG: неизвестный фильтр {ftype}")
+        rows.append(row)
+        prev = row
+    return rows
+
+
+def _samples(row, width, channels, depth):
+    """Значения каналов строки, приведённые к 0..255 только для 16 бит (старший байт)."""
+    if depth == 8:
+        return row
+    if depth == 16:
+        return row[0::2]
+    per_byte = 8 // depth
+    mask = (1 << depth) - 1
+    out = bytearray(width * channels)
+    for i in range(width * channels):
+        out[i] = (row[i // per_byte] >> (8 - depth * (i % per_byte + 1))) & mask
+    return out
+
+
+def decode_png(data):
+    """
+    PNG -> (width, height, pixels), pixels — строки списков (r, g, b, a).
+    Поддерживаются все типы цвета без interlace — этого хватает для ассетов виджетов.
+    """
+    if data[:8] != PNG_SIGNATURE:
+        raise ValueError("не PNG")
+    pos = 8
+    idat = bytearray()
+    palette, trns = [], b""
+    header = None
+    while pos + 8 <= len(data):
+        length, tag = struct.unpack("!I4s", data[pos:pos + 8])
+        body = data[pos + 8:pos + 8 + length]
+        pos += 12 + length
+        if tag == b"IHDR":
+            header = struct.unpack("!IIBBBBB", body)
+        elif tag == b"PLTE":
+            palette = [tuple(body[i:i + 3]) for i in range(0, len(body), 3)]
+        elif tag == b"tRNS":
+            trns = body
+        elif tag == b"IDAT":
+            idat += body
+        elif tag == b"IEND":
+            break
+    if header is None:
+        raise ValueError("PNG без IHDR")
+    width, height, depth, color_type, _, _, interlace = header
+    if interlace:
+        raise ValueError("interlaced PNG не поддерживается")
+    channels = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}[color_type]
+    bits = channels * depth
+    stride = (width * bits + 7) // 8
+    rows = _unfilter(zlib.decompress(bytes(idat)), height, stride, max(1, bits // 8))
+
+    gray_scale = 255 // ((1 << min(depth, 8)) - 1)
+    pixels = []
+    for row in rows:
+        s = _samples(row, width, channels, depth)
+        out = []
+        for x in range(width):
+            v = s[x * channels:(x + 1) * channels]
+            if color_type == 3:
+                r, g, b = palette[v[0]]
+                a = trns[v[0]] if v[0] < len(trns) else 255
+            elif color_type in (0, 4):
+                r = g = b = v[0] * gray_scale
+                a = v[1] if color_type == 4 else 255
+            else:
+                r, g, b = v[0], v[1], v[2]
+                a = v[3] if color_type == 6 else 255
+            out.append((r, g, b, a))
+        pixels.append(out)
+    return width, height, pixels
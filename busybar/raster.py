@@ -0,0 +1,223 @@
+"""
+raster.py — растеризация кадра 72x16 на стороне клиента.
+
+Тот же растеризатор, что в симуляторе устройства (busybar.simulator): текст
+шрифтами busybar.font с обрезкой по width, картинки с альфа-смешиванием.
+
+Режим «кадр целиком» (RasterFrames): вместо загрузки графика и draw с
+текстом, логотипом и графиком клиент сам собирает весь экран и отправляет
+его одной картинкой с draw из одного элемента. Раскладка текста точная и
+детерминированная (не зависит от шрифтов устройства), а неизменный кадр
+не стоит ни одного запроса: загрузку пропускают слоты (busybar.slots), draw — DrawDiffer.
+
+Текст со scroll_rate шире своего width прокручивается по времени, как на
+устройстве (отсчёт с кадра, где текст появился или сменился), но сдвигается
+только с каждым новым кадром (show), а не плавно: при кадре раз в секунду и
+scroll_rate 60 текст прыгает на 60 px.
+
+    frames = RasterFrames(get_client(), "ping_app")
+    frames.add_png("csgo.png", logo_bytes)
+    frames.set_image("graph.png", graph.rgba_rows())
+    frames.show(elements)       # те же элементы, что ушли бы в /api/display/draw
+"""
+import time
+
+from busybar.font import FONTS
+from busybar.png import IndexedPngEncoder, decode_png, encode_indexed, encode_rgb
+from busybar.slots import SLOT_COUNT, AssetSlots
+
+WIDTH = 72
+HEIGHT = 16
+# Пробел между концом и повтором прокручиваемого текста, px
+SCROLL_GAP = 8
+
+FRAME_FILE = "frame.png"
+FRAME_TIMEOUT = 2
+# Сколько ждать загрузку нового кадра перед draw (см. busybar.slots)
+FRAME_WAIT_S = 0.5
+
+
+def parse_color(value):
+    """'#RRGGBB' или '#RRGGBBAA' -> (r, g, b, a)."""
+    value = (value or "#FFFFFF").lstrip("#")
+    if len(value) not in (6, 8):
+        raise ValueError(f"неверный цвет: {value!r}")
+    r, g, b = (int(value[i:i + 2], 16) for i in (0, 2, 4))
+    a = int(value[6:8], 16) if len(value) == 8 else 255
+    return r, g, b, a
+
+
+class Framebuffer:
+    """RGB 72x16 с альфа-смешиванием и обрезкой по экрану и по прямоугольнику."""
+
+    def __init__(self, width=WIDTH, height=HEIGHT):
+        self.width = width
+        self.height = height
+        self.rgb = bytearray(width * height * 3)
+
+    def blend(self, x, y, color, clip=None):
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return
+        if clip is not None and not (clip[0] <= x < clip[1]):
+            return
+        r, g, b, a = color
+        if a == 0:
+            return
+        i = (y * self.width + x) * 3
+        if a == 255:
+            self.rgb[i:i + 3] = bytes((r, g, b))
+            return
+        for k, v in enumerate((r, g, b)):
+            self.rgb[i + k] = (v * a + self.rgb[i + k] * (255 - a)) // 255
+
+    def image(self, x0, y0, pixels):
+        for y, row in enumerate(pixels):
+            for x, color in enumerate(row):
+                self.blend(x0 + x, y0 + y, color)
+
+    def text(self, x0, y0, text, font, color, width, offset=0):
+        clip = (x0, x0 + width)
+        for x, y in font.pixels(text):
+            self.blend(x0 + x - offset, y0 + y, color, clip)
+
+    def pixel(self, x, y):
+        i = (y * self.width + x) * 3
+        return tuple(self.rgb[i:i + 3])
+
+    def lit(self):
+        """Число непустых пикселей (для тестов и статистики)."""
+        return sum(1 for i in range(0, len(self.rgb), 3) if any(self.rgb[i:i + 3]))
+
+    def png(self, encoder=None):
+        """PNG кадра: с палитрой, если цветов не больше 256, иначе truecolor."""
+        colors = {}
+        indices = bytearray(self.width * self.height)
+        for p in range(self.width * self.height):
+            color = bytes(self.rgb[p * 3:p * 3 + 3])
+            index = colors.get(color)
+            if index is None:
+                if len(colors) == 256:
+                    return encode_rgb(self.width, self.height, self.rgb)
+                index = colors[color] = len(colors)
+            indices[p] = index
+        palette = [tuple(c) for c in colors]
+        if encoder is not None:
+            return encoder.encode(self.width, self.height, indices, palette)
+        return encode_indexed(self.width, self.height, indices, palette)
+
+    def ascii(self, color=True):
+        lines = []
+        for y in range(self.height):
+            line = []
+            for x in range(self.width):
+                r, g, b = self.pixel(x, y)
+                if not (r or g or b):
+                    line.append(" ")
+                elif color:
+                    line.append(f"\x1b[38;2;{r};{g};{b}m█\x1b[0m")
+                else:
+                    line.append("█")
+            lines.append("".join(line))
+        return "\n".join(lines)
+
+
+def draw_elements(fb, elements, images, elapsed=0.0, scroll=None):
+    """
+    Рисует элементы draw в fb. images — {path: строки пикселей (r, g, b, a)};
+    elapsed — секунд с момента draw (истёкшие элементы пропускаются,
+    прокрутка текста сдвигается); scroll — {id элемента: секунд прокрутки},
+    если отсчёт прокрутки у текста свой. Возвращает число картинок, которых нет в images.
+    """
+    missing = 0
+    for el in elements:
+        if el.get("timeout") is not None and elapsed >= el["timeout"]:
+            continue
+        x, y = el.get("x", 0), el.get("y", 0)
+        if el.get("type") == "image":
+            pixels = images.get(el.get("path"))
+            if pixels is None:
+                missing += 1
+                continue
+            fb.image(x, y, pixels)
+        elif el.get("type") == "text":
+            font = FONTS[el.get("font", "small")]
+            text = str(el.get("text", ""))
+            width = el.get("width", fb.width - x)
+            color = parse_color(el.get("color"))
+            text_w = font.text_width(text)
+            rate = el.get("scroll_rate", 0)
+            if text_w > width and rate:
+                period = text_w + SCROLL_GAP
+                seconds = elapsed if scroll is None else scroll.get(el.get("id"), elapsed)
+                offset = int(seconds * rate) % period
+                fb.text(x, y, text, font, color, width, offset)
+                fb.text(x, y, text, font, color, width, offset - period)
+            else:
+                fb.text(x, y, text, font, color, width)
+    return missing
+
+
+class RasterFrames:
+    """Весь экран одной картинкой: upload кадра + draw из одного элемента."""
+
+    def __init__(self, client, app_id, frame_file=FRAME_FILE, timeout=FRAME_TIMEOUT,
+                 slots=SLOT_COUNT, wait_s=FRAME_WAIT_S):
+        self.client = client
+        self.app_id = app_id
+        self.timeout = timeout
+        self.wait_s = wait_s
+        # кадр грузится в свободный слот (frame_0.png, frame_1.png, ...), пока на экране прошлый
+        self.slots = AssetSlots(client, app_id, frame_file, slots)
+        self.images = {}            # path -> строки пикселей (r, g, b, a)
+        self.encoder = IndexedPngEncoder(image=frame_file)
+        self._scroll = {}           # id текста -> (текст, время начала прокрутки)
+        self._scroll_noted = False
+
+    def add_png(self, path, data):
+        """Картинка, на которую ссылаются элементы (логотип, иконка) — декодируется один раз."""
+        self.images[path] = decode_png(data)[2]
+
+    def set_image(self, path, rows):
+        self.images[path] = rows
+
+    def _scroll_seconds(self, elements, now):
+        """Секунд прокрутки для каждого текста: отсчёт заново, когда текст сменился."""
+        scroll = {}
+        for el in elements:
+            if el.get("type") != "text" or not el.get("scroll_rate"):
+                continue
+            key, text = el.get("id"), str(el.get("text", ""))
+            width = el.get("width", WIDTH - el.get("x", 0))
+            if FONTS[el.get("font", "small")].text_width(text) <= width:
+                continue
+            known = self._scroll.get(key)
+            if known is None or known[0] != text:
+                known = self._scroll[key] = (text, now)
+            scroll[key] = now - known[1]
+        for key in set(self._scroll) - set(scroll):
+            del self._scroll[key]
+        return scroll
+
+    def render(self, elements, now=None):
+        now = time.monotonic() if now is None else now
+        scroll = self._scroll_seconds(elements, now)
+        if any(scroll.values()) and not self._scroll_noted:
+            self._scroll_noted = True
+            print(f"Кадр {self.app_id}: прокручиваемый текст сдвигается только с каждым новым кадром")
+        fb = Framebuffer()
+        missing = draw_elements(fb, elements, self.images, scroll=scroll)
+        if missing:
+            print(f"Кадр {self.app_id}: нет {missing} картинок из элементов")
+        return fb
+
+    def show(self, elements):
+        """Растеризует элементы и выводит кадр. True/False, как DeviceClient."""
+        self.slots.submit(self.render(elements).png(self.encoder))
+        path = self.slots.latest(self.wait_s)
+        if path is None:
+            return False
+        return self.client.draw({
+            "app_id": self.app_id,
+            "elements": [{"id": "frame", "timeout": self.timeout, "type": "image",
+                          "path": path, "x": 0, "y": 0}],
+        })
@@ -0,0 +1,149 @@
+"""
+rolling.py — скользящая статистика пинга за окно: p50/p95/p99, среднее,
+джиттер и доля потерь.
+
+Последний замер на дисплее ничего не говорит: один всплеск — и «180 ms».
+RollingStats держит окно из N последних замеров и обновляется за O(log n)
+на замер без пересортировки окна:
+
+    - RTT квантуются с шагом RESOLUTION_MS в корзины дерева Фенвика
+      (счётчики по корзинам); перцентиль — спуск по дереву за O(log корзин);
+    - сумма RTT и сумма |разностей соседних RTT| (джиттер, как в RFC 3550 —
+      среднее изменение задержки между пакетами) ведутся нарастающим итогом;
+    - выпадающий из окна замер вычитается из всех счётчиков.
+
+    stats = RollingStats(window=60)
+    stats.push(23.4)        # RTT в мс или None (потеря)
+    stats.percentile(95), stats.mean(), stats.jitter(), stats.loss()
+"""
+import collections
+
+# Шаг квантования RTT, мс; верхняя корзина собирает всё, что медленнее MAX_MS
+RESOLUTION_MS = 0.1
+MAX_MS = 2000.0
+
+# Окна (в замерах), которые по умолчанию ведутся для каждого хоста
+WINDOWS = (10, 60, 300)
+
+
+class Fenwick:
+    """Дерево Фенвика над счётчиками: add и префиксная сумма за O(log n), поиск k-го за O(log n)."""
+
+    def __init__(self, size):
+        self.size = size
+        self.tree = [0] * (size + 1)
+        self._top = 1 << (size.bit_length() - 1)
+
+    def add(self, i, delta):
+        i += 1
+        while i <= self.size:
+            self.tree[i] += delta
+            i += i & -i
+
+    def prefix(self, i):
+        """Сумма счётчиков [0, i]."""
+        i += 1
+        total = 0
+        while i > 0:
+            total += self.tree[i]
+            i -= i & -i
+        return total
+
+    def find(self, k):
+        """Наименьший индекс i, при котором prefix(i) >= k (k от 1)."""
+        pos, step = 0, self._top
+        while step:
+            nxt = pos + step
+            if nxt <= self.size and self.tree[nxt] < k:
+                pos = nxt
+                k -= self.tree[nxt]
+            step >>= 1
+        return pos
+
+
+class RollingStats:
+    """Статистика по последним window замерам (RTT в мс, None — потеря)."""
+
+    def __init__(self, window, resolution_ms=RESOLUTION_MS, max_ms=MAX_MS):
+        self.window = window
+        self.resolution_ms = resolution_ms
+        self.bins = int(max_ms / resolution_ms) + 1
+        self.tree = Fenwick(self.bins)
+        self.samples = collections.deque()     # (значение, корзина или None)
+        self.received = 0
+        self.rtt_sum = 0.0
+        self.diffs = collections.deque()       # |RTT - предыдущий RTT| в окне
+        self.diff_sum = 0.0
+        self._last_rtt = None
+
+    def _bin(self, rtt):
+        return min(int(rtt / self.resolution_ms), self.bins - 1)
+
+    def push(self, rtt):
+        if len(self.samples) == self.window:
+            self._drop_oldest()
+        if rtt is None:
+            self.samples.append((None, None))
+            return
+        b = self._bin(rtt)
+        self.tree.add(b, 1)
+        self.samples.append((rtt, b))
+        self.received += 1
+        self.rtt_sum += rtt
+        if self._last_rtt is not None:
+            d = abs(rtt - self._last_rtt)
+            self.diffs.append(d)
+            self.diff_sum += d
+        self._last_rtt = rtt
+
+    def _drop_oldest(self):
+        rtt, b = self.samples.popleft()
+        if rtt is None:
+            return
+        self.tree.add(b, -1)
+        self.received -= 1
+        self.rtt_sum -= rtt
+        # разность «старейший — следующий» больше не в окне
+        if self.diffs and len(self.diffs) >= self.received:
+            self.diff_sum -= self.diffs.popleft()
+        if not self.received:
+            self.rtt_sum = self.diff_sum = 0.0      # без накопленной ошибки округления
+            self._last_rtt = None
+
+    def __len__(self):
+        return len(self.samples)
+
+    def percentile(self, q):
+        """q-й перцентиль RTT (0..100) в мс с точностью resolution_ms; None без ответов."""
+        if not self.received:
+            return None
+        k = max(1, -(-self.received * q // 100))      # ранг: ceil(n * q / 100)
+        return (self.tree.find(int(k)) + 0.5) * self.resolution_ms
+
+    def mean(self):
+        return self.rtt_sum / self.received if self.received else None
+
+    def jitter(self):
+        """Среднее |ΔRTT| между соседними ответами, мс."""
+        return self.diff_sum / len(self.diffs) if self.diffs else None
+
+    def loss(self):
+        """Доля потерь в окне (0..1); None для пустого окна."""
+        if not self.samples:
+            return None
+        return 1.0 - self.received / len(self.samples)
+
+    def snapshot(self):
+        return {
+            "p50": self.percentile(50), "p95": self.percentile(95), "p99": self.percentile(99),
+            "mean": self.mean(), "jitter": self.jitter(), "loss": self.loss(), "samples": len(self),
+        }
+
+
+def format_stats(stats):
+    """Текст для дисплея: 'p50 23 p95 41 ±3 0%'; '--', пока ответов нет."""
+    p50 = stats.percentile(50)
+    if p50 is None:
+        return "--"
+    return (f"p50 {p50:.0f} p95 {stats.percentile(95):.0f} "
+            f"±{stats.jitter() or 0:.0f} {stats.loss() * 100:.0f}%")
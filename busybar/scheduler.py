@@ -0,0 +1,103 @@
+"""
+scheduler.py — планировщик тиков без дрейфа для долгоживущих циклов виджетов.
+
+Дедлайны считаются по монотонным часам от одной опорной точки
+(anchor + k * interval), поэтому время работы тела цикла не накапливается,
+а подстройка системных часов (NTP) не сдвигает тики. Сетка выровнена по
+границам секунд настенных часов: часы на дисплее меняют цифру вовремя.
+Если настенные часы скачком ушли больше чем на REALIGN_TOLERANCE_S, сетка
+перевыравнивается.
+
+Опоздавшие тики не копятся:
+    policy="coalesce" — пропущенные тики схлопываются в один, он срабатывает сразу;
+    policy="drop"     — пропущенные тики выбрасываются, ждём следующий дедлайн сетки.
+
+    ticks = TickScheduler(1.0)
+    while True:
+        tick = ticks.wait()      # Tick(index, deadline, missed, lateness)
+        ...
+"""
+import collections
+import math
+import time
+
+POLICIES = ("coalesce", "drop")
+REALIGN_TOLERANCE_S = 0.05
+
+Tick = collections.namedtuple("Tick", "index deadline missed lateness")
+
+
+class TickScheduler:
+    def __init__(self, interval=1.0, align=True, policy="coalesce",
+                 clock=time.monotonic, wall=time.time, sleep=time.sleep):
+        if policy not in POLICIES:
+            raise ValueError(f"policy должен быть одним из {POLICIES}")
+        self.interval = interval
+        self.align = align
+        self.policy = policy
+        self._clock = clock
+        self._wall = wall
+        self._sleep = sleep
+        self.index = 0          # номер следующего тика на сетке
+        self.fired = 0
+        self.missed = 0
+        self.realigns = 0
+        self._anchor = None
+        self._wall_offset = None
+
+    def _set_anchor(self):
+        now = self._clock()
+        wall = self._wall()
+        self._wall_offset = wall - now
+        # следующий дедлайн — ближайшая граница interval по настенным часам;
+        # номер тика при перевыравнивании не сбрасывается
+        phase = (-wall) % self.interval if self.align else 0.0
+        self._anchor = now + phase - self.index * self.interval
+
+    def _check_wall_step(self):
+        offset = self._wall() - self._clock()
+        if abs(offset - self._wall_offset) > REALIGN_TOLERANCE_S:
+            self.realigns += 1
+            self._set_anchor()
+
+    def deadline(self, index=None):
+        return self._anchor + (self.index if index is None else index) * self.interval
+
+    def wait(self):
+        """Ждёт следующий тик сетки и возвращает Tick."""
+        if self._anchor is None:
+            self._set_anchor()
+        elif self.align:
+            self._check_wall_step()
+
+        now = self._clock()
+        deadline = self.deadline()
+        missed = 0
+        if now > deadline + self.interval:
+            # опоздали больше чем на период: пропущенные дедлайны не догоняем
+            missed = int(math.floor((now - deadline) / self.interval))
+            self.missed += missed
+            self.index += missed
+            deadline = self.deadline()
+            if self.policy == "drop":
+                # и текущий просроченный тоже выбрасываем
+                missed += 1
+                self.missed += 1
+                self.index += 1
+                deadline = self.deadline()
+
+        delay = deadline - self._clock()
+        if delay > 0:
+            self._sleep(delay)
+        tick = Tick(self.index, deadline, missed, max(0.0, self._clock() - deadline))
+        self.index += 1
+        self.fired += 1
+        return tick
+
+    def __iter__(self):
+        while True:
+            yield self.wait()
+
+    def summary(self):
+        return (f"тики: {self.fired}, пропущено {self.missed}, "
+                f"перевыравниваний {self.realigns}")
@@ -0,0 +1,252 @@
+"""
+simulator.py — локальная замена LED-устройства 72x16 для тестов и бенчмарков.
+
+HTTP-сервер с теми же эндпоинтами, что у устройства
+(см. Step_0_Teach_AI_to_use_HTTP_API.txt):
+    POST /api/assets/upload?app_id=...&file=...   — тело: картинка PNG
+    POST /api/display/draw                         — тело: JSON с элементами
+    GET  /api/status/system                        — {"uptime": секунды с загрузки}
+                                                     (status=False — 404, как в
+                                                     документированном API)
+Ассеты хранятся по app_id, кадр растеризуется в буфер 72x16: текст шрифтами
+small/medium/big (busybar.font) с обрезкой по width и прокруткой со скоростью
+scroll_rate (пикселей в секунду), картинки — с альфа-смешиванием. Элемент
+исчезает через timeout секунд после draw. На экране — приложение, которое
+рисовало последним и у которого ещё остались живые элементы.
+
+Медленное устройство имитируется параметрами DeviceSimulator:
+    latency, jitter — задержка ответа (с);
+    bandwidth       — скорость приёма тела запроса (байт/с);
+    fail_rate       — доля запросов, на которые отвечаем 503;
+    hang_rate       — доля запросов, которые «зависают» на hang_s
+                      (клиент должен уйти по таймауту).
+reboot() стирает ассеты и экран и сбрасывает uptime, как перезагрузка устройства.
+
+Служебные эндпоинты симулятора:
+    GET  /sim/screen.png — текущий экран;
+    GET  /sim/stats      — счётчики запросов (JSON);
+    POST /sim/reboot     — перезагрузка.
+
+    sim = DeviceSimulator(latency=0.02)
+    server = start_server(sim)                 # в фоне, свободный порт
+    client = DeviceClient(server_address(server))
+"""
+import collections
+import http.server
+import json
+import random
+import sys
+import threading
+import time
+import urllib.parse
+
+from busybar.font import FONTS
+from busybar.png import decode_png
+from busybar.raster import Framebuffer, draw_elements, parse_color
+
+
+class DeviceSimulator:
+    """Состояние устройства: ассеты по app_id, последние кадры приложений, счётчики."""
+
+    def __init__(self, latency=0.0, jitter=0.0, bandwidth=None, fail_rate=0.0,
+                 hang_rate=0.0, hang_s=10.0, seed=None, clock=time.monotonic, status=True):
+        self.latency = latency
+        self.jitter = jitter
+        self.bandwidth = bandwidth
+        self.fail_rate = fail_rate
+        self.hang_rate = hang_rate
+        self.hang_s = hang_s
+        self.has_status = status
+        self._random = random.Random(seed)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.assets = {}          # app_id -> {file: (width, height, pixels)}
+        self.apps = {}            # app_id -> (elements, drawn_at)
+        self.stats = collections.Counter()
+        self.booted = clock()
+
+    # --- имитация медленного устройства ---
+    def delay_for(self, body_len):
+        """Сколько «обрабатывается» запрос с телом body_len байт."""
+        # один Random на все потоки сервера: числа берём под блокировкой
+        with self._lock:
+            delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0.0)
+        if self.bandwidth:
+            delay += body_len / self.bandwidth
+        return delay
+
+    def inject(self):
+        """None — обработать запрос; иначе 'fail' или 'hang' (учитывается в stats)."""
+        with self._lock:
+            roll = self._random.random()
+            if roll < self.fail_rate:
+                fault = "fail"
+            elif roll < self.fail_rate + self.hang_rate:
+                fault = "hang"
+            else:
+                return None
+            self.stats["failed" if fault == "fail" else "hung"] += 1
+        return fault
+
+    def _reject(self, message):
+        with self._lock:
+            self.stats["rejected"] += 1
+        return 400, message
+
+    # --- API устройства ---
+    def upload(self, app_id, filename, data):
+        """(HTTP-код, сообщение)."""
+        if not app_id or not filename:
+            return self._reject("нужны параметры app_id и file")
+        try:
+            image = decode_png(data)
+        except Exception as e:
+            return self._reject(f"не удалось прочитать PNG: {e}")
+        with self._lock:
+            self.assets.setdefault(app_id, {})[filename] = image
+            self.stats["upload"] += 1
+            self.stats["upload_bytes"] += len(data)
+        return 200, "ok"
+
+    def draw(self, body):
+        try:
+            payload = json.loads(body.decode("utf-8"))
+            app_id = payload["app_id"]
+            elements = list(payload["elements"])
+            for el in elements:
+                if el.get("type") == "text":
+                    parse_color(el.get("color"))
+                    if el.get("font", "small") not in FONTS:
+                        raise ValueError(f"неизвестный шрифт {el['font']!r}")
+        except Exception as e:
+            return self._reject(f"неверный запрос: {e}")
+        with self._lock:
+            # новый draw приложения заменяет его прошлые элементы
+            self.apps[app_id] = (elements, self._clock())
+            self.stats["draw"] += 1
+            self.stats["draw_bytes"] += len(body)
+        return 200, "ok"
+
+    def status(self):
+        return {"uptime": round(self._clock() - self.booted, 3)}
+
+    def reboot(self):
+        with self._lock:
+            self.assets.clear()
+            self.apps.clear()
+            self.booted = self._clock()
+            self.stats["reboots"] += 1
+
+    # --- экран ---
+    def active_app(self, now=None):
+        """app_id на экране: последний рисовавший, у кого есть неистёкшие элементы."""
+        now = self._clock() if now is None else now
+        for app_id, (elements, drawn_at) in sorted(self.apps.items(), key=lambda kv: -kv[1][1]):
+            if any(now - drawn_at < el.get("timeout", 0) for el in elements):
+                return app_id
+        return None
+
+    def render(self, now=None):
+        now = self._clock() if now is None else now
+        fb = Framebuffer()
+        with self._lock:
+            app_id = self.active_app(now)
+            if app_id is None:
+                return fb
+            elements, drawn_at = self.apps[app_id]
+            images = {name: image[2] for name, image in self.assets.get(app_id, {}).items()}
+            self.stats["missing_assets"] += draw_elements(fb, elements, images, now - drawn_at)
+        return fb
+
+    def stats_snapshot(self):
+        """Копия счётчиков (потоки сервера меняют их на ходу)."""
+        with self._lock:
+            return dict(self.stats)
+
+    def summary(self):
+        s = collections.Counter(self.stats_snapshot())
+        return (f"симулятор: upload {s['upload']} ({s['upload_bytes']} B), draw {s['draw']}, "
+                f"отказов {s['failed']}, зависаний {s['hung']}, отклонено {s['rejected']}")
+
+
+def make_handler(sim):
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # заголовки и тело уходят разными send: без TCP_NODELAY каждый ответ
+        # ждёт delayed ACK клиента (~40 мс), и это съедает весь замер
+        disable_nagle_algorithm = True
+
+        def _reply(self, status, body, content_type="text/plain; charset=utf-8"):
+            if isinstance(body, str):
+                body = body.encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            url = urllib.parse.urlsplit(self.path)
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            if url.path == "/sim/reboot":
+                sim.reboot()
+                return self._reply(200, "ok")
+            if url.path not in ("/api/assets/upload", "/api/display/draw"):
+                return self._reply(404, "not found")
+
+            time.sleep(sim.delay_for(len(body)))
+            fault = sim.inject()
+            if fault == "fail":
+                return self._reply(503, "injected failure")
+            if fault == "hang":
+                time.sleep(sim.hang_s)
+
+            if url.path == "/api/assets/upload":
+                query = urllib.parse.parse_qs(url.query)
+                status, message = sim.upload(query.get("app_id", [""])[0],
+                                             query.get("file", [""])[0], body)
+            else:
+                status, message = sim.draw(body)
+            self._reply(status, message)
+
+        def do_GET(self):
+            path = urllib.parse.urlsplit(self.path).path
+            if path == "/sim/screen.png":
+                return self._reply(200, sim.render().png(), "image/png")
+            if path == "/sim/stats":
+                return self._reply(200, json.dumps(sim.stats_snapshot()), "application/json")
+            if path == "/api/status/system" and sim.has_status:
+                return self._reply(200, json.dumps(sim.status()), "application/json")
+            self._reply(404, "not found")
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+class SimulatorServer(http.server.ThreadingHTTPServer):
+    def handle_error(self, request, client_address):
+        # клиент ушёл по таймауту или закрыл соединение — для симулятора это норма
+        if isinstance(sys.exc_info()[1], ConnectionError):
+            return
+        super().handle_error(request, client_address)
+
+
+def make_server(sim, host="127.0.0.1", port=0):
+    server = SimulatorServer((host, port), make_handler(sim))
+    server.daemon_threads = True
+    return server
+
+
+def start_server(sim, host="127.0.0.1", port=0):
+    """Запускает сервер в фоновом потоке (port=0 — любой свободный)."""
+    server = make_server(sim, host, port)
+    threading.Thread(target=server.serve_forever, name="device-simulator", daemon=True).start()
+    return server
+
+
+def server_address(server):
+    """Адрес для DeviceClient / --device: 'host:port'."""
+    host, port = server.server_address[:2]
+    return f"{host}:{port}"
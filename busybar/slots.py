@@ -0,0 +1,135 @@
+"""
+slots.py — двойная (N-кратная) буферизация картинок на устройстве.
+
+Если каждый тик перезаписывать один и тот же graph.png и сразу рисовать его,
+draw ждёт конца загрузки, а на медленном устройстве экран может показать
+наполовину заменённый файл. AssetSlots вращает N имён (graph_0.png,
+graph_1.png, ...): новый кадр грузится в фоне в слот, который сейчас не на
+экране, а draw ссылается на последний слот, загруженный целиком. Загрузка
+кадра N+1 идёт, пока на экране кадр N.
+
+    slots = AssetSlots(client, "ping_app", "graph.png")
+    slots.submit(png_bytes)               # загрузка в фоне, не блокирует
+    path = slots.latest(wait_s=0.5)       # последний целый слот (или None)
+    client.draw({... "path": path ...})
+
+Если новых кадров приходит больше, чем успевает загрузиться, в очереди
+остаётся только последний (промежуточные считаются в dropped). Кадр, байт в
+байт совпадающий с содержимым одного из слотов, не загружается повторно.
+"""
+import os
+import threading
+
+from busybar.assets import content_hash
+from busybar.metrics import METRICS
+
+SLOT_COUNT = 2
+
+
+class AssetSlots:
+    def __init__(self, client, app_id, filename, count=SLOT_COUNT):
+        if count < 2:
+            raise ValueError("нужно минимум 2 слота")
+        stem, ext = os.path.splitext(filename)
+        self.client = client
+        self.app_id = app_id
+        self.names = [f"{stem}_{i}{ext}" for i in range(count)]
+        self._cond = threading.Condition()
+        self._seq = 0                 # номер последнего submit
+        self._pending = None          # (seq, data) — ждёт свободного слота
+        self._uploading = None        # слот, который сейчас грузится
+        self._complete = None         # слот с самым новым целиком загруженным кадром
+        self._complete_seq = 0
+        self._displayed = None        # слот, отданный последним latest()
+        self._slot_seq = [0] * count  # номер кадра, лежащего в слоте
+        self._thread = None
+        self.submitted = 0
+        self.dropped = 0
+        self.reused = 0
+        self.failed = 0
+
+    def _free_slot(self):
+        busy = {self._displayed, self._uploading}
+        free = [i for i in range(len(self.names)) if i not in busy]
+        # при N > 2 не трогаем и ещё не показанный свежий слот; из остальных
+        # перезаписываем самый старый — повторяющиеся кадры дольше остаются на устройстве
+        fresh = [i for i in free if i != self._complete]
+        return min(fresh or free, key=lambda i: self._slot_seq[i], default=None)
+
+    def _matching_slot(self, digest):
+        for i, name in enumerate(self.names):
+            if i != self._uploading and self.client.assets.get(self.app_id, name) == digest:
+                return i
+        return None
+
+    def submit(self, data):
+        """Ставит кадр в очередь на загрузку и сразу возвращается."""
+        with self._cond:
+            self._seq += 1
+            self.submitted += 1
+            same = self._matching_slot(content_hash(data))
+            if same is not None:
+                # такой кадр уже целиком лежит в слоте — загружать нечего
+                self.reused += 1
+                if self._pending is not None:
+                    self._drop()
+                    self._pending = None
+                self._slot_seq[same] = self._seq
+                self._complete, self._complete_seq = same, self._seq
+                self._cond.notify_all()
+                return
+            if self._pending is not None:
+                self._drop()
+            self._pending = (self._seq, data)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=f"slots-{self.app_id}", daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+
+    def _drop(self):
+        self.dropped += 1
+        METRICS.inc("busybar_frames_dropped_total", app=self.app_id, stage="upload")
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._pending is None or self._free_slot() is None:
+                    self._cond.wait()
+                slot = self._free_slot()
+                seq, data = self._pending
+                self._pending = None
+                self._uploading = slot
+                if self._complete == slot:
+                    # свежий, но не показанный кадр перезаписывается — до конца
+                    # загрузки целым остаётся только показанный слот
+                    self._complete = self._displayed
+                    self._complete_seq = 0 if self._displayed is None else self._slot_seq[self._displayed]
+            ok = self.client.upload_asset(self.app_id, self.names[slot], data)
+            with self._cond:
+                self._uploading = None
+                if not ok:
+                    self.failed += 1
+                else:
+                    self._slot_seq[slot] = seq
+                    if seq > self._complete_seq:
+                        self._complete, self._complete_seq = slot, seq
+                self._cond.notify_all()
+
+    def latest(self, wait_s=0.0):
+        """
+        Имя слота с самым новым целым кадром для draw (None — ещё ни одного).
+        wait_s — сколько подождать, пока догрузится кадр из очереди: на быстром
+        устройстве на экран попадает кадр этого же тика, на медленном — предыдущий.
+        """
+        with self._cond:
+            if wait_s > 0:
+                self._cond.wait_for(lambda: self._pending is None and self._uploading is None, wait_s)
+            if self._complete is None:
+                return None
+            self._displayed = self._complete
+            self._cond.notify_all()
+            return self.names[self._complete]
+
+    def summary(self):
+        return (f"слоты {len(self.names)}: кадров {self.submitted}, повторов {self.reused}, "
+                f"вытеснено {self.dropped}, ошибок {self.failed}")
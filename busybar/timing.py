@@ -0,0 +1,107 @@
+"""
+timing.py — замер периодичности циклов (джиттер слайдов, тиков) и длительности этапов.
+
+    meter = PeriodMeter(nominal_s=3.0)
+    while True:
+        ...
+        meter.tick()
+    print(meter.summary())
+"""
+import collections
+import math
+import time
+
+WINDOW = 100
+
+
+class PeriodMeter:
+    """Интервалы между tick() по монотонным часам за последние WINDOW периодов."""
+
+    def __init__(self, nominal_s=None, window=WINDOW, clock=time.monotonic):
+        self.nominal_s = nominal_s
+        self._clock = clock
+        self._last = None
+        self.periods = collections.deque(maxlen=window)
+
+    def tick(self):
+        now = self._clock()
+        if self._last is not None:
+            self.periods.append(now - self._last)
+        self._last = now
+
+    def stats(self):
+        """(mean, stdev, max |period - nominal|) в секундах или None, если данных нет."""
+        if not self.periods:
+            return None
+        n = len(self.periods)
+        mean = sum(self.periods) / n
+        stdev = math.sqrt(sum((p - mean) ** 2 for p in self.periods) / n)
+        ref = self.nominal_s if self.nominal_s is not None else mean
+        worst = max(abs(p - ref) for p in self.periods)
+        return mean, stdev, worst
+
+    def summary(self, label="период"):
+        st = self.stats()
+        if st is None:
+            return f"{label}: нет данных"
+        mean, stdev, worst = st
+        return (f"{label}: среднее {mean * 1000:.0f} ms, джиттер (σ) {stdev * 1000:.1f} ms, "
+                f"макс. отклонение {worst * 1000:.0f} ms")
+
+
+def percentile(values, q):
+    """q-й перцентиль (0..100) с линейной интерполяцией; None для пустого списка."""
+    values = sorted(values)
+    if not values:
+        return None
+    pos = (len(values) - 1) * q / 100.0
+    lo = int(pos)
+    hi = min(lo + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (pos - lo)
+
+
+class StageTimer:
+    """
+    Длительности этапов тика (probe, render, encode, upload, draw...) в мс.
+
+        stages = StageTimer()
+        with stages.time("upload"):
+            client.upload_asset(...)
+        print(stages.summary())
+    """
+
+    def __init__(self, clock=time.perf_counter):
+        self._clock = clock
+        self.samples = collections.defaultdict(list)
+
+    def add(self, stage, ms):
+        self.samples[stage].append(ms)
+
+    def time(self, stage):
+        return _Timed(self, stage)
+
+    def stats(self, stage):
+        """(count, p50, p99, total) в мс."""
+        s = self.samples.get(stage, [])
+        return len(s), percentile(s, 50), percentile(s, 99), sum(s)
+
+    def summary(self):
+        lines = []
+        for stage in self.samples:
+            n, p50, p99, total = self.stats(stage)
+            lines.append(f"  {stage:<8} n={n:<5} p50 {p50:7.2f} ms  p99 {p99:7.2f} ms  всего {total:8.1f} ms")
+        return "\n".join(lines)
+
+
+class _Timed:
+    def __init__(self, timer, stage):
+        self.timer = timer
+        self.stage = stage
+
+    def __enter__(self):
+        self.t0 = self.timer._clock()
+        return self
+
+    def __exit__(self, *exc):
+        self.timer.add(self.stage, (self.timer._clock() - self.t0) * 1000.0)
+        return False
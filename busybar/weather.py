@@ -0,0 +1,266 @@
+"""
+weather.py — текущая погода с Open-Meteo для всех городов одним запросом.
+
+Open-Meteo принимает списки координат через запятую и возвращает массив
+ответов в том же порядке, поэтому ротация по N городам стоит один HTTP-запрос,
+а не N.
+
+    cities = {"Dubai": {"lat": 25.27, "lon": 55.29}, ...}
+    weather = fetch_current_weather(cities)   # {"Dubai": {"temperature": ..., ...}, ...}
+
+Поверх запроса — кэш WeatherCache (get_weather): ключ (lat, lon, params),
+TTL = интервал обновления данных у Open-Meteo (15 минут), кэш сохраняется в
+файл. После перезапуска виджет сразу рисует погоду из файла, а свежие данные
+подтягиваются в фоне. Если Open-Meteo недоступен, отдаются старые данные.
+Файл общий для всех виджетов погоды: записи сливаются с тем, что уже на
+диске (по каждому ключу — более свежая), под блокировкой файла (busybar.filelock).
+
+WeatherPrefetcher — фоновый поток, который держит готовый к отрисовке снимок
+погоды по всем городам; цикл слайдов читает снимок и никогда не ждёт сеть.
+"""
+import json
+import os
+import threading
+import time
+import urllib.parse
+
+import requests
+
+from busybar.filelock import locked
+
+OPEN_METEO_URL = "https://api.open-meteo.com/v1/forecast"
+
+DEFAULT_PARAMS = {
+    "current_weather": "true",
+    "temperature_unit": "celsius",
+    "windspeed_unit": "kmh",
+    "precipitation_unit": "mm",
+    "timezone": "Europe/London",
+}
+
+# Open-Meteo ограничивает число координат в одном запросе
+MAX_LOCATIONS_PER_REQUEST = 100
+REQUEST_TIMEOUT = (5.0, 15.0)
+
+_session = requests.Session()
+
+
+def _fetch_batch(names, cities, params, url):
+    query = dict(params)
+    query["latitude"] = ",".join(str(cities[n]["lat"]) for n in names)
+    query["longitude"] = ",".join(str(cities[n]["lon"]) for n in names)
+    response = _session.get(url, params=query, timeout=REQUEST_TIMEOUT)
+    response.raise_for_status()
+    data = response.json()
+    # для одной точки API отдаёт объект, для нескольких — список
+    if isinstance(data, dict):
+        data = [data]
+    if len(data) != len(names):
+        raise ValueError(f"Open-Meteo вернул {len(data)} ответов на {len(names)} городов")
+    return {name: item["current_weather"] for name, item in zip(names, data)}
+
+
+def fetch_current_weather(cities, params=None, url=OPEN_METEO_URL):
+    """{город: current_weather} для словаря городов {имя: {"lat", "lon"}}."""
+    params = dict(DEFAULT_PARAMS, **(params or {}))
+    names = list(cities)
+    result = {}
+    for i in range(0, len(names), MAX_LOCATIONS_PER_REQUEST):
+        result.update(_fetch_batch(names[i:i + MAX_LOCATIONS_PER_REQUEST], cities, params, url))
+    return result
+
+
+# === Кэш ===
+# current_weather у Open-Meteo обновляется раз в 15 минут
+CACHE_TTL_S = 15 * 60
+# после ошибки запроса не дёргаем API чаще, чем раз в RETRY_AFTER_S
+RETRY_AFTER_S = 30
+DEFAULT_CACHE_PATH = os.path.join(
+    os.environ.get("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache")),
+    "busybar", "weather.json")
+
+
+def cache_key(lat, lon, params):
+    query = urllib.parse.urlencode(sorted(params.items()))
+    return f"{float(lat):.4f},{float(lon):.4f}|{query}"
+
+
+class WeatherCache:
+    """
+    TTL-кэш погоды с сохранением на диск.
+
+    get() никогда не бросает исключение из-за сети: города без свежих данных
+    отдаются из старой записи (и обновляются в фоне), а города, по которым
+    данных нет совсем, загружаются сразу; если и это не удалось — их нет в ответе.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl=CACHE_TTL_S, url=OPEN_METEO_URL):
+        self.path = path
+        self.ttl = ttl
+        self.url = url
+        self._entries = {}            # key -> {"fetched_at": unix time, "data": current_weather}
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self._failed_at = 0.0
+        self.hits = self.stale_hits = self.fetches = self.errors = 0
+        self._load()
+
+    # --- файл ---
+    def _read(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return entries if isinstance(entries, dict) else {}
+
+    def _load(self):
+        self._entries = self._read()
+
+    def _save(self):
+        """
+        Сливает записи с файлом (по ключу остаётся более свежая — её мог загрузить
+        другой виджет) и записывает атомарно. Вызывается под self._lock.
+        """
+        try:
+            with locked(self.path):
+                merged = self._read()
+                for key, entry in self._entries.items():
+                    known = merged.get(key)
+                    if not isinstance(known, dict) or known.get("fetched_at", 0) < entry["fetched_at"]:
+                        merged[key] = entry
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                tmp = f"{self.path}.{os.getpid()}.tmp"
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(merged, f, ensure_ascii=False)
+                os.replace(tmp, self.path)
+        except OSError as e:
+            print("Не удалось сохранить кэш погоды:", e)
+            return
+        self._entries = merged
+
+    # --- запросы ---
+    def _fetch(self, cities, names, params):
+        """Загружает names одним запросом и кладёт в кэш. True при успехе."""
+        if not names:
+            return True
+        try:
+            fresh = fetch_current_weather({n: cities[n] for n in names}, params, self.url)
+        except Exception as e:
+            self.errors += 1
+            self._failed_at = time.time()
+            print("Ошибка запроса погоды, показываем данные из кэша:", e)
+            return False
+        now = time.time()
+        with self._lock:
+            for name, data in fresh.items():
+                key = cache_key(cities[name]["lat"], cities[name]["lon"], params)
+                self._entries[key] = {"fetched_at": now, "data": data}
+            self.fetches += 1
+            self._save()
+        return True
+
+    def _refresh_in_background(self, cities, names, params):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def run():
+            try:
+                self._fetch(cities, names, params)
+            finally:
+                with self._lock:
+                    self._refreshing = False
+
+        threading.Thread(target=run, name="weather-refresh", daemon=True).start()
+
+    def _lookup(self, cities, params, now):
+        result, stale, missing = {}, [], []
+        with self._lock:
+            for name, c in cities.items():
+                entry = self._entries.get(cache_key(c["lat"], c["lon"], params))
+                if entry is None:
+                    missing.append(name)
+                    continue
+                result[name] = entry["data"]
+                if now - entry["fetched_at"] >= self.ttl:
+                    stale.append(name)
+        return result, stale, missing
+
+    def get(self, cities, params=None):
+        """{город: current_weather} — из кэша, если он свежий; см. описание класса."""
+        params = dict(DEFAULT_PARAMS, **(params or {}))
+        now = time.time()
+        result, stale, missing = self._lookup(cities, params, now)
+
+        may_retry = now - self._failed_at >= RETRY_AFTER_S
+        if missing and may_retry:
+            # данных нет вообще — ждём запрос (заодно обновляем устаревшие)
+            if self._fetch(cities, missing + stale, params):
+                result, stale, missing = self._lookup(cities, params, now)
+        elif stale and may_retry:
+            self._refresh_in_background(cities, stale, params)
+
+        self.stale_hits += len(stale)
+        self.hits += len(result) - len(stale)
+        return result
+
+
+_default_cache = None
+
+
+def get_weather(cities, params=None):
+    """Погода по городам через общий кэш (см. WeatherCache)."""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = WeatherCache()
+    return _default_cache.get(cities, params)
+
+
+# === Фоновая подкачка ===
+# Как часто поток подкачки спрашивает кэш (сеть — только когда истёк TTL)
+PREFETCH_INTERVAL_S = 30
+
+
+class WeatherPrefetcher:
+    """
+    Поток-производитель: раз в refresh_s обновляет снимок {город: current_weather}.
+    snapshot() возвращает последний готовый снимок сразу, без сетевых запросов.
+    """
+
+    def __init__(self, cities, refresh_s=PREFETCH_INTERVAL_S, fetch=get_weather):
+        self.cities = dict(cities)
+        self.refresh_s = refresh_s
+        self._fetch = fetch
+        self._snapshot = {}
+        self._ready = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="weather-prefetch", daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                data = self._fetch(self.cities)
+            except Exception as e:
+                print("Ошибка подкачки погоды:", e)
+                data = None
+            if data:
+                # новый словарь целиком: читатели видят либо старый снимок, либо новый
+                self._snapshot = dict(self._snapshot, **data)
+                self._ready.set()
+            self._stop.wait(self.refresh_s if data else min(self.refresh_s, RETRY_AFTER_S / 10))
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def wait_ready(self, timeout=None):
+        """Ждёт первый снимок (например, перед первым слайдом). True, если он есть."""
+        return self._ready.wait(timeout)
+
+    def snapshot(self):
+        return self._snapshot
@@ -0,0 +1,204 @@
+"""
+widgets.py — часы, погода и пинг-монитор как плагины компоновщика (compositor.Widget).
+
+Раскладка элементов та же, что в clock-2.py, weather-4.py и ping-monitor-3.py;
+данные (погода, замеры пинга) собираются в фоновых потоках, а frame() только
+собирает кадр из готового состояния и не ходит в сеть.
+"""
+import os
+import threading
+from datetime import datetime
+
+from busybar.compositor import Frame, Widget
+from busybar.graph import ScrollingGraph
+from busybar.hosts import HostBuffers
+from busybar.pinger import ping_many
+from busybar.scheduler import TickScheduler
+from busybar.weather import WeatherPrefetcher
+
+SCREEN_WIDTH = 72
+SCREEN_HEIGHT = 16
+
+
+class ClockWidget(Widget):
+    """Дата мелким шрифтом сверху, время крупным снизу."""
+
+    name = "clock"
+    dwell_s = 5
+    small_char_width = 4
+    big_char_width = 7
+
+    def frame(self, tick):
+        now = datetime.now()
+        date_str = now.strftime("%d.%m.%Y")
+        time_str = now.strftime("%H:%M:%S")
+        # центрирование + сдвиг вправо на 3 пикселя
+        date_x = (SCREEN_WIDTH - len(date_str) * self.small_char_width) // 2 + 3
+        time_x = (SCREEN_WIDTH - len(time_str) * self.big_char_width) // 2 + 3
+        return Frame([
+            {"id": "date", "timeout": 2, "type": "text", "text": date_str,
+             "x": date_x, "y": 0, "font": "small", "color": "#FFFFFFFF",
+             "width": SCREEN_WIDTH, "scroll_rate": 0},
+            {"id": "time", "timeout": 2, "type": "text", "text": time_str,
+             "x": time_x, "y": 6, "font": "big", "color": "#AAFF00FF",
+             "width": SCREEN_WIDTH, "scroll_rate": 0},
+        ], {})
+
+
+# weathercode Open-Meteo -> иконка
+ICON_MAP = {
+    "sun": [0, 1],
+    "partly": [2, 3],
+    "cloud": [45, 48],
+    "fog": [51, 53, 55],
+    "rain": [61, 63, 65, 80, 81, 82],
+    "snow": [71, 73, 75, 77, 85, 86],
+}
+
+
+def select_icon(weathercode):
+    for icon, codes in ICON_MAP.items():
+        if weathercode in codes:
+            return f"{icon}.png"
+    return "sun.png"
+
+
+class WeatherWidget(Widget):
+    """Слайды по городам: иконка, название, температура. Погода — из WeatherPrefetcher."""
+
+    name = "weather"
+    slide_s = 3
+
+    def __init__(self, cities, icon_dir="icons", prefetcher=None):
+        self.cities = dict(cities)
+        self.icon_dir = icon_dir
+        self.dwell_s = self.slide_s * len(self.cities)
+        self.prefetcher = prefetcher or WeatherPrefetcher(self.cities)
+
+    def static_assets(self):
+        assets = {}
+        for icon in ICON_MAP:
+            path = os.path.join(self.icon_dir, f"{icon}.png")
+            try:
+                with open(path, "rb") as f:
+                    assets[f"{icon}.png"] = f.read()
+            except OSError as e:
+                print(f"Иконка {path} не найдена:", e)
+        return assets
+
+    def start(self):
+        self.prefetcher.start()
+        return self
+
+    def stop(self):
+        self.prefetcher.stop()
+
+    def frame(self, tick):
+        snapshot = self.prefetcher.snapshot()
+        names = [n for n in self.cities if n in snapshot]
+        if not names:
+            return None
+        city = names[(tick // self.slide_s) % len(names)]
+        weather = snapshot[city]
+        return Frame([
+            {"id": "icon", "timeout": 6, "type": "image",
+             "path": select_icon(weather.get("weathercode", 0)), "x": 0, "y": 0},
+            {"id": "city", "timeout": 6, "type": "text", "text": city,
+             "x": 18, "y": 0, "font": "small", "color": "#FFFFFF", "width": 54, "scroll_rate": 60},
+            {"id": "temp", "timeout": 6, "type": "text", "text": f"{weather['temperature']}°C",
+             "x": 18, "y": 6, "font": "big", "color": "#FFFF00", "width": 54, "scroll_rate": 60},
+        ], {})
+
+
+class PingWidget(Widget):
+    """
+    Логотип + текст пинга + столбиковый график. Замеры идут в своём потоке
+    каждую секунду, даже когда виджет не на экране, так что график непрерывный.
+    Если средний пинг за последние alert_window замеров хуже alert_ms
+    (потеря пакета считается как hosts.LOSS_PENALTY_MS), виджет просит экран вне очереди.
+    history — history.PingHistory: замеры пишутся в файл и переживают перезапуск.
+    """
+
+    name = "ping"
+    priority = 10
+    dwell_s = 10
+    logo_width = 16
+    graph_y = 5
+    max_ping_ms = 100.0
+    interval = 1.0
+
+    def __init__(self, servers, logo_path=None, mode="rotate", page_ticks=5, worst_n=3,
+                 alert_ms=None, alert_window=3, history=None, text="last"):
+        self.servers = list(servers)
+        self.logo_path = logo_path
+        self.mode = mode
+        self.page_ticks = page_ticks
+        self.worst_n = worst_n
+        self.alert_ms = alert_ms
+        self.alert_window = alert_window
+        self.text = text
+        self.graph_x = self.logo_width + 1
+        self.buffers = HostBuffers(self.servers, SCREEN_WIDTH - self.graph_x, self._make_graph,
+                                   history, self.interval)
+        self.samples = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="ping-widget", daemon=True)
+
+    def _make_graph(self):
+        return ScrollingGraph(SCREEN_WIDTH - self.graph_x, SCREEN_HEIGHT - self.graph_y,
+                              self.max_ping_ms, style="bars")
+
+    def _run(self):
+        ticks = TickScheduler(self.interval)
+        while not self._stop.is_set():
+            ticks.wait()
+            results = ping_many(self.servers, timeout_s=self.interval * 0.9)
+            with self._lock:
+                self.buffers.record(results)
+                self.samples += 1
+
+    def static_assets(self):
+        if not self.logo_path:
+            return {}
+        try:
+            with open(self.logo_path, "rb") as f:
+                return {"logo.png": f.read()}
+        except OSError as e:
+            print(f"Логотип {self.logo_path} не найден:", e)
+            self.logo_path = None
+            return {}
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def urgent(self):
+        if self.alert_ms is None:
+            return False
+        with self._lock:
+            if self.samples < self.alert_window:
+                return False
+            return any(self.buffers.score(h, self.alert_window) > self.alert_ms
+                       for h in self.servers)
+
+    def frame(self, tick):
+        with self._lock:
+            if not self.samples:
+                return None
+            host, text = self.buffers.select(tick, self.mode, self.page_ticks, self.worst_n, self.text)
+            graph = self.buffers.png(host)
+        elements = [
+            {"id": "text", "timeout": 2, "type": "text", "text": text,
+             "x": self.graph_x, "y": 0, "font": "small", "color": "#FFFFFFFF",
+             "width": SCREEN_WIDTH - self.graph_x, "scroll_rate": 60},
+            {"id": "graph", "timeout": 2, "type": "image", "path": "graph.png",
+             "x": self.graph_x, "y": self.graph_y},
+        ]
+        if self.logo_path:
+            elements.append({"id": "logo", "timeout": 2, "type": "image",
+                             "path": "logo.png", "x": 0, "y": 0})
+        return Frame(elements, {"graph.png": graph})
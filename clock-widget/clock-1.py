@@ -1,6 +1,10 @@
-import requests
+import os
+import sys
 from datetime import datetime
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from busybar.device import get_client
+
 # Текущая дата и время
 now = datetime.now()
 date_str = now.strftime("%d.%m.%Y")
@@ -54,5 +58,4 @@ data = {
    ]
 }
 
-response = requests.post("http://10.0.4.20/api/display/draw", json=data)
-print(response.text)
+print("OK" if get_client().draw(data) else "Ошибка")
@@ -1,15 +1,25 @@
-import requests
+import os
+import sys
 from datetime import datetime
-import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from busybar.device import get_client
+from busybar.metrics import start_from_env
+from busybar.scheduler import TickScheduler
 
 screen_width = 72
 small_char_width = 4
 big_char_width = 7
 
 app_id = "my_app"
-url = "http://10.0.4.20/api/display/draw"
+client = get_client()  # одно keep-alive соединение на все тики
+start_from_env()  # метрики: переменные BUSYBAR_METRICS / BUSYBAR_METRICS_LOG
+# тики ровно на границах секунд, время запроса не накапливается
+ticks = TickScheduler(1.0)
+TICK_BUDGET_S = 0.8  # бюджет времени на запрос в тике
 
 while True:
+   ticks.wait()
    now = datetime.now()
    date_str = now.strftime("%d.%m.%Y")
    time_str = now.strftime("%H:%M:%S")
@@ -56,5 +66,6 @@ while True:
        ]
    }
 
-   requests.post(url, json=data)
-   time.sleep(1)
+   # не дольше тика: при недоступном устройстве часы не отстают
+   with client.budget(TICK_BUDGET_S):
+      client.draw(data)
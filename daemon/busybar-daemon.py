@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+busybar-daemon.py — один процесс на устройство: часы, погода и пинг-монитор
+по расписанию вместо трёх отдельных скриптов (clock-2.py, weather-4.py,
+ping-monitor-3.py), которые слали draw одновременно.
+
+Не больше одного upload и одного draw за тик (1 с). Виджеты показываются по
+очереди; пинг-монитор вытесняет остальные, если пинг хуже --alert-ms.
+
+Запуск:
+  python3 busybar-daemon.py --server 1.2.3.4 [--widgets clock weather ping] [--device 10.0.4.20 10.0.4.21 ...]
+"""
+import argparse
+import os
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+from busybar.compositor import Compositor
+from busybar.device import DEFAULT_DEVICE_IP, get_client
+from busybar.history import DEFAULT_PATH, open_history
+from busybar.hosts import MODES, TEXT_MODES, load_hosts
+from busybar.metrics import METRICS_ENV, METRICS_LOG_ENV, start_from_env
+from busybar.widgets import ClockWidget, PingWidget, WeatherWidget
+
+WIDGETS = ("clock", "weather", "ping")
+
+# Координаты городов
+CITIES = {
+    "Dubai": {"lat": 25.276987, "lon": 55.296249},
+    "London": {"lat": 51.5074, "lon": -0.1278},
+    "New York": {"lat": 40.7128, "lon": -74.0060},
+}
+ICON_FOLDER = os.path.join(ROOT, "weather-widget", "icons")
+LOGO_FILE = os.path.join(ROOT, "ping-monitor", "csgo.png")
+ALERT_MS = 80.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Компоновщик виджетов для LED-дисплея 72x16")
+    parser.add_argument("--widgets", nargs="+", choices=WIDGETS, default=list(WIDGETS),
+                        help="какие виджеты показывать (в этом порядке)")
+    parser.add_argument("--server", "-s", nargs="+", default=[], help="ping: IP/hostname серверов")
+    parser.add_argument("--servers-file", "-f", help="ping: файл со списком серверов")
+    parser.add_argument("--mode", choices=MODES, default="rotate", help="ping: rotate или worst")
+    parser.add_argument("--alert-ms", type=float, default=ALERT_MS,
+                        help="ping: показать график вне очереди, если пинг хуже (0 — никогда)")
+    parser.add_argument("--device", "-d", nargs="+", default=[DEFAULT_DEVICE_IP],
+                        help="IP LED-девайса; несколько — один кадр на все панели "
+                             f"(по умолчанию {DEFAULT_DEVICE_IP}, задаётся BUSYBAR_DEVICE)")
+    parser.add_argument("--metrics", metavar="[HOST:]PORT", default=os.environ.get(METRICS_ENV),
+                        help="отдавать метрики Prometheus на этом порту (/metrics)")
+    parser.add_argument("--metrics-log", metavar="FILE", default=os.environ.get(METRICS_LOG_ENV),
+                        help="писать метрики строками JSON в файл ('-' — stdout)")
+    parser.add_argument("--text", choices=TEXT_MODES, default="last",
+                        help="ping: текст у графика — последний замер или p50/p95/джиттер/потери")
+    parser.add_argument("--history", metavar="FILE", default=DEFAULT_PATH,
+                        help="ping: файл истории замеров ('' — без истории)")
+    args = parser.parse_args()
+
+    widgets = []
+    for name in args.widgets:
+        if name == "clock":
+            widgets.append(ClockWidget())
+        elif name == "weather":
+            widgets.append(WeatherWidget(CITIES, ICON_FOLDER))
+        elif name == "ping":
+            servers = load_hosts(args.server, args.servers_file)
+            if not servers:
+                parser.error("для виджета ping нужен --server или --servers-file")
+            widgets.append(PingWidget(servers, LOGO_FILE, args.mode, alert_ms=args.alert_ms or None,
+                                      history=open_history(args.history, hosts=servers), text=args.text))
+
+    print(f"Виджеты: {', '.join(w.name for w in widgets)}; устройства {', '.join(args.device)}")
+    _, metrics_log = start_from_env(args.metrics, args.metrics_log)
+    Compositor(get_client(args.device), widgets).run()
+    if metrics_log is not None:
+        metrics_log.stop()
+
+
+if __name__ == "__main__":
+    main()
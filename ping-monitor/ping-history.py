@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+ping-history.py — чтение истории пинга, которую пишет работающий монитор.
+
+Файл истории (busybar.history) открывается только на чтение, связываться
+с процессом монитора не нужно:
+  python3 ping-history.py                       # сводка по хостам за последние 72 замера
+  python3 ping-history.py --host 1.2.3.4 --last 300 --raw
+  python3 ping-history.py --follow              # новые замеры по мере записи
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from busybar.history import DEFAULT_PATH, PingHistory
+from busybar.pinger import format_ms
+
+LAST_N = 72
+FOLLOW_INTERVAL = 1.0
+
+
+def format_sample(host, ts, rtt):
+    return f"{datetime.fromtimestamp(ts):%Y-%m-%d %H:%M:%S.%f}"[:-3] + f"  {host:<20} {format_ms(rtt)}"
+
+
+def summary(host, samples):
+    values = [rtt for _, rtt in samples if rtt is not None]
+    lost = len(samples) - len(values)
+    if not values:
+        return f"{host:<20} замеров {len(samples)}, все потеряны"
+    age = time.time() - samples[-1][0]
+    return (f"{host:<20} замеров {len(samples)}: мин {min(values):.1f} / "
+            f"ср {sum(values) / len(values):.1f} / макс {max(values):.1f} ms, "
+            f"потерь {lost} ({lost / len(samples) * 100:.0f}%), последний {age:.0f} с назад")
+
+
+def follow(history, hosts):
+    seen = {h: history.count(h) for h in hosts}
+    while True:
+        time.sleep(FOLLOW_INTERVAL)
+        for host in hosts:
+            total = history.count(host)
+            for ts, rtt in history.last(host, total - seen[host]):
+                print(format_sample(host, ts, rtt), flush=True)
+            seen[host] = total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="История замеров пинг-монитора")
+    parser.add_argument("file", nargs="?", default=DEFAULT_PATH, help=f"файл истории (по умолчанию {DEFAULT_PATH})")
+    parser.add_argument("--host", nargs="+", help="только эти хосты")
+    parser.add_argument("--last", "-n", type=int, default=LAST_N, help="сколько последних замеров")
+    parser.add_argument("--raw", action="store_true", help="все замеры построчно вместо сводки")
+    parser.add_argument("--follow", action="store_true", help="печатать новые замеры по мере записи")
+    args = parser.parse_args()
+
+    try:
+        history = PingHistory(args.file, readonly=True)
+    except (OSError, ValueError) as e:
+        print("Не удалось открыть историю:", e)
+        sys.exit(1)
+    hosts = args.host or history.hosts()
+    for host in hosts:
+        samples = history.last(host, args.last)
+        if args.raw:
+            for ts, rtt in samples:
+                print(format_sample(host, ts, rtt))
+        else:
+            print(summary(host, samples) if samples else f"{host:<20} нет замеров")
+    if args.follow:
+        try:
+            follow(history, hosts)
+        except KeyboardInterrupt:
+            pass
+    history.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -3,27 +3,36 @@
 ping_display.py
 
 Пингует игровой сервер и отображает график пинга на LED-дисплее 72x16 через HTTP API устройства.
+Пингует 10 раз в секунду, столбец графика — min/avg/max за секунду; --rate 1 —
+замер раз в секунду, график линией.
 
 Зависимости:
-  pip install pillow requests
+  pip install requests
+  (NumPy необязателен — ускоряет перерисовку графика; Pillow нужен только бенчмарку рендера)
+  (пакет busybar лежит в корне репозитория)
 
 Запуск:
   python3 ping_display.py --server 1.2.3.4
+  python3 ping_display.py --server 1.2.3.4 --rate 1   # замер раз в секунду, график линией
 """
+import os
 import sys
 import time
 import argparse
-import collections
-import io
-import platform
-import re
-import subprocess
 
-from PIL import Image, ImageDraw
-import requests
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from busybar.device import DEFAULT_DEVICE_IP, get_client, parse_devices
+from busybar.graph import ScrollingGraph
+from busybar.history import DEFAULT_PATH, open_history
+from busybar.hosts import MODES, TEXT_MODES, HostBuffers, load_hosts
+from busybar.metrics import METRICS_ENV, METRICS_LOG_ENV, start_from_env
+from busybar.pinger import ping_many
+from busybar.pipeline import PingPipeline
+from busybar.scheduler import TickScheduler
+from busybar.slots import AssetSlots
 
 # === Конфигурация ===
-DEVICE_IP = "10.0.4.20"      # IP девайса (взял из твоих данных)
+DEVICE_IP = DEFAULT_DEVICE_IP    # BUSYBAR_DEVICE, иначе 10.0.4.20
 APP_ID = "ping_app"
 GRAPH_FILE = "graph.png"     # имя файла в памяти устройства
 DISPLAY_WIDTH = 72
@@ -36,180 +45,154 @@ GRAPH_HEIGHT = DISPLAY_HEIGHT - GRAPH_Y  # 11
 GRAPH_WIDTH = DISPLAY_WIDTH
 BUFFER_LEN = GRAPH_WIDTH     # одно значение на пиксель по X
 UPDATE_INTERVAL = 1.0        # сек
+SAMPLE_RATE_HZ = 10          # замеров в секунду: столбец — min/avg/max (--rate 1 — по замеру на столбец)
+PAGE_TICKS = 5               # режим rotate: столбцов графика на один сервер
+WORST_N = 3                  # режим worst: сколько худших серверов в строке
+GRAPH_SLOTS = 2               # graph_0.png, graph_1.png: грузим один, показываем другой
+UPLOAD_WAIT_S = 0.5           # сколько ждать загрузку нового кадра перед draw
+WRITE_BUDGET_S = 0.9          # бюджет времени на запись кадра на устройство
 
 # Настройка масштабирования графика (максимальный отображаемый пинг в мс)
 MAX_PING_MS = 300.0
+# Шаг автомасштаба (мс): шкала растёт до ближайшего кратного при всплесках.
+# None — фиксированная шкала MAX_PING_MS
+AUTOSCALE_STEP_MS = None
 
 # === Вспомогательные функции ===
-def ping_once(host, timeout_s=1.0):
-    """Пинговая функция: возвращает round(ms) или None при таймауте/ошибке.
-       Работает и на Windows, и на Unix-подобных.
+def make_graph(style="line"):
     """
-    system = platform.system().lower()
-    try:
-        if system == "windows":
-            # -n 1 (1 пакет), -w timeout(ms)
-            proc = subprocess.run(["ping", "-n", "1", "-w", str(int(timeout_s * 1000)), host],
-                                   capture_output=True, text=True, timeout=timeout_s+1)
-            out = proc.stdout
-            # Ищем time=12ms
-            m = re.search(r"time[=<]\s*([0-9]+)ms", out)
-            if m:
-                return int(m.group(1))
-        else:
-            # linux / mac: -c 1 (1 пакет), -W timeout (seconds, linux) or -t on mac? 
-            # Use -c 1 and rely on subprocess timeout for portability; many unix ping show "time=X ms"
-            proc = subprocess.run(["ping", "-c", "1", host],
-                                   capture_output=True, text=True, timeout=timeout_s+1)
-            out = proc.stdout
-            m = re.search(r"time[=<]?\s*([0-9]+(?:\.[0-9]+)?)\s*ms", out)
-            if m:
-                return int(round(float(m.group(1))))
-    except subprocess.TimeoutExpired:
-        return None
-    except Exception:
-        return None
-    return None
-
-def render_graph_image(values, width=GRAPH_WIDTH, height=GRAPH_HEIGHT, max_ping=MAX_PING_MS):
-    """
-    Рисует PNG (width x height) с линией графика.
-    values: deque/iterable длины <= width, с None или numeric (ms).
-    Фон черный, график — яркий цвет.
-    Возвращает bytes PNG.
+    Линейный график (width x height) с постоянным кадровым буфером:
+    каждый замер сдвигает его на пиксель и дорисовывает только край.
+    Фон черный, график — яркий цвет (busybar.graph.LINE_COLOR).
+    style="range" — при частых замерах столбец min/avg/max вместо линии.
     """
-    img = Image.new("RGBA", (width, height), (0,0,0,255))
-    draw = ImageDraw.Draw(img)
-
-    # Преобразуем значения в y-координаты (0 сверху).
-    ys = []
-    for v in values:
-        if v is None:
-            ys.append(None)
-        else:
-            # clamp
-            vv = max(0.0, min(v, max_ping))
-            # перевести: ping 0 -> нижняя линия (height-1), ping=max_ping -> верх 0
-            y = int(round((1.0 - (vv / max_ping)) * (height - 1)))
-            ys.append(y)
-
-    # Рисуем линию: соединяем последовательные не-None
-    prev = None
-    for x in range(len(ys)):
-        y = ys[x]
-        if y is not None:
-            # пиксель точки
-            draw.point((x, y), fill=(170,255,0,255))  # ярко-зелёный-ish
-            if prev is not None:
-                # соединяем линией
-                x0, y0 = prev
-                draw.line((x0, y0, x, y), fill=(170,255,0,255))
-            prev = (x, y)
-        else:
-            prev = None
-
-    # Можно добавить лёгкие горизонтальные метки (например 0ms и max)
-    # малый подсказочный текст мы не рисуем — на дисплее текст отдельным элементом
-
-    # Сохранить в bytes
-    bio = io.BytesIO()
-    img.save(bio, format="PNG")
-    return bio.getvalue()
-
-def upload_image_to_device(device_ip, app_id, filename, img_bytes):
-    url = f"http://{device_ip}/api/assets/upload"
-    params = {"app_id": app_id, "file": filename}
-    headers = {"Content-Type": "application/octet-stream"}
-    try:
-        r = requests.post(url, params=params, data=img_bytes, headers=headers, timeout=5)
-        r.raise_for_status()
-        return True
-    except Exception as e:
-        print("Ошибка загрузки изображения на устройство:", e)
-        return False
+    return ScrollingGraph(GRAPH_WIDTH, GRAPH_HEIGHT, MAX_PING_MS, style=style,
+                          autoscale_step=AUTOSCALE_STEP_MS)
 
 def display_on_device(device_ip, payload):
-    url = f"http://{device_ip}/api/display/draw"
-    try:
-        r = requests.post(url, json=payload, timeout=5)
-        r.raise_for_status()
-        return True
-    except Exception as e:
-        print("Ошибка отправки display/draw:", e)
-        return False
+    return get_client(device_ip).draw(payload)
 
 # === Основная логика ===
-def run_loop(server_ip, device_ip=DEVICE_IP):
-    buffer = collections.deque([None]*BUFFER_LEN, maxlen=BUFFER_LEN)
-
-    print(f"Пингуем {server_ip} каждую {UPDATE_INTERVAL:.1f}s, обновляем дисплей {device_ip}")
+def run_loop(servers, device_ip=DEVICE_IP, mode="rotate", page_ticks=PAGE_TICKS, worst_n=WORST_N,
+             history_path=None, text="last",
+             rate_hz=SAMPLE_RATE_HZ):
+    if isinstance(servers, str):
+        servers = [servers]
+    # буферы, история и частые замеры — см. busybar.hosts / busybar.history
+    per_column = max(1, round(rate_hz * UPDATE_INTERVAL))
+    sample_s = UPDATE_INTERVAL / per_column
+    history = open_history(history_path, hosts=servers, period_s=sample_s)
+    graph = (lambda: make_graph("range")) if per_column > 1 else make_graph
+    buffers = HostBuffers(servers, BUFFER_LEN, graph, history, sample_s, per_column=per_column)
+    slots = AssetSlots(get_client(device_ip), APP_ID, GRAPH_FILE, GRAPH_SLOTS)
+
+    print(f"Пингуем {', '.join(servers)} {per_column / UPDATE_INTERVAL:g} раз/с, "
+          f"столбец графика — {UPDATE_INTERVAL:.1f}s, обновляем дисплей {', '.join(parse_devices(device_ip))}")
+
+    def render(tick):
+        # замеры уже записаны в буферы конвейером; рендерим кадр по последнему
+        host, display_value = buffers.select(tick, mode, page_ticks, worst_n, text)
+        return host, display_value, buffers.png(host)
+
+    def write(frame):
+        with get_client(device_ip).budget(WRITE_BUDGET_S):
+            write_frame(frame)
+
+    def write_frame(frame):
+        host, display_value, img_bytes = frame
+        # загружаем в свободный слот в фоне; draw ссылается на последний целиком загруженный
+        slots.submit(img_bytes)
+        graph_file = slots.latest(UPLOAD_WAIT_S)
+        if graph_file is None:
+            # печатаем предупреждение, но продолжаем попытки
+            print("WARN: на устройстве ещё нет ни одного кадра графика.")
+
+        # формируем payload для вывода: текст (маленький шрифт) + картинка
+        payload = {
+            "app_id": APP_ID,
+            "elements": [
+                {
+                    "id": "ping_text",
+                    "timeout": 2,
+                    "type": "text",
+                    "text": display_value,
+                    "x": 0,
+                    "y": 0,
+                    "font": TEXT_FONT,
+                    "color": TEXT_COLOR,
+                    "width": 72,
+                    "scroll_rate": 60
+                },
+                {
+                    "id": "graph_img",
+                    "timeout": 2,
+                    "type": "image",
+                    "path": graph_file,
+                    "x": GRAPH_X,
+                    "y": GRAPH_Y
+                }
+            ]
+        }
+        if graph_file is None:
+            # ни один кадр ещё не загрузился целиком — рисуем только текст
+            payload["elements"] = [el for el in payload["elements"] if el["id"] != "graph_img"]
+        display_on_device(device_ip, payload)
+
+        # печать в консоль для отладки
+        print(f"{time.strftime('%H:%M:%S')} | ping={display_value} | {buffers.graphs[host].encoder.summary()}")
+
+    # замер, рендер и запись на устройство — отдельные этапы (busybar.pipeline)
+    pipeline = PingPipeline(servers, buffers, render, write,
+                            ticks=TickScheduler(sample_s), probe=ping_many, timeout_s=0.9)
     try:
-        while True:
-            t0 = time.time()
-            ping_ms = ping_once(server_ip, timeout_s=0.9)
-            if ping_ms is None:
-                display_value = "--"
-            else:
-                display_value = f"{ping_ms} ms"
-
-            # обновляем буфер
-            buffer.append(ping_ms)
-
-            # рендер графика
-            img_bytes = render_graph_image(buffer)
-
-            # загружаем в устройство
-            ok = upload_image_to_device(device_ip, APP_ID, GRAPH_FILE, img_bytes)
-            if not ok:
-                # печатаем предупреждение, но продолжаем попытки
-                print("WARN: не удалось загрузить изображение на устройство.")
-
-            # формируем payload для вывода: текст (маленький шрифт) + картинка
-            payload = {
-                "app_id": APP_ID,
-                "elements": [
-                    {
-                        "id": "ping_text",
-                        "timeout": 2,
-                        "type": "text",
-                        "text": display_value,
-                        "x": 0,
-                        "y": 0,
-                        "font": TEXT_FONT,
-                        "color": TEXT_COLOR,
-                        "width": 72,
-                        "scroll_rate": 60
-                    },
-                    {
-                        "id": "graph_img",
-                        "timeout": 2,
-                        "type": "image",
-                        "path": GRAPH_FILE,
-                        "x": GRAPH_X,
-                        "y": GRAPH_Y
-                    }
-                ]
-            }
-            display_on_device(device_ip, payload)
-
-            # печать в консоль для отладки
-            print(f"{time.strftime('%H:%M:%S')} | ping={display_value}")
-
-            # wait until next second boundary relative to start of loop
-            t_elapsed = time.time() - t0
-            to_sleep = UPDATE_INTERVAL - t_elapsed
-            if to_sleep > 0:
-                time.sleep(to_sleep)
+        pipeline.run()
     except KeyboardInterrupt:
         print("\nОстановлено пользователем.")
+    finally:
+        pipeline.stop()
+        client = get_client(device_ip)
+        print(client.assets.summary())
+        print(client.frames.summary())
+        print(client.breaker.summary())
+        print(slots.summary())
+        print(pipeline.summary())
+        print(pipeline.ticks.summary())
+        if history is not None:
+            history.close()
 
 # === CLI ===
 def main():
     parser = argparse.ArgumentParser(description="Ping -> LED display 72x16 graph")
-    parser.add_argument("--server", "-s", required=True, help="IP или hostname игрового сервера")
-    parser.add_argument("--device", "-d", default=DEVICE_IP, help=f"IP LED-устройства (default {DEVICE_IP})")
+    parser.add_argument("--server", "-s", nargs="+", default=[], help="IP или hostname игрового сервера (можно несколько)")
+    parser.add_argument("--servers-file", "-f", help="файл со списком серверов, по одному на строку")
+    parser.add_argument("--mode", choices=MODES, default="rotate",
+                        help="несколько серверов: rotate — по очереди, worst — худшие N")
+    parser.add_argument("--page", type=int, default=PAGE_TICKS,
+                        help=f"rotate: столбцов графика (по {UPDATE_INTERVAL:g} с при любом --rate) на один сервер")
+    parser.add_argument("--worst", type=int, default=WORST_N, help="worst: сколько серверов показывать")
+    parser.add_argument("--device", "-d", nargs="+", default=[DEVICE_IP],
+                        help="IP LED-устройства; несколько — один кадр на все панели "
+                             f"(по умолчанию {DEVICE_IP}, задаётся BUSYBAR_DEVICE)")
+    parser.add_argument("--metrics", metavar="[HOST:]PORT", default=os.environ.get(METRICS_ENV),
+                        help="отдавать метрики Prometheus на этом порту (/metrics)")
+    parser.add_argument("--metrics-log", metavar="FILE", default=os.environ.get(METRICS_LOG_ENV),
+                        help="писать метрики строками JSON в файл ('-' — stdout)")
+    parser.add_argument("--text", choices=TEXT_MODES, default="last",
+                        help="текст у графика: last — последний замер, stats — p50/p95/джиттер/потери за минуту")
+    parser.add_argument("--rate", type=float, default=SAMPLE_RATE_HZ,
+                        help="замеров в секунду (по умолчанию 10): столбец графика — min/avg/max за секунду; "
+                             "1 — по замеру на столбец, как раньше (меньше ICMP-трафика)")
+    parser.add_argument("--history", metavar="FILE", default=DEFAULT_PATH,
+                        help="файл истории замеров ('' — без истории)")
     args = parser.parse_args()
-    run_loop(args.server, args.device)
+    servers = load_hosts(args.server, args.servers_file)
+    if not servers:
+        parser.error("нужен --server или --servers-file")
+    _, metrics_log = start_from_env(args.metrics, args.metrics_log)
+    run_loop(servers, args.device, args.mode, args.page, args.worst, history_path=args.history, text=args.text,
+             rate_hz=args.rate)
+    if metrics_log is not None:
+        metrics_log.stop()
 
 if __name__ == "__main__":
     main()
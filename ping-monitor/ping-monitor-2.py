@@ -8,13 +8,25 @@ ping_display_bar.py — выводит график пинга (в виде цв
   >50 ms    — красный
 
 Шкала — до 100 мс.
+
+Пингует 10 раз в секунду, столбец графика — min/avg/max за секунду
+(полоса min..max, яркая точка — среднее); --rate 1 — замер раз в секунду.
 """
-import sys, time, argparse, collections, io, platform, re, subprocess
-from PIL import Image, ImageDraw
-import requests
+import sys, os, time, argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from busybar.device import DEFAULT_DEVICE_IP, get_client, parse_devices
+from busybar.graph import ScrollingGraph
+from busybar.history import DEFAULT_PATH, open_history
+from busybar.hosts import MODES, TEXT_MODES, HostBuffers, load_hosts
+from busybar.metrics import METRICS_ENV, METRICS_LOG_ENV, start_from_env
+from busybar.pinger import ping_many
+from busybar.pipeline import PingPipeline
+from busybar.scheduler import TickScheduler
+from busybar.slots import AssetSlots
 
 # === Конфигурация ===
-DEVICE_IP = "10.0.4.20"
+DEVICE_IP = DEFAULT_DEVICE_IP    # BUSYBAR_DEVICE, иначе 10.0.4.20
 APP_ID = "ping_app"
 GRAPH_FILE = "graph.png"
 DISPLAY_WIDTH = 72
@@ -27,124 +39,135 @@ GRAPH_HEIGHT = DISPLAY_HEIGHT - GRAPH_Y
 GRAPH_WIDTH = DISPLAY_WIDTH
 BUFFER_LEN = GRAPH_WIDTH
 UPDATE_INTERVAL = 1.0
+SAMPLE_RATE_HZ = 10           # замеров в секунду: столбец — min/avg/max (--rate 1 — по замеру на столбец)
+PAGE_TICKS = 5                # режим rotate: столбцов графика на один сервер
+WORST_N = 3                   # режим worst: сколько худших серверов в строке
+GRAPH_SLOTS = 2               # graph_0.png, graph_1.png: грузим один, показываем другой
+UPLOAD_WAIT_S = 0.5           # сколько ждать загрузку нового кадра перед draw
+WRITE_BUDGET_S = 0.9          # бюджет времени на запись кадра на устройство
 
 MAX_PING_MS = 100.0  # теперь шкала до 100 мс
+AUTOSCALE_STEP_MS = None  # шаг автомасштаба (мс), None — фиксированная шкала
 
-def ping_once(host, timeout_s=1.0):
-    system = platform.system().lower()
-    try:
-        if system == "windows":
-            proc = subprocess.run(["ping", "-n", "1", "-w", str(int(timeout_s*1000)), host],
-                                   capture_output=True, text=True, timeout=timeout_s+1)
-            m = re.search(r"time[=<]\s*([0-9]+)ms", proc.stdout)
-            if m: return int(m.group(1))
-        else:
-            proc = subprocess.run(["ping", "-c", "1", host],
-                                   capture_output=True, text=True, timeout=timeout_s+1)
-            m = re.search(r"time[=<]?\s*([0-9]+(?:\.[0-9]+)?)\s*ms", proc.stdout)
-            if m: return int(round(float(m.group(1))))
-    except Exception:
-        return None
-    return None
-
-def render_graph_image(values, width=GRAPH_WIDTH, height=GRAPH_HEIGHT, max_ping=MAX_PING_MS):
-    """Рисует столбиковый график пинга."""
-    img = Image.new("RGBA", (width, height), (0,0,0,255))
-    draw = ImageDraw.Draw(img)
-
-    for x, v in enumerate(values):
-        if v is None:
-            continue
-        v = max(0.0, min(v, max_ping))
-        # высота столбика (0..height)
-        h = int(round((v / max_ping) * (height - 1)))
-        y0 = height - h  # снизу вверх
-        # цвет в зависимости от диапазона
-        if v <= 20:
-            color = (0, 255, 0, 255)       # зелёный
-        elif v <= 50:
-            color = (255, 255, 0, 255)     # жёлтый
-        else:
-            color = (255, 0, 0, 255)       # красный
-        draw.line((x, y0, x, height - 1), fill=color)
-    bio = io.BytesIO()
-    img.save(bio, format="PNG")
-    return bio.getvalue()
-
-def upload_image_to_device(device_ip, app_id, filename, img_bytes):
-    url = f"http://{device_ip}/api/assets/upload"
-    params = {"app_id": app_id, "file": filename}
-    try:
-        r = requests.post(url, params=params, data=img_bytes,
-                          headers={"Content-Type": "application/octet-stream"}, timeout=5)
-        r.raise_for_status()
-        return True
-    except Exception as e:
-        print("Ошибка загрузки изображения:", e)
-        return False
+def make_graph(style="bars"):
+    """Столбиковый график пинга (busybar.graph.BAR_LEVELS); обновляется инкрементально; style="range" — min/avg/max."""
+    return ScrollingGraph(GRAPH_WIDTH, GRAPH_HEIGHT, MAX_PING_MS, style=style,
+                          autoscale_step=AUTOSCALE_STEP_MS)
 
 def display_on_device(device_ip, payload):
-    url = f"http://{device_ip}/api/display/draw"
-    try:
-        r = requests.post(url, json=payload, timeout=5)
-        r.raise_for_status()
-        return True
-    except Exception as e:
-        print("Ошибка display/draw:", e)
-        return False
-
-def run_loop(server_ip, device_ip=DEVICE_IP):
-    buffer = collections.deque([None]*BUFFER_LEN, maxlen=BUFFER_LEN)
-    print(f"Пингуем {server_ip} каждую {UPDATE_INTERVAL:.1f}s, обновляем дисплей {device_ip}")
+    return get_client(device_ip).draw(payload)
+
+def run_loop(servers, device_ip=DEVICE_IP, mode="rotate", page_ticks=PAGE_TICKS, worst_n=WORST_N,
+             history_path=None, text="last",
+             rate_hz=SAMPLE_RATE_HZ):
+    if isinstance(servers, str):
+        servers = [servers]
+    # буферы, история и частые замеры — см. busybar.hosts / busybar.history
+    per_column = max(1, round(rate_hz * UPDATE_INTERVAL))
+    sample_s = UPDATE_INTERVAL / per_column
+    history = open_history(history_path, hosts=servers, period_s=sample_s)
+    graph = (lambda: make_graph("range")) if per_column > 1 else make_graph
+    buffers = HostBuffers(servers, BUFFER_LEN, graph, history, sample_s, per_column=per_column)
+    slots = AssetSlots(get_client(device_ip), APP_ID, GRAPH_FILE, GRAPH_SLOTS)
+    print(f"Пингуем {', '.join(servers)} {per_column / UPDATE_INTERVAL:g} раз/с, "
+          f"столбец графика — {UPDATE_INTERVAL:.1f}s, обновляем дисплей {', '.join(parse_devices(device_ip))}")
+
+    def render(tick):
+        # замеры уже записаны в буферы конвейером; рендерим кадр по последнему
+        host, text_value = buffers.select(tick, mode, page_ticks, worst_n, text)
+        return host, text_value, buffers.png(host)
+
+    def write(frame):
+        with get_client(device_ip).budget(WRITE_BUDGET_S):
+            write_frame(frame)
+
+    def write_frame(frame):
+        host, text_value, img_bytes = frame
+        slots.submit(img_bytes)
+        graph_file = slots.latest(UPLOAD_WAIT_S)
+
+        payload = {
+            "app_id": APP_ID,
+            "elements": [
+                {
+                    "id": "ping_text",
+                    "timeout": 2,
+                    "type": "text",
+                    "text": text_value,
+                    "x": 0,
+                    "y": 0,
+                    "font": TEXT_FONT,
+                    "color": TEXT_COLOR,
+                    "width": 72,
+                    "scroll_rate": 60
+                },
+                {
+                    "id": "graph_img",
+                    "timeout": 2,
+                    "type": "image",
+                    "path": graph_file,
+                    "x": GRAPH_X,
+                    "y": GRAPH_Y
+                }
+            ]
+        }
+        if graph_file is None:
+            # ни один кадр ещё не загрузился целиком — рисуем только текст
+            payload["elements"] = [el for el in payload["elements"] if el["id"] != "graph_img"]
+        display_on_device(device_ip, payload)
+        print(f"{time.strftime('%H:%M:%S')} | ping={text_value} | {buffers.graphs[host].encoder.summary()}")
+
+    # замер, рендер и запись на устройство — отдельные этапы (busybar.pipeline)
+    pipeline = PingPipeline(servers, buffers, render, write,
+                            ticks=TickScheduler(sample_s), probe=ping_many, timeout_s=0.9)
     try:
-        while True:
-            t0 = time.time()
-            ping_ms = ping_once(server_ip, timeout_s=0.9)
-            text_value = "--" if ping_ms is None else f"{ping_ms} ms"
-            buffer.append(ping_ms)
-
-            img_bytes = render_graph_image(buffer)
-            upload_image_to_device(device_ip, APP_ID, GRAPH_FILE, img_bytes)
-
-            payload = {
-                "app_id": APP_ID,
-                "elements": [
-                    {
-                        "id": "ping_text",
-                        "timeout": 2,
-                        "type": "text",
-                        "text": text_value,
-                        "x": 0,
-                        "y": 0,
-                        "font": TEXT_FONT,
-                        "color": TEXT_COLOR,
-                        "width": 72,
-                        "scroll_rate": 60
-                    },
-                    {
-                        "id": "graph_img",
-                        "timeout": 2,
-                        "type": "image",
-                        "path": GRAPH_FILE,
-                        "x": GRAPH_X,
-                        "y": GRAPH_Y
-                    }
-                ]
-            }
-            display_on_device(device_ip, payload)
-            print(f"{time.strftime('%H:%M:%S')} | ping={text_value}")
-            t_elapsed = time.time() - t0
-            if (to_sleep := UPDATE_INTERVAL - t_elapsed) > 0:
-                time.sleep(to_sleep)
+        pipeline.run()
     except KeyboardInterrupt:
         print("\nОстановлено пользователем.")
+    finally:
+        pipeline.stop()
+        client = get_client(device_ip)
+        print(client.assets.summary())
+        print(client.frames.summary())
+        print(client.breaker.summary())
+        print(slots.summary())
+        print(pipeline.summary())
+        print(pipeline.ticks.summary())
+        if history is not None:
+            history.close()
 
 def main():
     parser = argparse.ArgumentParser(description="Ping -> LED display 72x16 bar graph")
-    parser.add_argument("--server", "-s", required=True, help="IP/hostname игрового сервера")
-    parser.add_argument("--device", "-d", default=DEVICE_IP, help=f"IP LED-девайса (по умолчанию {DEVICE_IP})")
+    parser.add_argument("--server", "-s", nargs="+", default=[], help="IP/hostname игрового сервера (можно несколько)")
+    parser.add_argument("--servers-file", "-f", help="файл со списком серверов, по одному на строку")
+    parser.add_argument("--mode", choices=MODES, default="rotate",
+                        help="несколько серверов: rotate — по очереди, worst — худшие N")
+    parser.add_argument("--page", type=int, default=PAGE_TICKS,
+                        help=f"rotate: столбцов графика (по {UPDATE_INTERVAL:g} с при любом --rate) на один сервер")
+    parser.add_argument("--worst", type=int, default=WORST_N, help="worst: сколько серверов показывать")
+    parser.add_argument("--device", "-d", nargs="+", default=[DEVICE_IP],
+                        help="IP LED-девайса; несколько — один кадр на все панели "
+                             f"(по умолчанию {DEVICE_IP}, задаётся BUSYBAR_DEVICE)")
+    parser.add_argument("--metrics", metavar="[HOST:]PORT", default=os.environ.get(METRICS_ENV),
+                        help="отдавать метрики Prometheus на этом порту (/metrics)")
+    parser.add_argument("--metrics-log", metavar="FILE", default=os.environ.get(METRICS_LOG_ENV),
+                        help="писать метрики строками JSON в файл ('-' — stdout)")
+    parser.add_argument("--text", choices=TEXT_MODES, default="last",
+                        help="текст у графика: last — последний замер, stats — p50/p95/джиттер/потери за минуту")
+    parser.add_argument("--rate", type=float, default=SAMPLE_RATE_HZ,
+                        help="замеров в секунду (по умолчанию 10): столбец графика — min/avg/max за секунду; "
+                             "1 — по замеру на столбец, как раньше (меньше ICMP-трафика)")
+    parser.add_argument("--history", metavar="FILE", default=DEFAULT_PATH,
+                        help="файл истории замеров ('' — без истории)")
     args = parser.parse_args()
-    run_loop(args.server, args.device)
+    servers = load_hosts(args.server, args.servers_file)
+    if not servers:
+        parser.error("нужен --server или --servers-file")
+    _, metrics_log = start_from_env(args.metrics, args.metrics_log)
+    run_loop(servers, args.device, args.mode, args.page, args.worst, history_path=args.history, text=args.text,
+             rate_hz=args.rate)
+    if metrics_log is not None:
+        metrics_log.stop()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+busybar-sim.py — симулятор LED-устройства 72x16 на локальном порту.
+
+Любой виджет можно запустить без железа:
+  python3 busybar-sim.py --port 8080 --show
+  BUSYBAR_DEVICE=127.0.0.1:8080 python3 ../clock-widget/clock-2.py
+  python3 ../ping-monitor/ping-monitor-3.py -s 1.1.1.1 -d 127.0.0.1:8080
+
+Медленное устройство:
+  python3 busybar-sim.py --latency 80 --jitter 40 --bandwidth 20 --fail-rate 0.05
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from busybar.simulator import DeviceSimulator, make_server
+
+SHOW_INTERVAL = 0.5
+
+
+def show_loop(sim, color):
+    while True:
+        # курсор в начало экрана и перерисовка поверх
+        sys.stdout.write("\x1b[H\x1b[2J" + sim.render().ascii(color) + "\n" + sim.summary() + "\n")
+        sys.stdout.flush()
+        time.sleep(SHOW_INTERVAL)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Симулятор LED-устройства 72x16 (HTTP API)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", "-p", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=0.0, help="задержка ответа, мс")
+    parser.add_argument("--jitter", type=float, default=0.0, help="случайная добавка к задержке до N мс")
+    parser.add_argument("--bandwidth", type=float, default=0.0, help="скорость приёма, КБ/с (0 — без ограничения)")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="доля запросов с ответом 503")
+    parser.add_argument("--hang-rate", type=float, default=0.0, help="доля запросов, которые зависают")
+    parser.add_argument("--hang", type=float, default=10.0, help="на сколько секунд зависать")
+    parser.add_argument("--seed", type=int, help="зерно для воспроизводимых отказов")
+    parser.add_argument("--show", action="store_true", help="рисовать экран в терминале")
+    parser.add_argument("--no-color", action="store_true", help="--show без цветов")
+    args = parser.parse_args()
+
+    sim = DeviceSimulator(latency=args.latency / 1000, jitter=args.jitter / 1000,
+                          bandwidth=args.bandwidth * 1024 or None,
+                          fail_rate=args.fail_rate, hang_rate=args.hang_rate,
+                          hang_s=args.hang, seed=args.seed)
+    server = make_server(sim, args.host, args.port)
+    print(f"Симулятор устройства на http://{args.host}:{args.port} "
+          f"(экран: /sim/screen.png, счётчики: /sim/stats)")
+    if args.show:
+        threading.Thread(target=show_loop, args=(sim, not args.no_color), daemon=True).start()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n" + sim.summary())
+
+
+if __name__ == "__main__":
+    main()
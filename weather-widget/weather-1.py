@@ -1,27 +1,20 @@
-import requests
-import time
-import json
+import os
+import sys
 
-# Функция получения погоды
-def get_weather(city):
-    url = f"https://api.open-meteo.com/v1/forecast"
-    params = {
-        "latitude": city["lat"],
-        "longitude": city["lon"],
-        "current_weather": "true",
-        "temperature_unit": "celsius",
-        "windspeed_unit": "kmh",
-        "precipitation_unit": "mm",
-        "timezone": "Europe/London"
-    }
-    response = requests.get(url, params=params)
-    data = response.json()
-    return data["current_weather"]
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from busybar.device import get_client
+from busybar.metrics import start_from_env
+from busybar.scheduler import TickScheduler
+from busybar.weather import get_weather
+
+# Общий клиент устройства (busybar.device)
+client = get_client()
+start_from_env()  # метрики: переменные BUSYBAR_METRICS / BUSYBAR_METRICS_LOG
+# бюджет запросов одного слайда (слайд — 3 с)
+SLIDE_BUDGET_S = 2.5
 
 # Функция отправки данных на экран
 def send_to_display(text):
-    url = "http://10.0.4.20/api/display/draw"
-    headers = {"Content-Type": "application/json"}
     payload = {
         "app_id": "weather_app",
         "elements": [
@@ -39,7 +32,8 @@ def send_to_display(text):
             }
         ]
     }
-    requests.post(url, headers=headers, data=json.dumps(payload))
+    with client.budget(SLIDE_BUDGET_S):
+        client.draw(payload)
 
 # Список городов с координатами
 cities = {
@@ -48,12 +42,23 @@ cities = {
     "New York": {"lat": 40.7128, "lon": -74.0060}
 }
 
+# Слайды раз в 3 секунды (busybar.scheduler)
+slides = TickScheduler(3)
+
 # Основной цикл
 while True:
-    for city_name, coords in cities.items():
-        weather = get_weather(coords)
+    # погода по всем городам (busybar.weather)
+    weather_by_city = get_weather(cities)
+    if not weather_by_city:
+        # нет ни свежих, ни сохранённых данных — подождём и попробуем снова
+        slides.wait()
+        continue
+    for city_name in cities:
+        weather = weather_by_city.get(city_name)
+        if weather is None:
+            continue
         temp = weather["temperature"]
         wind_speed = weather["windspeed"]
         text = f"{city_name}: {temp}°C, Wind: {wind_speed} km/h"
+        slides.wait()
         send_to_display(text)
-        time.sleep(3)
@@ -1,6 +1,18 @@
-import requests
-import time
-import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from busybar.device import get_client
+from busybar.metrics import start_from_env
+from busybar.png import encode_indexed
+from busybar.scheduler import TickScheduler
+from busybar.weather import get_weather
+
+# Общий клиент устройства (busybar.device)
+client = get_client()
+start_from_env()  # метрики: переменные BUSYBAR_METRICS / BUSYBAR_METRICS_LOG
+# бюджет запросов одного слайда (слайд — 3 с)
+SLIDE_BUDGET_S = 2.5
 
 # Координаты городов
 cities = {
@@ -9,6 +21,9 @@ cities = {
     "New York": {"lat": 40.7128, "lon": -74.0060}
 }
 
+# Палитра иконок: 0 — прозрачный, 1 — желтый
+ICON_PALETTE = [(0, 0, 0, 0), (255, 255, 0, 255)]
+
 # Простые 16x16 иконки как битмапы
 ICONS = {
     "sun": [
@@ -69,44 +84,18 @@ ICONS = {
 
 # Конвертация битмапа в PNG
 def bitmap_to_bytes(bitmap):
-    from PIL import Image
-    import io
-    img = Image.new("RGBA", (16, 16), (0,0,0,0))
-    for y, row in enumerate(bitmap):
-        for x, c in enumerate(row):
-            if c == "#":
-                img.putpixel((x, y), (255, 255, 0, 255))  # желтый
-    b = io.BytesIO()
-    img.save(b, format="PNG")
-    return b.getvalue()
-
-# Получение погоды
-def get_weather(city):
-    url = "https://api.open-meteo.com/v1/forecast"
-    params = {
-        "latitude": city["lat"],
-        "longitude": city["lon"],
-        "current_weather": "true",
-        "temperature_unit": "celsius",
-        "windspeed_unit": "kmh",
-        "precipitation_unit": "mm",
-        "timezone": "Europe/London"
-    }
-    response = requests.get(url, params=params)
-    data = response.json()
-    return data["current_weather"]
+    # PNG с палитрой из 2 цветов: прозрачный фон + жёлтый для солнца/облака
+    rows = [[1 if c == "#" else 0 for c in row] for row in bitmap]
+    return encode_indexed(16, 16, rows, ICON_PALETTE)
 
 # Загрузка иконки на устройство
 def upload_icon(name, bitmap):
-    url = f"http://10.0.4.20/api/assets/upload?app_id=weather_app&file={name}.png"
-    headers = {"Content-Type": "application/octet-stream"}
     data = bitmap_to_bytes(bitmap)
-    requests.post(url, headers=headers, data=data)
+    # обязательный ассет (см. busybar.device)
+    client.require_asset("weather_app", f"{name}.png", data)
 
 # Отправка текста и иконки на экран
 def draw_weather(city_name, temp, icon_name):
-    url = "http://10.0.4.20/api/display/draw"
-    headers = {"Content-Type": "application/json; charset=utf-8"}
     payload = {
         "app_id": "weather_app",
         "elements": [
@@ -144,16 +133,28 @@ def draw_weather(city_name, temp, icon_name):
             }
         ]
     }
-    requests.post(url, headers=headers, data=json.dumps(payload, ensure_ascii=False))
+    with client.budget(SLIDE_BUDGET_S):
+        client.draw(payload)
 
 # Загрузка иконок один раз
 for name, bitmap in ICONS.items():
     upload_icon(name, bitmap)
 
+# Слайды раз в 3 секунды (busybar.scheduler)
+slides = TickScheduler(3)
+
 # Основной цикл
 while True:
-    for city_name, coords in cities.items():
-        weather = get_weather(coords)
+    # погода по всем городам (busybar.weather)
+    weather_by_city = get_weather(cities)
+    if not weather_by_city:
+        # нет ни свежих, ни сохранённых данных — подождём и попробуем снова
+        slides.wait()
+        continue
+    for city_name in cities:
+        weather = weather_by_city.get(city_name)
+        if weather is None:
+            continue
         temp = weather["temperature"]
         # Выбор иконки по weathercode
         code = weather.get("weathercode", 0)
@@ -163,5 +164,5 @@ while True:
             icon = "cloud"
         else:
             icon = "rain"
+        slides.wait()
         draw_weather(city_name, temp, icon)
-        time.sleep(3)
@@ -1,7 +1,17 @@
-import requests
-import time
-import json
 import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from busybar.device import get_client
+from busybar.metrics import start_from_env
+from busybar.raster import RasterFrames
+from busybar.scheduler import TickScheduler
+from busybar.timing import PeriodMeter
+from busybar.weather import WeatherPrefetcher
+
+# Общий клиент устройства (busybar.device)
+client = get_client()
+start_from_env()  # метрики: переменные BUSYBAR_METRICS / BUSYBAR_METRICS_LOG
 
 # Координаты городов
 cities = {
@@ -14,34 +24,26 @@ cities = {
 ICON_FOLDER = "icons"
 ICON_FILES = ["cloud.png", "fog.png", "partly.png", "rain.png", "snow.png", "sun.png"]
 
+SLIDE_SECONDS = 3  # длительность одного слайда (город)
+# True — слайд собирается локально (иконка + текст) и уходит одной картинкой,
+# иконки на устройство не загружаются
+RASTER_MODE = False
+# слотов на один больше, чем городов: слайды следующих ротаций уже лежат на устройстве
+frames = RasterFrames(client, "weather_app", timeout=6, slots=len(cities) + 1) if RASTER_MODE else None
+
 # Загрузка иконки на устройство
 def upload_icon(file_name):
     file_path = os.path.join(ICON_FOLDER, file_name)
-    url = f"http://10.0.4.20/api/assets/upload?app_id=weather_app&file={file_name}"
-    headers = {"Content-Type": "application/octet-stream"}
     with open(file_path, "rb") as f:
         data = f.read()
-    requests.post(url, headers=headers, data=data)
-
-# Получение погоды
-def get_weather(city):
-    url = "https://api.open-meteo.com/v1/forecast"
-    params = {
-        "latitude": city["lat"],
-        "longitude": city["lon"],
-        "current_weather": "true",
-        "temperature_unit": "celsius",
-        "windspeed_unit": "kmh",
-        "precipitation_unit": "mm",
-        "timezone": "Europe/London"
-    }
-    response = requests.get(url, params=params)
-    return response.json()["current_weather"]
+    if RASTER_MODE:
+        frames.add_png(file_name, data)
+    else:
+        # обязательный ассет (см. busybar.device)
+        client.require_asset("weather_app", file_name, data)
 
 # Отправка текста и иконки на экран
 def draw_weather(city_name, temp, icon_file):
-    url = "http://10.0.4.20/api/display/draw"
-    headers = {"Content-Type": "application/json; charset=utf-8"}
     payload = {
         "app_id": "weather_app",
         "elements": [
@@ -79,7 +81,11 @@ def draw_weather(city_name, temp, icon_file):
             }
         ]
     }
-    requests.post(url, headers=headers, data=json.dumps(payload, ensure_ascii=False))
+    with client.budget(SLIDE_SECONDS * 0.8):
+        if RASTER_MODE:
+            frames.show(payload["elements"])
+        else:
+            client.draw(payload)
 
 # Загрузка всех иконок один раз
 for icon_file in ICON_FILES:
@@ -101,12 +107,27 @@ def select_icon(weathercode):
             return f"{icon}.png"
     return "sun.png"  # по умолчанию солнце
 
-# Основной цикл
+# Погода подкачивается в фоне, цикл слайдов читает готовый снимок
+prefetcher = WeatherPrefetcher(cities).start()
+prefetcher.wait_ready(timeout=10)
+slide_meter = PeriodMeter(nominal_s=SLIDE_SECONDS)
+
+# Основной цикл: слайды строго раз в SLIDE_SECONDS по монотонным часам,
+# сеть на длительность слайда не влияет
+slides = TickScheduler(SLIDE_SECONDS)
 while True:
-    for city_name, coords in cities.items():
-        weather = get_weather(coords)
+    snapshot = prefetcher.snapshot()
+    for city_name in cities:
+        weather = snapshot.get(city_name)
+        if weather is None:
+            continue
         temp = weather["temperature"]
         code = weather.get("weathercode", 0)
         icon_file = select_icon(code)
+        slides.wait()
         draw_weather(city_name, temp, icon_file)
-        time.sleep(3)
+        slide_meter.tick()
+    if not snapshot:
+        # данных ещё нет — ждём один слайд
+        slides.wait()
+    print(slide_meter.summary("слайд"), "|", slides.summary())